@@ -0,0 +1,235 @@
+
+from typing import Dict, Hashable, List, Optional
+import numpy as np
+
+from ctrl.disturbance import DisturbanceBank
+from ctrl.nonlinear import NonlinearBank
+from ctrl.predict import markov_matrices, toeplitz_lower
+
+
+# ------------------------- motor em lote (bloco-diagonal) -------------------------
+
+def scale_inputs(raw: np.ndarray, gain, off, heur=None) -> np.ndarray:
+    """
+    Estágio de escala vetorizado: ``clip(gain·raw + off, 0, 1)``; linhas com
+    ``heur`` usam a heurística antiga por magnitude (0..65535 / 0..100 / 0..1).
+    Não-finitos viram 0.
+    """
+    u = raw * gain + off
+    if heur is not None and heur.any():
+        legacy = np.where(raw > 1000.0, raw / 65535.0, np.where(raw > 1.0, raw / 100.0, raw))
+        u = np.where(heur, legacy, u)
+    np.nan_to_num(u, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.clip(u, 0.0, 1.0, out=u)
+
+
+class BatchSS:
+    """
+    Motor de espaço de estados **em lote** para várias plantas SISO discretas.
+
+    Cada planta ocupa uma linha de arrays empacotados com *padding* até a maior
+    ordem conectada (``n_max``):
+
+    • ``A``: (P, n_max, n_max)   • ``B``: (P, n_max)   • ``C``: (P, n_max)
+    • ``D``: (P,)                • ``X``: (P, n_max)
+
+    As entradas/estados extras de plantas de ordem menor ficam em zero, de modo
+    que um tick inteiro vira duas ``einsum`` (saída e atualização de estado).
+
+    O ``x`` de cada ``DiscreteSS`` registrado passa a ser uma *view* (n,1) da
+    sua linha em ``X`` — o estado continua acessível/alterável pelo objeto
+    original (reset, persistência), sem cópias a cada tick.
+
+    Para o repouso de plantas em regime, cada linha tem ``quiet`` (ticks
+    seguidos sem mudança de estado/entrada) e ``need`` (ticks para esvaziar a
+    janela de atraso); ``step(..., dx=...)`` devolve max|x[k+1]-x[k]| por linha.
+
+    ``y_pub``/``db_abs``/``db_rel`` guardam, por linha, o último valor emitido e
+    a banda morta de publicação (ver ``publish_mask``); ``u_gain``/``u_off``/
+    ``u_heur`` a escala de entrada resolvida na conexão (ver ``scale_inputs``).
+    ``nl`` (``NonlinearBank``) tem os blocos não lineares de entrada/saída e
+    ``dist`` (``DisturbanceBank``) o ruído/deriva/perturbações de medição.
+    """
+    def __init__(self, capacity: int = 16, rng: Optional[np.random.Generator] = None):
+        self.keys: List[Hashable] = []
+        self.index: Dict[Hashable, int] = {}
+        self.systems: list = []
+        self.n_max = 0
+        self.version = 0                 # muda a cada add/remove (invalida o cache de predição)
+        self._pred: Optional[tuple] = None
+        self.nl = NonlinearBank(capacity)
+        self.dist = DisturbanceBank(capacity, rng=rng)
+        self._alloc(max(1, int(capacity)), 0)
+
+    # ------------------------- alocação -------------------------
+
+    def _alloc(self, capacity: int, n_max: int):
+        """(Re)aloca os arrays preservando as plantas já empacotadas."""
+        P = len(self.keys)
+        old = getattr(self, "A", None)
+        A = np.zeros((capacity, n_max, n_max)); B = np.zeros((capacity, n_max))
+        C = np.zeros((capacity, n_max)); D = np.zeros(capacity); X = np.zeros((capacity, n_max))
+        orders = np.zeros(capacity, dtype=int)
+        quiet = np.zeros(capacity, dtype=int); need = np.zeros(capacity, dtype=int)
+        y_pub = np.full(capacity, np.nan); db_abs = np.zeros(capacity); db_rel = np.zeros(capacity)
+        u_gain = np.ones(capacity); u_off = np.zeros(capacity); u_heur = np.zeros(capacity, dtype=bool)
+        if old is not None and P:
+            n = self.n_max
+            A[:P, :n, :n] = self.A[:P]; B[:P, :n] = self.B[:P]
+            C[:P, :n] = self.C[:P]; D[:P] = self.D[:P]; X[:P, :n] = self.X[:P]
+            orders[:P] = self.orders[:P]; quiet[:P] = self.quiet[:P]; need[:P] = self.need[:P]
+            y_pub[:P] = self.y_pub[:P]; db_abs[:P] = self.db_abs[:P]; db_rel[:P] = self.db_rel[:P]
+            u_gain[:P] = self.u_gain[:P]; u_off[:P] = self.u_off[:P]; u_heur[:P] = self.u_heur[:P]
+        self.A, self.B, self.C, self.D, self.X, self.orders = A, B, C, D, X, orders
+        self.quiet, self.need = quiet, need
+        self.y_pub, self.db_abs, self.db_rel = y_pub, db_abs, db_rel
+        self.u_gain, self.u_off, self.u_heur = u_gain, u_off, u_heur
+        self.n_max = n_max
+        self.nl.resize(capacity, P)
+        self.dist.resize(capacity, P)
+        for i in range(P):
+            self._bind(i)
+
+    def _bind(self, i: int):
+        """Faz ``dsys.x`` (e ``dsys.u_state``) apontar para a linha ``i`` (views)."""
+        n = int(self.orders[i])
+        self.systems[i].x = self.X[i, :n].reshape(n, 1)
+        self.systems[i].u_state = self.nl.state[i]
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ------------------------- cadastro incremental -------------------------
+
+    def add(self, key, dsys) -> int:
+        """
+        Empacota ``dsys`` (``DiscreteSS``) sob ``key``. Se a chave já existir, a
+        linha é sobrescrita no lugar (reconexão / re-discretização).
+        """
+        n = int(dsys.A.shape[0])
+        x0 = np.array(dsys.x, dtype=float).reshape(-1)[:n]
+        i = self.index.get(key)
+        if i is None:
+            i = len(self.keys)
+            capacity = self.A.shape[0]
+            if i >= capacity or n > self.n_max:
+                self._alloc(2 * capacity if i >= capacity else capacity, max(n, self.n_max))
+            self.keys.append(key); self.systems.append(dsys); self.index[key] = i
+        else:
+            self.systems[i] = dsys
+            if n > self.n_max:
+                self._alloc(self.A.shape[0], n)
+
+        self.A[i] = 0.0; self.B[i] = 0.0; self.C[i] = 0.0; self.X[i] = 0.0
+        self.A[i, :n, :n] = dsys.A
+        self.B[i, :n] = np.asarray(dsys.B, dtype=float).reshape(-1)[:n]
+        self.C[i, :n] = np.asarray(dsys.C, dtype=float).reshape(-1)[:n]
+        self.D[i] = float(dsys.D)
+        self.X[i, :x0.size] = x0
+        self.orders[i] = n
+        self.version += 1
+        self.quiet[i] = 0
+        # janela de atraso "vazia" = só contém a entrada atual: L/Ts ticks + margem da interpolação
+        self.need[i] = int(np.ceil(float(getattr(dsys, "delay_L", 0.0)) / float(dsys.Ts) - 1e-9)) + 2
+        self.y_pub[i] = getattr(dsys, "y_pub", np.nan)
+        self.db_abs[i] = getattr(dsys, "db_abs", 0.0); self.db_rel[i] = getattr(dsys, "db_rel", 0.0)
+        self.u_gain[i] = getattr(dsys, "u_gain", 1.0); self.u_off[i] = getattr(dsys, "u_off", 0.0)
+        self.u_heur[i] = getattr(dsys, "u_heur", False)
+        self.nl.set(i, getattr(dsys, "nl", None), getattr(dsys, "u_state", None))
+        self.dist.set(i, getattr(dsys, "dist", None), getattr(dsys, "y_drift", 0.0))
+        self._bind(i)
+        return i
+
+    def remove(self, key) -> bool:
+        """Remove ``key`` movendo a última linha para o buraco (O(n_max²))."""
+        i = self.index.pop(key, None)
+        if i is None:
+            return False
+        dsys = self.systems[i]
+        dsys.x = np.array(dsys.x, dtype=float)  # desacopla a view antes de reciclar a linha
+        dsys.y_pub = float(self.y_pub[i])
+        dsys.u_state = np.array(self.nl.state[i])
+        dsys.y_drift = float(self.dist.level[i])
+        last = len(self.keys) - 1
+        if i != last:
+            for arr in (self.A, self.B, self.C, self.D, self.X, self.orders, self.quiet, self.need,
+                        self.y_pub, self.db_abs, self.db_rel, self.u_gain, self.u_off, self.u_heur):
+                arr[i] = arr[last]
+            self.nl.move(i, last); self.dist.move(i, last)
+            self.keys[i] = self.keys[last]; self.systems[i] = self.systems[last]
+            self.index[self.keys[i]] = i
+            self._bind(i)
+        self.keys.pop(); self.systems.pop()
+        self.version += 1
+        for arr in (self.A, self.B, self.C, self.D, self.X):
+            arr[last] = 0.0
+        self.orders[last] = 0; self.quiet[last] = 0; self.need[last] = 0
+        self.y_pub[last] = np.nan; self.db_abs[last] = 0.0; self.db_rel[last] = 0.0
+        self.u_gain[last] = 1.0; self.u_off[last] = 0.0; self.u_heur[last] = False
+        self.nl.clear(last); self.dist.clear(last)
+        return True
+
+    def clear(self):
+        for key in list(self.keys):
+            self.remove(key)
+
+    # ------------------------- passo vetorizado -------------------------
+
+    def step(self, u_eff: np.ndarray, out: Optional[np.ndarray] = None,
+             dx: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Avança todas as plantas um passo com entradas (já atrasadas) ``u_eff``
+        (P,). Retorna ``y`` (P,) calculado com o estado anterior ao passo.
+        Com ``dx`` (P,), grava nele max|x[k+1] - x[k]| de cada planta.
+        """
+        P = len(self.keys)
+        u = np.asarray(u_eff, dtype=float).reshape(P)
+        A, B, C, X = self.A[:P], self.B[:P], self.C[:P], self.X[:P]
+        y = np.einsum('pn,pn->p', C, X, out=out)
+        y += self.D[:P] * u
+        X_new = np.einsum('pij,pj->pi', A, X) + B * u[:, None]
+        if dx is not None:
+            if self.n_max:
+                np.abs(X_new - X).max(axis=1, out=dx)
+            else:
+                dx[...] = 0.0
+        X[...] = X_new
+        return y
+
+    def prediction(self, N: int):
+        """
+        ``(Φ, Γ)`` de ``ctrl.predict`` para as linhas atuais e horizonte ``N``,
+        em cache até a próxima mudança de plantas (memória P·N·(N + n_max)).
+        """
+        P = len(self.keys); N = max(1, int(N))
+        if self._pred is None or self._pred[:2] != (self.version, N):
+            Phi, h = markov_matrices(self.A[:P], self.B[:P], self.C[:P], self.D[:P], N)
+            self._pred = (self.version, N, Phi, toeplitz_lower(h))
+        return self._pred[2], self._pred[3]
+
+    def publish_mask(self, y: np.ndarray) -> np.ndarray:
+        """
+        Quais saídas ``y`` (P,) saíram da banda morta em torno do último valor
+        emitido: ``|y - y_pub| > max(db_abs, db_rel·|y_pub|)``. Atualiza
+        ``y_pub`` nessas linhas (a comparação é sempre contra o último valor
+        *emitido*, então derivas lentas acabam emitindo).
+        """
+        P = len(self.keys)
+        ref = self.y_pub[:P]
+        thr = np.maximum(self.db_abs[:P], self.db_rel[:P] * np.abs(ref))
+        mask = ~(np.abs(y - ref) <= thr)     # NaN (nunca emitido) -> emite
+        ref[mask] = y[mask]
+        return mask
+
+    def scale_inputs(self, raw: np.ndarray) -> np.ndarray:
+        """Entradas brutas (P,) -> [0, 1] com a escala de cada linha, em uma operação."""
+        P = len(self.keys)
+        return scale_inputs(np.asarray(raw, dtype=float).reshape(P), self.u_gain[:P], self.u_off[:P],
+                             self.u_heur[:P])
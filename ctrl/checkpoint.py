@@ -0,0 +1,83 @@
+
+from typing import List, Optional, Sequence, Tuple
+import struct
+import numpy as np
+
+
+# ------------------------- checkpoint binário por planta -------------------------
+#
+# Blob (little-endian), sem A/B/C (recalculados a partir do tFunc):
+#
+#   "STF1" | Ts f8 | nx u4 | nu u4 | nlines u4 | len[nlines] u4
+#   | x[nx] f8 | last_u[nu] f8 | (t, u)[sum(len)] f8
+#
+# Cada "linha" é a janela (t, u) de uma DelayLine (0 amostras = sem atraso).
+
+MAGIC = b"STF1"
+_HEADER = struct.Struct("<4sdIII")
+
+
+def pack_state(Ts: float, x: np.ndarray, last_u: Sequence[float],
+               lines: Sequence[Optional[np.ndarray]]) -> bytes:
+    x = np.ascontiguousarray(x, dtype="<f8").ravel()
+    u = np.ascontiguousarray(np.atleast_1d(np.asarray(last_u, dtype="<f8")))
+    wins = [np.empty((0, 2)) if w is None else np.asarray(w, dtype="<f8").reshape(-1, 2) for w in lines]
+    lens = np.array([len(w) for w in wins], dtype="<u4")
+    parts = [_HEADER.pack(MAGIC, float(Ts), x.size, u.size, len(wins)), lens.tobytes(), x.tobytes(), u.tobytes()]
+    parts.extend(np.ascontiguousarray(w).tobytes() for w in wins)
+    return b"".join(parts)
+
+
+def unpack_state(blob: bytes) -> Tuple[float, np.ndarray, np.ndarray, List[np.ndarray]]:
+    """``(Ts, x, last_u, [janelas (n, 2)])``; ``ValueError`` se o blob não for um checkpoint."""
+    blob = bytes(blob)
+    if len(blob) < _HEADER.size or blob[:4] != MAGIC:
+        raise ValueError("checkpoint inválido (assinatura)")
+    _, Ts, nx, nu, nl = _HEADER.unpack_from(blob)
+    o = _HEADER.size
+    lens = np.frombuffer(blob, dtype="<u4", count=nl, offset=o); o += 4 * nl
+    x = np.frombuffer(blob, dtype="<f8", count=nx, offset=o); o += 8 * nx
+    u = np.frombuffer(blob, dtype="<f8", count=nu, offset=o); o += 8 * nu
+    wins = []
+    for n in lens.tolist():
+        wins.append(np.frombuffer(blob, dtype="<f8", count=2 * n, offset=o).reshape(n, 2)); o += 16 * n
+    return Ts, x, u, wins
+
+
+# Verificação de continuidade: checkpoint -> relógio zerado -> restauração, com
+# atraso fracionário (L = 1.23 s, Ts = 50 ms: DelayLine em modo interp). A
+# execução restaurada tem de seguir a ininterrupta.
+if __name__ == '__main__':
+    from ctrl.simul_tf import SimulTf
+
+    class _Var:
+        def __init__(self, col):
+            self.tableName, self.rowName, self.colName = "TF", "r", col
+            self.inputValue = 0.0; self._value = 0.0
+            self.valueChangedSignal = self
+        def emit(self, _): pass
+        def getTFunc(self): return "[1.0],[3.0 1.0], 1.23,@x"
+        def type(self): return "FLOAT"
+        def byteSize(self): return 4
+
+    def _sim():
+        sim = SimulTf(50, speed=None, deadband=None, sleep_tol=None, timing=False)
+        var = _Var("a"); sim.tfConnect(var, True)
+        return sim, var
+
+    def _run(sim, var, k0, n):
+        out = []
+        for k in range(k0, k0 + n):
+            var.inputValue = 0.5 + 0.4 * np.sin(0.07 * k)
+            sim._on_input_changed(var); sim._simulation_step(); out.append(var._value)
+        return np.array(out)
+
+    ref, var = _sim()
+    _run(ref, var, 0, 200)                      # 10 s
+    blobs = ref.snapshot_states()
+    y_ref = _run(ref, var, 200, 200)
+    sim, var = _sim()
+    sim.apply_states(blobs)
+    sim.clock.reset(); sim._rebase_delays()    # mesma sequência de start()
+    y = _run(sim, var, 200, 200)
+    print(f"checkpoint STF1 ({len(blobs['TF|r|a'])} B): erro máx. após restaurar = {np.abs(y - y_ref).max():.2e}")
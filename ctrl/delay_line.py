@@ -0,0 +1,143 @@
+
+from typing import Iterable, List, Optional, Tuple
+from bisect import bisect_right
+import math
+import numpy as np
+
+
+# ------------------------- linha de atraso (buffer circular) -------------------------
+
+class DelayLine:
+    """
+    Atraso puro u(t - L) com memória **limitada a L/Ts** (sem deque de tuplas).
+
+    Dois modos, escolhidos na criação:
+
+    • **shift** — quando ``L`` é múltiplo inteiro de ``Ts``: registrador de
+      deslocamento de ``k = L/Ts`` amostras; cada ``push`` devolve a amostra de
+      ``k`` passos atrás em O(1).
+    • **interp** — caso geral (L fracionário / jitter): buffer circular numpy
+      de timestamps e entradas, busca por bisseção (``bisect``, O(log n))
+      e interpolação linear entre as amostras vizinhas.
+
+    O buffer do modo ``interp`` é **espelhado** (cada amostra é gravada em
+    ``i`` e ``i + cap``), de forma que a janela lógica é sempre uma fatia
+    contígua — sem cópias nem aritmética modular na busca.
+    """
+    __slots__ = ("delay_L", "Ts", "k", "cap", "_t", "_u", "_head", "_len", "_pos", "_t_last")
+
+    def __init__(self, delay_L: float, Ts: float, seed_u: float = 0.0, t0: float = 0.0):
+        self.delay_L = max(0.0, float(delay_L))
+        self.Ts = max(1e-6, float(Ts))
+        ratio = self.delay_L / self.Ts
+        k = int(round(ratio))
+        self.k: Optional[int] = k if k >= 1 and abs(ratio - k) <= 1e-9 * max(1.0, ratio) else None
+        self._t_last = float(t0)
+        if self.k is not None:
+            self.cap = self.k
+            self._t = None
+            self._u = np.full(self.k, float(seed_u))
+            self._pos = 0
+            self._head = self._len = 0
+        else:
+            # margem 2x para ticks adiantados (catch-up/jitter) + vizinhos da interpolação
+            self.cap = 2 * int(math.ceil(ratio)) + 4
+            self._t = np.empty(2 * self.cap); self._u = np.empty(2 * self.cap)
+            self._head = 0; self._len = 0; self._pos = 0
+            self._write(float(t0), float(seed_u))
+
+    @property
+    def is_shift(self) -> bool:
+        return self.k is not None
+
+    # ------------------------- modo interp -------------------------
+
+    def _write(self, t: float, u: float):
+        cap = self.cap
+        if self._len == cap:
+            self._head = (self._head + 1) % cap
+            self._len -= 1
+        i = (self._head + self._len) % cap
+        self._t[i] = self._t[i + cap] = t
+        self._u[i] = self._u[i + cap] = u
+        self._len += 1
+
+    def at(self, t_query: float) -> float:
+        """u(t_query) por bisseção + interpolação linear (modo interp)."""
+        h = self._head; n = self._len
+        tb = self._t; ub = self._u
+        j = bisect_right(tb, t_query, h, h + n)
+        if j == h:
+            return float(ub[h])
+        if j >= h + n:
+            return float(ub[h + n - 1])
+        t0 = tb[j - 1]; t1 = tb[j]
+        u0 = ub[j - 1]; u1 = ub[j]
+        if t1 == t0: return float(u1)
+        a = (t_query - t0) / (t1 - t0)
+        return float((1 - a) * u0 + a * u1)
+
+    # ------------------------- API -------------------------
+
+    def push(self, u: float, t_now: float) -> float:
+        """Registra u(t_now) e devolve a entrada atrasada u(t_now - L)."""
+        u = float(u)
+        if self.k is not None:
+            self._t_last = t_now
+            out = float(self._u[self._pos])
+            self._u[self._pos] = u
+            self._pos = (self._pos + 1) % self.k
+            return out
+        t_w = t_now if t_now >= self._t_last else self._t_last + 1e-12
+        self._t_last = t_w
+        self._write(t_w, u)
+        return self.at(t_now - self.delay_L)
+
+    def snapshot(self) -> np.ndarray:
+        """Janela atual como array (n, 2) de (t, u), da mais antiga para a mais recente."""
+        if self.k is not None:
+            us = np.roll(self._u, -self._pos)
+            ts = self._t_last - self.Ts * np.arange(self.k - 1, -1, -1)
+            return np.column_stack([ts, us])
+        h = self._head; n = self._len
+        return np.column_stack([self._t[h:h + n], self._u[h:h + n]])
+
+    def samples(self) -> List[Tuple[float, float]]:
+        """Janela atual como lista (t, u), da mais antiga para a mais recente."""
+        return [tuple(r) for r in self.snapshot().tolist()]
+
+    def load(self, samples: Iterable[Tuple[float, float]], t_last: Optional[float] = None):
+        """
+        Restaura a janela a partir de pares (t, u) (p.ex. estado persistido).
+        ``t_last``: instante do relógio atual em que fica a amostra mais recente
+        (os tempos gravados são deslocados; o relógio pode ter sido zerado).
+        """
+        items = []
+        for item in samples:
+            try: items.append((float(item[0]), float(item[1])))
+            except Exception: pass
+        if not items:
+            return
+        if t_last is not None:
+            shift = float(t_last) - items[-1][0]
+            items = [(t + shift, u) for t, u in items]
+        if self.k is not None:
+            us = [u for _, u in items[-self.k:]]
+            us = [us[0]] * (self.k - len(us)) + us
+            self._u[:] = us; self._pos = 0
+            self._t_last = items[-1][0]
+            return
+        self._head = 0; self._len = 0
+        for t, u in items[-self.cap:]:
+            self._write(t, u)
+        self._t_last = items[-1][0]
+
+    def rebase(self, t_now: float):
+        """Desloca a janela para a amostra mais recente ficar em ``t_now`` (relógio zerado/trocado)."""
+        shift = float(t_now) - self._t_last
+        if self.k is None and self._len:
+            self._t += shift          # as duas metades espelhadas
+        self._t_last = float(t_now)
+
+    def __len__(self) -> int:
+        return self.k if self.k is not None else self._len
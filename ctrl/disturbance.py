@@ -0,0 +1,160 @@
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+
+
+# ------------------------- ruído de medição e perturbações -------------------------
+#
+# Declarados nas opções do tFunc (gravado no banco, campo de atraso):
+#
+#   "[1.0],[3.0 1.0], 1; noise=0.002; drift=0.0005; dstep=0.05@120; dramp=0.001@300:400,@..."
+#
+# • ``noise=<σ>``              ruído branco gaussiano somado à medição
+# • ``drift=<σ>``              deriva (passeio aleatório): σ·√dt por passo
+# • ``dstep=<amp>@<t>``        degrau de ``amp`` a partir do tempo simulado ``t`` (s)
+# • ``dramp=<inc>@<t0>[:<t1>]`` rampa de ``inc``/s entre ``t0`` e ``t1`` (sem fim: segue)
+#
+# Tudo é aditivo na saída (antes da saturação); o estado da planta não é afetado.
+# Os números aleatórios saem em blocos de um ``np.random.Generator`` semeado.
+
+
+@dataclass
+class DisturbanceSpec:
+    noise: float = 0.0
+    drift: float = 0.0
+    step_amp: float = 0.0
+    step_t: float = np.inf
+    ramp_inc: float = 0.0
+    ramp_t0: float = np.inf
+    ramp_t1: float = np.inf
+
+
+def _at(value: str):
+    amp, sep, t = value.partition('@')
+    if not sep:
+        raise ValueError(f"perturbação inválida: '{value}' (use valor@tempo)")
+    return float(amp), t
+
+
+def parse_disturbance(opts: Dict[str, str]) -> Optional[DisturbanceSpec]:
+    """``DisturbanceSpec`` a partir das opções do tFunc (``None`` se nenhuma foi dada)."""
+    if not any(k in opts for k in ("noise", "drift", "dstep", "dramp")):
+        return None
+    spec = DisturbanceSpec()
+    if "noise" in opts:
+        spec.noise = abs(float(opts["noise"]))
+    if "drift" in opts:
+        spec.drift = abs(float(opts["drift"]))
+    if "dstep" in opts:
+        spec.step_amp, t = _at(opts["dstep"])
+        spec.step_t = float(t)
+    if "dramp" in opts:
+        spec.ramp_inc, t = _at(opts["dramp"])
+        t0, _, t1 = t.partition(':')
+        spec.ramp_t0 = float(t0)
+        spec.ramp_t1 = float(t1) if t1 else np.inf
+        if spec.ramp_t1 < spec.ramp_t0:
+            raise ValueError("dramp: t1 < t0.")
+    return spec
+
+
+# ------------------------- banco vetorizado (uma linha por planta do BatchSS) -------------------------
+
+class DisturbanceBank:
+    """
+    Parâmetros de perturbação de todas as plantas de um ``BatchSS`` e o estado
+    da deriva, em arrays paralelos às suas linhas.
+
+    As amostras N(0, 1) vêm de blocos ``(chunk, 2, P)`` do ``Generator`` (ruído e
+    deriva); o bloco é descartado quando as linhas mudam. Com o mesmo ``seed`` e
+    a mesma ordem de conexão, a sequência é reprodutível.
+    """
+    _FIELDS = ("noise", "drift", "step_amp", "step_t", "ramp_inc", "ramp_t0", "ramp_t1")
+
+    def __init__(self, capacity: int = 16, rng: Optional[np.random.Generator] = None, chunk: int = 256):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.chunk = max(1, int(chunk))
+        self._alloc(max(1, int(capacity)), 0)
+
+    def _alloc(self, capacity: int, P: int):
+        d = DisturbanceSpec()
+        new = {f: np.full(capacity, getattr(d, f)) for f in self._FIELDS}
+        level = np.zeros(capacity)
+        if P:
+            for f in self._FIELDS:
+                new[f][:P] = getattr(self, f)[:P]
+            level[:P] = self.level[:P]
+        for f, arr in new.items():
+            setattr(self, f, arr)
+        self.level = level          # deriva acumulada por linha
+        self._invalidate()
+
+    def _invalidate(self):
+        self._active = None
+        self._buf = None; self._pos = 0
+
+    def resize(self, capacity: int, P: int):
+        if capacity != self.level.shape[0]:
+            self._alloc(capacity, P)
+
+    def set(self, i: int, spec: Optional[DisturbanceSpec], level: float = 0.0):
+        spec = spec or DisturbanceSpec()
+        for f in self._FIELDS:
+            getattr(self, f)[i] = getattr(spec, f)
+        self.level[i] = level
+        self._invalidate()
+
+    def move(self, dst: int, src: int):
+        for f in self._FIELDS + ("level",):
+            arr = getattr(self, f)
+            arr[dst] = arr[src]
+        self._invalidate()
+
+    def clear(self, i: int):
+        self.set(i, None)
+
+    def rows(self, P: int) -> np.ndarray:
+        """Máscara (P,) das linhas com alguma perturbação (não podem dormir)."""
+        return self._stages(P)[0]
+
+    def _stages(self, P: int) -> tuple:
+        if self._active is None or self._active[0] != P:
+            noisy = self.noise[:P] > 0; drifting = self.drift[:P] > 0
+            timed = np.isfinite(self.step_t[:P]) | np.isfinite(self.ramp_t0[:P])
+            self._active = (P, noisy | drifting | timed, bool(noisy.any()), bool(drifting.any()), bool(timed.any()))
+        return self._active[1:]
+
+    def _normals(self, P: int) -> np.ndarray:
+        if self._buf is None or self._pos >= self.chunk or self._buf.shape[2] != P:
+            self._buf = self.rng.standard_normal((self.chunk, 2, P))
+            self._pos = 0
+        z = self._buf[self._pos]
+        self._pos += 1
+        return z
+
+    def apply(self, y: np.ndarray, t: float, dt: float, P: int) -> np.ndarray:
+        """Soma ruído, deriva (avançada ``dt`` s) e perturbações em ``t`` a ``y`` (P,), no lugar."""
+        mask, noisy, drifting, timed = self._stages(P)
+        if not mask.any():
+            return y
+        if noisy or drifting:
+            z = self._normals(P)
+            if drifting:
+                self.level[:P] += self.drift[:P] * np.sqrt(dt) * z[1]
+                y += self.level[:P]
+            if noisy:
+                y += self.noise[:P] * z[0]
+        if timed:
+            y += np.where(t >= self.step_t[:P], self.step_amp[:P], 0.0)
+            span = np.clip(np.minimum(t, self.ramp_t1[:P]) - self.ramp_t0[:P], 0.0, None)
+            y += self.ramp_inc[:P] * np.nan_to_num(span, nan=0.0, posinf=0.0)
+        return y
+
+
+# Exemplo de uso: ruído + deriva + degrau em t=2 s numa medição constante de 50%
+if __name__ == '__main__':
+    bank = DisturbanceBank(1, rng=np.random.default_rng(1))
+    bank.set(0, parse_disturbance({"noise": "0.002", "drift": "0.001", "dstep": "0.05@2"}))
+    for k in range(0, 60, 5):
+        print(f"t={k * 0.1:.1f} y={bank.apply(np.array([0.5]), k * 0.1, 0.1, 1)[0]:.4f}")
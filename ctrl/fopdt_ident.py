@@ -0,0 +1,228 @@
+
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import threading
+import numpy as np
+
+
+# ------------------------- gravador de trajetórias (ring buffer espelhado) -------------------------
+
+class StepRecorder:
+    """
+    Grava ``(t, u, y)`` de todas as plantas do ``SimulTf`` a cada tick, com
+    memória fixa de ``capacity`` amostras por planta.
+
+    Como a ``DelayLine``, o buffer é **espelhado** (cada amostra vai para
+    ``i`` e ``i + cap``): ``window()`` devolve sempre **views** contíguas
+    (P, n) — gravações longas são analisadas sem cópia.
+
+    ``u`` é a entrada normalizada **antes** do atraso (é ela que define o
+    instante do degrau); ``y`` é a saída publicada.
+    """
+    def __init__(self, capacity: int = 12000):
+        self.cap = max(2, int(capacity))
+        self.keys: List[Hashable] = []
+        self.index: Dict[Hashable, int] = {}
+        self._t = np.empty(2 * self.cap)
+        self._u = np.empty((0, 2 * self.cap))
+        self._y = np.empty((0, 2 * self.cap))
+        self._head = 0; self._len = 0
+        self._last_keys: Tuple = ()
+        self._rows = np.empty(0, dtype=int)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _ensure_rows(self, keys: Sequence[Hashable]):
+        keys = tuple(keys)
+        if keys == self._last_keys:
+            return
+        new = [k for k in keys if k not in self.index]
+        if new:
+            for k in new:
+                self.index[k] = len(self.keys); self.keys.append(k)
+            # plantas novas entram "em branco" (NaN) no histórico já gravado
+            pad = np.full((len(new), 2 * self.cap), np.nan)
+            self._u = np.vstack([self._u, pad]); self._y = np.vstack([self._y, pad])
+        self._last_keys = keys
+        self._rows = np.array([self.index[k] for k in keys], dtype=int)
+
+    def record(self, t: float, keys: Sequence[Hashable], u: np.ndarray, y: np.ndarray):
+        """Grava um tick (``keys`` na ordem de ``u``/``y``; plantas ausentes viram NaN)."""
+        with self._lock:
+            self._ensure_rows(keys)
+            cap = self.cap
+            if self._len == cap:
+                self._head = (self._head + 1) % cap
+                self._len -= 1
+            i = (self._head + self._len) % cap
+            self._t[i] = self._t[i + cap] = t
+            col_u = np.full(len(self.keys), np.nan); col_y = np.full(len(self.keys), np.nan)
+            col_u[self._rows] = u; col_y[self._rows] = y
+            self._u[:, i] = self._u[:, i + cap] = col_u
+            self._y[:, i] = self._y[:, i + cap] = col_y
+            self._len += 1
+
+    def window(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Views ``(t (n,), u (P, n), y (P, n))`` das últimas ``n`` amostras (todas por padrão)."""
+        with self._lock:
+            n = self._len if n is None else max(0, min(int(n), self._len))
+            a = self._head + self._len - n; b = self._head + self._len
+            return self._t[a:b], self._u[:, a:b], self._y[:, a:b]
+
+    def clear(self):
+        with self._lock:
+            self._head = self._len = 0
+
+
+# ------------------------- identificação FOPDT -------------------------
+
+@dataclass
+class FopdtModel:
+    """G(s) = K·e^(-L·s) / (T·s + 1), identificado a partir de um degrau em ``t0``."""
+    K: float
+    L: float
+    T: float
+    t0: float = 0.0
+    du: float = 0.0
+
+
+def detect_steps(t: np.ndarray, U: np.ndarray, min_step: float = 0.02) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Maior degrau de cada linha de ``U`` (P, N), vetorizado:
+    devolve ``(k0, k1, du)`` — índice do degrau, fim do trecho (próximo degrau
+    ou N) e amplitude. Plantas sem degrau >= ``min_step`` ficam com ``du = 0``.
+    """
+    P, N = U.shape
+    if N < 2:
+        z = np.zeros(P, dtype=int)
+        return z, z + N, np.zeros(P)
+    dU = np.diff(np.nan_to_num(U, nan=0.0), axis=1)
+    big = np.abs(dU) >= min_step
+    j = np.argmax(np.abs(dU), axis=1)
+    rows = np.arange(P)
+    du = np.where(big[rows, j], dU[rows, j], 0.0)
+    k0 = j + 1
+    # próximo degrau após k0 encerra o trecho analisado
+    after = big & (np.arange(N - 1)[None, :] > j[:, None])
+    k1 = np.where(after.any(axis=1), np.argmax(after, axis=1) + 1, N)
+    return k0, k1, du
+
+
+def fit_fopdt(t: np.ndarray, U: np.ndarray, Y: np.ndarray, method: str = "tangent",
+              min_step: float = 0.02, tail: float = 0.05) -> List[Optional[FopdtModel]]:
+    """
+    Ajusta K, L, T para todas as plantas de uma vez (``U``/``Y`` (P, N), podem
+    ser views do ``StepRecorder``).
+
+    • ``tangent`` — procedimento do README: reta tangente no ponto de maior
+      inclinação; L e T pelas interseções com os níveis inicial e final.
+    • ``two_point`` — Smith (28,3% / 63,2%): T = 1,5·(t63 - t28), L = t63 - T;
+      menos sensível a ruído que a derivada.
+
+    ``y_final`` é a média da fração ``tail`` final do trecho. Retorna ``None``
+    para plantas sem degrau ou sem resposta.
+    """
+    if method not in ("tangent", "two_point"):
+        raise ValueError(f"método inválido: {method!r}")
+    P, N = Y.shape
+    k0, k1, du = detect_steps(t, U, min_step)
+    rows = np.arange(P)
+    idx = np.arange(N)[None, :]
+    seg = (idx >= k0[:, None]) & (idx < k1[:, None])
+
+    y0 = Y[rows, np.maximum(k0 - 1, 0)]
+    ntail = np.maximum(1, ((k1 - k0) * tail).astype(int))
+    in_tail = seg & (idx >= (k1 - ntail)[:, None])
+    yf = np.nansum(np.where(in_tail, Y, 0.0), axis=1) / ntail
+    dy = yf - y0
+    t_step = t[np.minimum(k0, N - 1)]
+
+    # resposta normalizada 0 -> 1 dentro do trecho (fora dele: NaN)
+    span = np.where(np.abs(dy) > 1e-12, dy, np.nan)
+    z = np.where(seg, (Y - y0[:, None]) / span[:, None], np.nan)
+
+    if method == "tangent":
+        dz = np.full((P, N), np.nan)
+        dt = np.diff(t)
+        dz[:, 1:] = np.diff(z, axis=1) / np.where(dt > 0, dt, np.nan)[None, :]
+        dz[:, 1:][~seg[:, :-1]] = np.nan   # derivada só entre amostras do trecho
+        dz_ok = np.where(np.isfinite(dz), dz, -np.inf)
+        i = np.argmax(dz_ok, axis=1)
+        m = dz_ok[rows, i]
+        # tangente pelo ponto médio do intervalo [i-1, i]
+        tm = 0.5 * (t[i] + t[np.maximum(i - 1, 0)])
+        zm = 0.5 * (z[rows, i] + z[rows, np.maximum(i - 1, 0)])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_a = tm - zm / m            # interseção com z = 0
+            t_b = tm + (1.0 - zm) / m    # interseção com z = 1
+        L = t_a - t_step; T = t_b - t_a
+    else:
+        def _cross(level):
+            above = np.nan_to_num(z, nan=-np.inf) >= level
+            j = np.argmax(above, axis=1)
+            jp = np.maximum(j - 1, 0)
+            za = z[rows, jp]; zb = z[rows, j]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                a = np.where((zb != za) & (j > k0), (level - za) / (zb - za), 0.0)
+            tc = t[jp] + a * (t[j] - t[jp])
+            return np.where(above.any(axis=1), np.where(j > k0, tc, t[j]), np.nan)
+        t28 = _cross(0.283); t63 = _cross(0.632)
+        T = 1.5 * (t63 - t28)
+        L = t63 - T - t_step
+
+    K = dy / np.where(du != 0, du, np.nan)
+    out: List[Optional[FopdtModel]] = []
+    for p in range(P):
+        if du[p] == 0 or not np.isfinite(K[p]) or not np.isfinite(T[p]) or T[p] <= 0:
+            out.append(None)
+            continue
+        out.append(FopdtModel(K=float(K[p]), L=float(max(0.0, L[p])), T=float(T[p]),
+                              t0=float(t_step[p]), du=float(du[p])))
+    return out
+
+
+def identify(recorder: StepRecorder, n: Optional[int] = None, **kw) -> Dict[Hashable, Optional[FopdtModel]]:
+    """``fit_fopdt`` sobre a janela do gravador, por chave de planta."""
+    t, U, Y = recorder.window(n)
+    return dict(zip(recorder.keys, fit_fopdt(t, U, Y, **kw)))
+
+
+# ------------------------- Ziegler–Nichols (malha aberta) -------------------------
+
+# Tabela do README: Kc em unidades de T/(K·L); Ti e Td em unidades de L
+ZN_TABLE = {
+    "P":   (1.0, None, None),
+    "PI":  (0.9, 3.0, None),
+    "PID": (1.2, 2.0, 0.5),
+}
+
+
+def zn_gains(model: FopdtModel, kind: str = "PID") -> Dict[str, Optional[float]]:
+    """
+    Ganhos ZN (reação ao degrau) para ``P``, ``PI`` ou ``PID``:
+    ``Kc, Ti, Td`` e a forma paralela ``Kp = Kc, Ki = Kc/Ti, Kd = Kc·Td``.
+    """
+    kind = kind.upper()
+    if kind not in ZN_TABLE:
+        raise ValueError(f"controlador inválido: {kind!r} (use {tuple(ZN_TABLE)})")
+    if model.K == 0 or model.L <= 0:
+        raise ValueError("ZN exige K != 0 e L > 0.")
+    a, b, c = ZN_TABLE[kind]
+    Kc = a * model.T / (model.K * model.L)
+    Ti = b * model.L if b is not None else None
+    Td = c * model.L if c is not None else None
+    return {"Kc": Kc, "Ti": Ti, "Td": Td,
+            "Kp": Kc, "Ki": Kc / Ti if Ti else 0.0, "Kd": Kc * Td if Td else 0.0}
+
+
+# Exemplo de uso: degrau de 10% numa FOPDT conhecida (K=2, L=1,5 s, T=4 s)
+if __name__ == '__main__':
+    from ctrl.simul_batch import simulate_models
+    Ts = 0.05; N = int(40 / Ts)
+    u = np.zeros(N); u[int(2 / Ts):] = 0.1
+    res = simulate_models([([2.0], [4.0, 1.0], 1.5)], u, horizon=N * Ts, Ts=Ts, clip=None)
+    for method in ("tangent", "two_point"):
+        m = fit_fopdt(res.t, res.u, res.y, method=method)[0]
+        print(method, m, zn_gains(m, "PID"))
@@ -0,0 +1,198 @@
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import numpy as np
+import control as ctrl
+
+from ctrl.delay_line import DelayLine
+from ctrl.tf_cache import discretize, lift, substeps_for
+
+
+# ------------------------- planta MIMO (espaço de estados único) -------------------------
+#
+# Definição gravada na tabela TFMIMO (linha = nome da planta, coluna MODEL, JSON):
+#
+#   {"inputs":  ["HART.FV100CA.percent_of_range", "HART.FV100AR.percent_of_range"],
+#    "outputs": ["HART.FIT100CA.percent_of_range", "HART.TIT100.percent_of_range"],
+#    "G": [["[1.0],[3.0 1.0],1.0", null],
+#          ["[-0.4],[5.0 1.0],1.2",  "[0.6],[5.0 1.0],1.2"]],
+#    "ts": "auto"}
+#
+# • ``G[i][j]``: elemento saída i / entrada j, na sintaxe ``num,den,atraso`` do
+#   tFunc (ou lista ``[num, den, atraso]``); ``null`` = sem acoplamento.
+# • alternativa a ``G``: ``"ss": {"A":..,"B":..,"C":..,"D":..,"delays":[..]}``
+#   contínuo (atrasos por entrada).
+# • ``ts`` opcional, mesma semântica do tFunc (segundos ou ``auto``); ``sub``
+#   idem (sub-passos de plantas rígidas, por elemento de ``G``).
+# • células referenciadas como nos Func: ``TABELA.COLUNA.LINHA``.
+
+MIMO_TABLE = "TFMIMO"
+MIMO_COLUMN = "MODEL"
+
+
+def _parse_element(el):
+    from ctrl.simul_tf import _parse_tfunc
+    if isinstance(el, str):
+        return _parse_tfunc(el)
+    num, den, *rest = el
+    return list(num), list(den), float(rest[0]) if rest else 0.0
+
+
+@dataclass
+class MimoPlant:
+    """
+    ``x[k+1] = A x[k] + B u_eff[k]``, ``y[k] = C x[k] + D u_eff[k]``.
+
+    ``u_eff`` tem um canal por par (entrada, atraso) distinto: elementos de
+    ``G`` que compartilham entrada e atraso usam a mesma ``DelayLine``.
+    """
+    name: str
+    inputs: List[str]
+    outputs: List[str]
+    A: np.ndarray; B: np.ndarray; C: np.ndarray; D: np.ndarray
+    Ts: float
+    channel_input: np.ndarray                    # canal -> índice da entrada
+    channel_delay: np.ndarray                    # canal -> atraso (s)
+    x: np.ndarray = None                         # (n,)
+    lines: List[Optional[DelayLine]] = field(default_factory=list)
+    last_u: np.ndarray = None                    # (m,)
+    ts_opt: Optional[str] = None
+    u_gain: np.ndarray = None                    # escala de entrada por canal de entrada (m,)
+    u_off: np.ndarray = None
+    u_heur: np.ndarray = None                    # True -> heurística por magnitude (origem FLOAT)
+
+    @classmethod
+    def from_spec(cls, name: str, spec: dict, Ts: float) -> "MimoPlant":
+        inputs = list(spec["inputs"]); outputs = list(spec["outputs"])
+        m, p = len(inputs), len(outputs)
+        if "ss" in spec:
+            ss = spec["ss"]
+            Ac = np.array(ss["A"], dtype=float)
+            sub = substeps_for(np.poly(Ac), Ts, spec.get("sub"))
+            sysd = ctrl.c2d(ctrl.ss(Ac, np.array(ss["B"], dtype=float),
+                                    np.array(ss["C"], dtype=float), np.array(ss["D"], dtype=float)),
+                            Ts / sub, method='tustin')
+            A = np.array(sysd.A, dtype=float); B = np.array(sysd.B, dtype=float).reshape(-1, m)
+            if sub > 1:
+                A, B = lift(A, B, sub)
+            C = np.array(sysd.C, dtype=float).reshape(p, -1); D = np.array(sysd.D, dtype=float).reshape(p, m)
+            delays = [float(v) for v in ss.get("delays", [0.0] * m)]
+            chan_in = np.arange(m); chan_L = np.array(delays)
+        else:
+            G = spec["G"]
+            if len(G) != p or any(len(row) != m for row in G):
+                raise ValueError(f"G deve ser {p}x{m} (saídas x entradas).")
+            # um bloco discreto por elemento (Tustin via cache), composto em bloco-diagonal
+            chans: Dict[Tuple[int, float], int] = {}
+            blocks = []
+            for i, row in enumerate(G):
+                for j, el in enumerate(row):
+                    if not el:
+                        continue
+                    num, den, L = _parse_element(el)
+                    c = chans.setdefault((j, round(max(0.0, L), 12)), len(chans))
+                    sub = substeps_for(den, Ts, spec.get("sub"))
+                    blocks.append((i, c) + discretize(num, den, Ts, substeps=sub))
+            n = sum(b[2].shape[0] for b in blocks); nc = len(chans)
+            A = np.zeros((n, n)); B = np.zeros((n, nc)); C = np.zeros((p, n)); D = np.zeros((p, nc))
+            o = 0
+            for i, c, Ae, Be, Ce, De in blocks:
+                ne = Ae.shape[0]
+                A[o:o + ne, o:o + ne] = Ae; B[o:o + ne, c] = Be[:, 0]
+                C[i, o:o + ne] = Ce[0]; D[i, c] += De
+                o += ne
+            chan_in = np.array([j for (j, _) in chans], dtype=int)
+            chan_L = np.array([L for (_, L) in chans], dtype=float)
+        plant = cls(name=name, inputs=inputs, outputs=outputs, A=A, B=B, C=C, D=D, Ts=float(Ts),
+                    channel_input=chan_in, channel_delay=chan_L, ts_opt=spec.get("ts"))
+        plant.x = np.zeros(A.shape[0])
+        plant.u_gain = np.ones(m); plant.u_off = np.zeros(m); plant.u_heur = np.zeros(m, dtype=bool)
+        plant.set_delays(np.zeros(m))
+        return plant
+
+    @property
+    def order(self) -> int:
+        return self.A.shape[0]
+
+    def set_delays(self, seed_u: Sequence[float]):
+        """(Re)cria as linhas de atraso dos canais, semeadas com ``seed_u`` (por entrada)."""
+        self.last_u = np.array(seed_u, dtype=float).reshape(len(self.inputs))
+        self.lines = [DelayLine(L, self.Ts, seed_u=self.last_u[j]) if L > 0 else None
+                      for j, L in zip(self.channel_input, self.channel_delay)]
+
+    def step(self, u: np.ndarray, t_now: float) -> np.ndarray:
+        self.last_u[:] = u
+        u_ch = u[self.channel_input]
+        for c, line in enumerate(self.lines):
+            if line is not None:
+                u_ch[c] = line.push(u_ch[c], t_now)
+        y = self.C @ self.x + self.D @ u_ch
+        self.x = self.A @ self.x + self.B @ u_ch
+        return y
+
+
+def spec_denominators(spec: dict) -> List[List[float]]:
+    """Denominadores contínuos da definição (para ``ts=auto``)."""
+    if "ss" in spec:
+        return [list(np.poly(np.array(spec["ss"]["A"], dtype=float)))]
+    return [_parse_element(el)[1] for row in spec["G"] for el in row if el]
+
+
+# ------------------------- persistência da definição -------------------------
+
+def load_mimo_specs(storage) -> Dict[str, dict]:
+    """Definições da tabela ``TFMIMO`` (vazio se a tabela não existir)."""
+    try:
+        names = storage.rowKeys(MIMO_TABLE)
+    except Exception:
+        return {}
+    specs = {}
+    for name in names:
+        raw = storage.getRawData(MIMO_TABLE, name, MIMO_COLUMN)
+        if not raw:
+            continue
+        try:
+            specs[name] = json.loads(raw)
+        except Exception as e:
+            print(f"[SimulTf] Definição MIMO inválida '{name}': {e}")
+    return specs
+
+
+def save_mimo_spec(storage, name: str, spec: dict):
+    storage.setRawData(MIMO_TABLE, name, MIMO_COLUMN, json.dumps(spec))
+
+
+# Exemplo de uso: acoplamento combustível/ar -> vazão e temperatura (resposta a degrau)
+if __name__ == '__main__':
+    spec = {
+        "inputs": ["HART.FV100CA.percent_of_range", "HART.FV100AR.percent_of_range"],
+        "outputs": ["HART.FIT100CA.percent_of_range", "HART.TIT100.percent_of_range"],
+        "G": [["[1.0],[3.0 1.0],1.0", None],
+              ["[0.6],[5.0 1.0],1.2", "[-0.4],[5.0 1.0],1.2"]],
+    }
+    plant = MimoPlant.from_spec("caldeira", spec, Ts=0.05)
+    u = np.array([0.5, 0.5])
+    for k in range(1, 1201):
+        y = plant.step(u, k * 0.05)
+    print(f"ordem={plant.order} canais={len(plant.channel_input)} y(60s)={np.round(y, 4)}")
+
+    # a escala de entrada resolvida na conexão sobrevive a uma troca de passo
+    from ctrl.simul_tf import SimulTf
+
+    class _Var:
+        def __init__(self, value, type_="FLOAT", size=4):
+            self._value, self._type, self._size, self.model = value, type_, size, None
+        def type(self): return self._type
+        def byteSize(self): return self._size
+
+    cells = {"HART.FV100CA.percent_of_range": _Var(32767.0, "UNSIGNED", 2),
+             "HART.FV100AR.percent_of_range": _Var(0.5),
+             "HART.FIT100CA.percent_of_range": _Var(0.0), "HART.TIT100.percent_of_range": _Var(0.0)}
+    sim = SimulTf(50, speed=None, deadband=None, sleep_tol=None, timing=False)
+    sim.mimo_connect("caldeira", spec, cells.__getitem__)
+    before = sim.mimo["caldeira"].u_gain.copy()
+    sim.set_step_time_ms(100)
+    after = sim.mimo["caldeira"].u_gain
+    print(f"u_gain antes={before} depois={after}")
+    assert np.array_equal(before, after)
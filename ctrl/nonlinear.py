@@ -0,0 +1,190 @@
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+
+
+# ------------------------- blocos não lineares (válvulas / atuadores) -------------------------
+#
+# Declarados nas opções do tFunc (campo de atraso, separadas por ``;``):
+#
+#   "[1],[2 1],0.5; valve=eqp:50; rate=0.2; stic=0.02:0.01; sat=0:0.95,@..."
+#
+# • ``valve=linear|eqp[:R]|quick[:R]``  característica inerente da válvula
+#   (igual-porcentagem ``(R^x - 1)/(R - 1)``, abertura rápida ``ln(1+(R-1)x)/ln R``)
+# • ``rate=<1/s>``        velocidade máxima da haste (fração do curso por segundo)
+# • ``hys=<w>``           histerese / folga mecânica de largura total ``w``
+# • ``stic=<S>[:<J>]``    agarramento (modelo de Choudhury simplificado): a haste
+#   só se move quando |u - haste| > S e então salta, ficando S - J atrás de u
+# • ``sat=<lo>:<hi>``     saturação da saída (padrão 0:1, o antigo ``np.clip``)
+#
+# Cadeia por planta: comando u -> histerese -> agarramento -> limite de
+# velocidade -> característica -> atraso -> planta -> saturação.
+
+LINEAR, EQUAL_PERCENTAGE, QUICK_OPENING = 0, 1, 2
+_CHARS = {"linear": LINEAR, "eqp": EQUAL_PERCENTAGE, "quick": QUICK_OPENING}
+
+
+@dataclass
+class NonlinearSpec:
+    char: int = LINEAR
+    R: float = 50.0              # rangeabilidade (eqp / quick)
+    rate: float = np.inf         # fração do curso por segundo
+    hys: float = 0.0
+    stic_S: float = 0.0
+    stic_J: float = 0.0
+    lo: float = 0.0
+    hi: float = 1.0
+
+    @property
+    def dynamic(self) -> bool:
+        """True se o bloco tem estado (haste) além da característica estática."""
+        return np.isfinite(self.rate) or self.hys > 0 or self.stic_S > 0
+
+    def static(self, u: float) -> float:
+        """Saída em regime para o comando ``u`` (haste = u), p.ex. para semear o atraso."""
+        return float(characteristic(np.array([u], dtype=float), np.array([self.char]),
+                                    np.array([self.R]))[0])
+
+
+def parse_nonlinear(opts: Dict[str, str]) -> Optional[NonlinearSpec]:
+    """``NonlinearSpec`` a partir das opções do tFunc (``None`` se nenhuma foi dada)."""
+    if not any(k in opts for k in ("valve", "rate", "hys", "stic", "sat")):
+        return None
+    spec = NonlinearSpec()
+    if "valve" in opts:
+        name, _, R = opts["valve"].lower().partition(':')
+        if name.strip() not in _CHARS:
+            raise ValueError(f"característica de válvula inválida: '{name}' (use {tuple(_CHARS)})")
+        spec.char = _CHARS[name.strip()]
+        if R:
+            spec.R = float(R)
+            if spec.R <= 1.0:
+                raise ValueError("rangeabilidade da válvula deve ser > 1.")
+    if "rate" in opts:
+        spec.rate = abs(float(opts["rate"]))
+    if "hys" in opts:
+        spec.hys = abs(float(opts["hys"]))
+    if "stic" in opts:
+        S, _, J = opts["stic"].partition(':')
+        spec.stic_S = abs(float(S))
+        spec.stic_J = min(abs(float(J)) if J else 0.0, spec.stic_S)
+    if "sat" in opts:
+        lo, sep, hi = opts["sat"].partition(':')
+        if not sep:
+            raise ValueError(f"sat inválido: '{opts['sat']}' (use lo:hi)")
+        spec.lo, spec.hi = float(lo), float(hi)
+        if spec.lo > spec.hi:
+            raise ValueError("sat: lo > hi.")
+    return spec
+
+
+def characteristic(x: np.ndarray, char: np.ndarray, R: np.ndarray) -> np.ndarray:
+    """Característica inerente por linha (``x`` em [0, 1])."""
+    out = np.array(x, dtype=float)
+    eqp = char == EQUAL_PERCENTAGE
+    if eqp.any():
+        out[eqp] = (np.power(R[eqp], x[eqp]) - 1.0) / (R[eqp] - 1.0)
+    quick = char == QUICK_OPENING
+    if quick.any():
+        out[quick] = np.log1p((R[quick] - 1.0) * x[quick]) / np.log(R[quick])
+    return out
+
+
+# ------------------------- banco vetorizado (uma linha por planta do BatchSS) -------------------------
+
+class NonlinearBank:
+    """
+    Parâmetros e estado dos blocos não lineares de todas as plantas de um
+    ``BatchSS``, em arrays paralelos às suas linhas.
+
+    ``state`` (P, 2) guarda ``[posição da haste, último comando]``; como o ``x``
+    do ``DiscreteSS``, o ``u_state`` de cada planta é uma *view* da sua linha.
+    Estágios sem nenhuma planta configurada são pulados inteiros.
+    """
+    _FIELDS = ("char", "R", "rate", "hys", "stic_S", "stic_J", "lo", "hi")
+
+    def __init__(self, capacity: int = 16):
+        self._alloc(max(1, int(capacity)), 0)
+
+    def _alloc(self, capacity: int, P: int):
+        d = NonlinearSpec()
+        new = {f: np.full(capacity, getattr(d, f), dtype=int if f == "char" else float) for f in self._FIELDS}
+        state = np.full((capacity, 2), np.nan)
+        if P:
+            for f in self._FIELDS:
+                new[f][:P] = getattr(self, f)[:P]
+            state[:P] = self.state[:P]
+        for f, arr in new.items():
+            setattr(self, f, arr)
+        self.state = state
+        self._active = None
+
+    def resize(self, capacity: int, P: int):
+        if capacity != self.state.shape[0]:
+            self._alloc(capacity, P)
+
+    def set(self, i: int, spec: Optional[NonlinearSpec], u_state=None):
+        spec = spec or NonlinearSpec()
+        for f in self._FIELDS:
+            getattr(self, f)[i] = getattr(spec, f)
+        self.state[i] = np.nan if u_state is None else np.asarray(u_state, dtype=float).reshape(2)
+        self._active = None
+
+    def move(self, dst: int, src: int):
+        for f in self._FIELDS:
+            arr = getattr(self, f)
+            arr[dst] = arr[src]
+        self.state[dst] = self.state[src]
+        self._active = None
+
+    def clear(self, i: int):
+        self.set(i, None)
+
+    def _stages(self, P: int) -> tuple:
+        if self._active is None or self._active[0] != P:
+            self._active = (P, bool((self.char[:P] != LINEAR).any()), bool(np.isfinite(self.rate[:P]).any()),
+                            bool((self.hys[:P] > 0).any()), bool((self.stic_S[:P] > 0).any()),
+                            bool(((self.lo[:P] != 0.0) | (self.hi[:P] != 1.0)).any()))
+        return self._active[1:]
+
+    def apply(self, u: np.ndarray, dt: float, P: int) -> np.ndarray:
+        """Comandos ``u`` (P,) em [0, 1] -> entrada da planta, avançando o estado da haste em ``dt``."""
+        char, rate, hys, stic, _ = self._stages(P)
+        pos = self.state[:P, 0]
+        self.state[:P, 1] = u
+        if not (rate or hys or stic):
+            pos[:] = u
+        else:
+            fresh = np.isnan(pos)
+            pos[fresh] = u[fresh]
+            target = u
+            if hys:
+                half = 0.5 * self.hys[:P]
+                target = np.clip(pos, target - half, target + half)
+            if stic:
+                S = self.stic_S[:P]
+                d = target - pos
+                slip = np.abs(d) > S
+                target = np.where(S > 0, np.where(slip, target - np.sign(d) * (S - self.stic_J[:P]), pos), target)
+            if rate:
+                step = self.rate[:P] * dt
+                target = np.clip(target, pos - step, pos + step)
+            pos[:] = target
+        return characteristic(pos, self.char[:P], self.R[:P]) if char else pos.copy()
+
+    def saturate(self, y: np.ndarray, P: int) -> np.ndarray:
+        """Saturação de saída por linha (em ``y``, no lugar)."""
+        if self._stages(P)[4]:
+            return np.clip(y, self.lo[:P], self.hi[:P], out=y)
+        return np.clip(y, 0.0, 1.0, out=y)
+
+
+# Exemplo de uso: válvula igual-porcentagem com agarramento seguindo uma rampa lenta
+if __name__ == '__main__':
+    bank = NonlinearBank(2)
+    bank.set(0, parse_nonlinear({"valve": "linear"}))
+    bank.set(1, parse_nonlinear({"valve": "eqp:50", "stic": "0.05:0.05", "rate": "0.5"}))
+    for k in range(0, 101, 10):
+        u = np.full(2, k / 100.0)
+        print(f"u={u[0]:.2f} -> {np.round(bank.apply(u, 0.1, 2), 4)}")
@@ -0,0 +1,85 @@
+
+from typing import Optional, Tuple
+import numpy as np
+
+
+# ------------------------- predição N passos à frente -------------------------
+#
+# Para x[k+1] = A x[k] + B u[k], y[k] = C x[k] + D u[k]:
+#
+#   y[k+j] = C A^j x[k] + Σ_{i=0..j} h[j-i] u[k+i],   h[0] = D, h[m] = C A^(m-1) B
+#
+# Empilhando j = 0..N-1:  Y = Φ x + Γ U, com Φ (N, n) = [C A^j] e Γ (N, N)
+# Toeplitz triangular inferior dos parâmetros de Markov. Com Φ e Γ em cache, a
+# predição de todas as plantas é uma ``einsum``.
+
+
+def markov_matrices(A: np.ndarray, B: np.ndarray, C: np.ndarray, D: np.ndarray,
+                    N: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ``Φ`` (P, N, n) e parâmetros de Markov ``h`` (P, N) para plantas empacotadas
+    (``A`` (P, n, n), ``B``/``C`` (P, n), ``D`` (P,)) — N produtos em lote.
+    """
+    P, n = C.shape
+    Phi = np.empty((P, N, n)); h = np.empty((P, N))
+    h[:, 0] = D
+    CA = np.array(C, dtype=float)
+    for j in range(N):
+        Phi[:, j] = CA
+        if j + 1 < N:
+            h[:, j + 1] = np.einsum('pn,pn->p', CA, B)
+            CA = np.einsum('pn,pnm->pm', CA, A)
+    return Phi, h
+
+
+def toeplitz_lower(h: np.ndarray) -> np.ndarray:
+    """``Γ`` (P, N, N) com ``Γ[p, j, i] = h[p, j - i]`` para i <= j (zero acima)."""
+    N = h.shape[1]
+    j, i = np.indices((N, N))
+    return np.where(i <= j, h[:, np.clip(j - i, 0, N - 1)], 0.0)
+
+
+def delayed_future(line, u_seq: np.ndarray, Ts: float) -> np.ndarray:
+    """
+    Entradas efetivas dos próximos N passos de uma planta com atraso: a janela
+    da ``DelayLine`` seguida de ``u_seq`` nos instantes futuros ``t_last + (j+1)·Ts``,
+    interpolada em ``t_j - L`` (mesma semântica do ``push``).
+    """
+    if line is None:
+        return u_seq
+    win = line.snapshot()
+    N = len(u_seq)
+    t_last = float(win[-1, 0]) if len(win) else 0.0
+    t_fut = t_last + Ts * np.arange(1, N + 1)
+    ts = np.concatenate([win[:, 0], t_fut]); us = np.concatenate([win[:, 1], u_seq])
+    return np.interp(t_fut - line.delay_L, ts, us)
+
+
+def stack_systems(systems) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """``A, B, C, D, X`` empacotados (com padding, como no ``BatchSS``) de uma lista de ``DiscreteSS``."""
+    P = len(systems)
+    n = max([d.A.shape[0] for d in systems] + [0])
+    A = np.zeros((P, n, n)); B = np.zeros((P, n)); C = np.zeros((P, n)); D = np.zeros(P); X = np.zeros((P, n))
+    for p, d in enumerate(systems):
+        m = d.A.shape[0]
+        A[p, :m, :m] = d.A; B[p, :m] = np.ravel(d.B); C[p, :m] = np.ravel(d.C)
+        D[p] = float(d.D); X[p, :m] = np.ravel(d.x)
+    return A, B, C, D, X
+
+
+def predict(Phi: np.ndarray, Gam: np.ndarray, X: np.ndarray, U_eff: np.ndarray,
+            clip: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """``Y = Φ x + Γ u`` para todas as plantas: (P, N)."""
+    Y = np.einsum('pjn,pn->pj', Phi, X) + np.einsum('pji,pi->pj', Gam, U_eff)
+    if clip is not None:
+        np.clip(Y, clip[0], clip[1], out=Y)
+    return Y
+
+
+# Exemplo de uso: 1ª ordem (τ = 3 s) discretizada a 50 ms, degrau de 0 -> 1
+if __name__ == '__main__':
+    from ctrl.tf_cache import discretize
+    A, B, C, D = discretize([1.0], [3.0, 1.0], 0.05)
+    Phi, h = markov_matrices(A[None], B.reshape(1, -1), C.reshape(1, -1), np.array([D]), 200)
+    Y = predict(Phi, toeplitz_lower(h), np.zeros((1, A.shape[0])), np.ones((1, 200)))
+    print(f"y(3s)={Y[0, 59]:.4f} (1 - e^-1 = {1 - np.exp(-1):.4f})  y(10s)={Y[0, -1]:.4f}")
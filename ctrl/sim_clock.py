@@ -0,0 +1,66 @@
+
+from typing import Optional
+import time
+
+
+# ------------------------- relógio do simulador -------------------------
+
+class SimClock:
+    """
+    Relógio do ``SimulTf``.
+
+    • ``speed == 1.0`` (padrão): **tempo real** — ``now()`` é o tempo monotônico
+      decorrido desde ``reset()``.
+    • ``speed > 0`` e ``!= 1.0``: **virtual** — cada tick avança exatamente ``Ts``
+      de tempo simulado e o agendador dispara um tick a cada ``Ts/speed`` de
+      parede (10x, 100x, ...).
+    • ``speed is None`` ou ``<= 0``: **o mais rápido possível** — tempo virtual,
+      ticks encadeados sem espera.
+
+    No modo virtual o tempo dado aos ``DiscreteSS`` não depende do jitter do
+    agendador: o tick ``k`` sempre vê ``t = k·Ts``.
+    """
+    def __init__(self, speed: Optional[float] = 1.0):
+        # sem passar por set_speed: no modo virtual o tempo começa exatamente em 0
+        self.speed: Optional[float] = None if speed is None or float(speed) <= 0 else float(speed)
+        self._t0_wall: Optional[float] = None
+        self._t_sim = 0.0
+
+    def set_speed(self, speed: Optional[float]):
+        """Troca o modo sem descontinuidade no tempo simulado."""
+        t = self.now()
+        self.speed = None if speed is None or float(speed) <= 0 else float(speed)
+        self._t_sim = t
+        self._t0_wall = time.monotonic() - t
+
+    @property
+    def virtual(self) -> bool:
+        return self.speed != 1.0
+
+    @property
+    def as_fast_as_possible(self) -> bool:
+        return self.speed is None
+
+    def reset(self):
+        self._t_sim = 0.0
+        self._t0_wall = time.monotonic()
+
+    def now(self) -> float:
+        if self.virtual:
+            return self._t_sim
+        if self._t0_wall is None:
+            self._t0_wall = time.monotonic()
+        return time.monotonic() - self._t0_wall
+
+    def tick(self, Ts: float) -> float:
+        """Instante do tick corrente (no modo virtual, avança ``Ts`` antes)."""
+        if self.virtual:
+            self._t_sim += Ts
+            return self._t_sim
+        return self.now()
+
+    def interval_ms(self, step_ms: float) -> float:
+        """Período de parede entre ticks para um passo simulado de ``step_ms``."""
+        if self.speed is None:
+            return 0.0
+        return float(step_ms) / self.speed
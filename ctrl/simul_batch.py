@@ -0,0 +1,117 @@
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple, Union
+import numpy as np
+from scipy import signal
+
+from ctrl.simul_tf import _parse_tfunc
+
+
+# ------------------------- simulação offline (não tempo-real) -------------------------
+
+Model = Tuple[Sequence[float], Sequence[float], float]   # (num, den, delay_L)
+
+
+@dataclass
+class BatchResult:
+    """Trajetórias completas de uma simulação offline."""
+    t: np.ndarray      # (N,)   instantes k·Ts
+    u: np.ndarray      # (P, N) entradas aplicadas (antes do atraso)
+    y: np.ndarray      # (P, N) saídas
+
+
+def _as_inputs(u, P: int, N: int) -> np.ndarray:
+    """Escalar, (N,), (P,) ou (P, M) -> (P, N); trajetórias curtas seguram o último valor."""
+    arr = np.asarray(u, dtype=float)
+    if arr.ndim == 0:
+        return np.full((P, N), float(arr))
+    if arr.ndim == 1:
+        arr = arr.reshape(P, 1) if arr.size == P and P != N else np.broadcast_to(arr, (P, arr.size))
+    if arr.shape[0] != P:
+        raise ValueError(f"u com {arr.shape[0]} linhas para {P} plantas.")
+    M = arr.shape[1]
+    if M >= N:
+        return np.array(arr[:, :N])
+    return np.hstack([arr, np.repeat(arr[:, -1:], N - M, axis=1)])
+
+
+def _delay_inputs(U: np.ndarray, delays: np.ndarray, Ts: float, u_init: np.ndarray) -> np.ndarray:
+    """
+    u(t_k - L) para todas as plantas de uma vez: deslocamento inteiro
+    ``m = floor(L/Ts)`` + interpolação linear na fração (mesma semântica da
+    ``DelayLine``); antes de t=0 vale ``u_init``.
+    """
+    P, N = U.shape
+    d = np.maximum(delays, 0.0) / Ts
+    m = np.floor(d + 1e-9).astype(int)
+    f = np.clip(d - m, 0.0, 1.0)[:, None]
+    k = np.arange(N)[None, :]
+    i1 = k - m[:, None]; i0 = i1 - 1
+    rows = np.arange(P)[:, None]
+    init = u_init[:, None]
+    u1 = np.where(i1 >= 0, U[rows, np.clip(i1, 0, N - 1)], init)
+    u0 = np.where(i0 >= 0, U[rows, np.clip(i0, 0, N - 1)], init)
+    return (1.0 - f) * u1 + f * u0
+
+
+def _filter_coeffs(num, den, Ts: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (b, a) discretos por Tustin aplicado direto aos polinômios (``bilinear``):
+    mesma resposta do ``DiscreteSS`` (tf2ss + c2d Tustin), mas em microssegundos
+    — varreduras com milhares de modelos distintos não passam pelo python-control.
+    """
+    b, a = signal.bilinear(np.atleast_1d(np.asarray(num, dtype=float)),
+                           np.atleast_1d(np.asarray(den, dtype=float)), fs=1.0 / Ts)
+    return np.atleast_1d(b), np.atleast_1d(a)
+
+
+def simulate_models(models: Sequence[Model], u, horizon: float, Ts: float = 0.05,
+                    u_init: Union[float, Sequence[float]] = 0.0,
+                    clip: Optional[Tuple[float, float]] = (0.0, 1.0)) -> BatchResult:
+    """
+    Simula ``P`` modelos ``(num, den, delay_L)`` por ``horizon`` segundos, a
+    partir do repouso, sem laço Python por tick: atraso aplicado em bloco e
+    cada planta filtrada inteira por ``scipy.signal.lfilter`` (plantas com o
+    mesmo modelo discreto são filtradas juntas, ao longo do eixo do tempo).
+
+    ``u`` aceita escalar, (N,), (P,) ou (P, M). ``clip`` reproduz o
+    ``np.clip(y, 0, 1)`` do ``SimulTf`` (``None`` devolve a resposta linear).
+    """
+    P = len(models)
+    N = max(1, int(round(float(horizon) / Ts)))
+    U = _as_inputs(u, P, N)
+    u0 = np.broadcast_to(np.asarray(u_init, dtype=float), (P,)).astype(float)
+    delays = np.array([float(m[2]) for m in models])
+    U_eff = _delay_inputs(U, delays, Ts, u0)
+
+    Y = np.empty((P, N))
+    groups: Dict[tuple, list] = {}
+    for i, (num, den, _) in enumerate(models):
+        groups.setdefault((tuple(num), tuple(den)), []).append(i)
+    for (num, den), idx in groups.items():
+        b, a = _filter_coeffs(num, den, Ts)
+        Y[idx] = signal.lfilter(b, a, U_eff[idx], axis=-1)
+
+    if clip is not None:
+        np.clip(Y, clip[0], clip[1], out=Y)
+    return BatchResult(t=np.arange(N) * Ts, u=U, y=Y)
+
+
+def simulate_tfuncs(tfuncs: Sequence[str], u, horizon: float, Ts: float = 0.05,
+                    u_init: Union[float, Sequence[float]] = 0.0,
+                    clip: Optional[Tuple[float, float]] = (0.0, 1.0)) -> BatchResult:
+    """Como ``simulate_models``, mas a partir de strings tFunc (``_parse_tfunc``)."""
+    models = [_parse_tfunc(tf) for tf in tfuncs]
+    return simulate_models(models, u, horizon, Ts=Ts, u_init=u_init, clip=clip)
+
+
+# Exemplo de uso: degrau de 50% em todas as plantas tFunc do template HART
+if __name__ == '__main__':
+    from db.db_template import hrt_banco
+    cols = ['FV100CA', 'FIT100CA', 'FV100AR', 'FIT100AR', 'TIT100', 'FIT100V',
+            'PIT100V', 'LIT100', 'PIT100A', 'FV100A', 'FIT100A']
+    cells = dict(zip(cols, hrt_banco['percent_of_range'][2:]))
+    tags = [c for c, v in cells.items() if str(v).startswith('$')]
+    res = simulate_tfuncs([cells[c][1:] for c in tags], u=0.5, horizon=60.0)
+    for tag, y in zip(tags, res.y):
+        print(f"{tag:>9}: y(10s)={y[int(10 / 0.05)]:.4f}  y(60s)={y[-1]:.4f}")
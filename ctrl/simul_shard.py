@@ -0,0 +1,274 @@
+
+from multiprocessing import shared_memory
+from typing import Dict, Hashable, List, Optional, Tuple
+import multiprocessing as mp
+import numpy as np
+
+
+# ------------------------- SimulTf fragmentado em processos -------------------------
+#
+# O processo principal só junta entradas e publica saídas; cada worker roda um
+# ``SimulTf`` próprio (modo virtual, sem agendador) com a sua fatia das plantas e
+# avança um tick quando recebe ``("tick", ...)``.
+#
+# E/S por ``multiprocessing.shared_memory``, um slot por célula (tabela, linha, coluna):
+#   • ``inp``  (cap,) f8  — inputValue bruto, escrito pelo principal antes do tick
+#   • ``out``  (cap,) f8  — saída publicada pelo worker
+#   • ``flag`` (cap,) u1  — 0 sem saída, 1 atualizou abaixo da banda morta, 2 emitir
+
+FLAG_NONE, FLAG_UPDATE, FLAG_EMIT = 0, 1, 2
+
+
+class SharedIO:
+    """Arrays ``inp``/``out``/``flag`` sobre três segmentos de memória compartilhada."""
+    def __init__(self, capacity: int, names: Optional[Tuple[str, str, str]] = None):
+        self.capacity = int(capacity)
+        self.owner = names is None
+        sizes = (8 * self.capacity, 8 * self.capacity, self.capacity)
+        if self.owner:
+            self._shm = [shared_memory.SharedMemory(create=True, size=max(1, n)) for n in sizes]
+        else:
+            self._shm = [shared_memory.SharedMemory(name=n) for n in names]
+        self.inp = np.ndarray(self.capacity, dtype=float, buffer=self._shm[0].buf)
+        self.out = np.ndarray(self.capacity, dtype=float, buffer=self._shm[1].buf)
+        self.flag = np.ndarray(self.capacity, dtype=np.uint8, buffer=self._shm[2].buf)
+        if self.owner:
+            self.inp[:] = 0.0; self.out[:] = np.nan; self.flag[:] = FLAG_NONE
+
+    @property
+    def names(self) -> Tuple[str, str, str]:
+        return tuple(s.name for s in self._shm)
+
+    def close(self):
+        del self.inp, self.out, self.flag
+        for shm in self._shm:
+            shm.close()
+            if self.owner:
+                shm.unlink()
+
+
+# ------------------------- lado do worker -------------------------
+
+class _EmitFlag:
+    """Substitui ``valueChangedSignal``: ``emit`` só marca o slot."""
+    def emit(self, var):
+        var.io.flag[var.slot] = FLAG_EMIT
+
+
+class SlotVar:
+    """
+    Stand-in de ``ReactVar`` dentro do worker: ``inputValue`` lê ``inp[slot]``,
+    atribuir ``_value`` escreve ``out[slot]``. ``input_source`` e ``output_type``
+    (TYPE, BYTE_SIZE) vêm resolvidos do processo principal (escala e banda
+    morta ``auto``).
+    """
+    valueChangedSignal = _EmitFlag()
+
+    def __init__(self, io: SharedIO, slot: int, key: Tuple[str, str, str], tfunc: str,
+                 input_source: Optional[Tuple[str, int]] = None,
+                 output_type: Optional[Tuple[str, int]] = None):
+        self.io = io; self.slot = slot
+        self.tableName, self.rowName, self.colName = key
+        self._tfunc = tfunc
+        self.input_source = input_source
+        self._type, self._byte_size = output_type or (None, None)
+
+    def getTFunc(self) -> str:
+        return self._tfunc
+
+    def type(self):
+        return self._type
+
+    def byteSize(self):
+        return self._byte_size
+
+    @property
+    def inputValue(self) -> float:
+        return float(self.io.inp[self.slot])
+
+    @property
+    def _value(self) -> float:
+        return float(self.io.out[self.slot])
+
+    @_value.setter
+    def _value(self, v: float):
+        self.io.out[self.slot] = v
+        if self.io.flag[self.slot] == FLAG_NONE:
+            self.io.flag[self.slot] = FLAG_UPDATE
+
+
+def _worker_main(conn, names, capacity: int, step_ms: int, kw: dict):
+    from ctrl.simul_tf import SimulTf
+    io = SharedIO(capacity, names)
+    sim = SimulTf(step_ms, speed=None, **kw)
+    slots: Dict[int, SlotVar] = {}
+    try:
+        while True:
+            cmd, *args = conn.recv()
+            if cmd == "tick":
+                substeps, dirty = args
+                for slot in dirty:
+                    var = slots.get(slot)
+                    if var is not None:
+                        sim._on_input_changed(var)
+                sim._simulation_step(substeps)
+                conn.send(None)
+            elif cmd == "connect":
+                slot, key, tfunc, source, out_type = args
+                var = slots[slot] = SlotVar(io, slot, key, tfunc, source, out_type)
+                sim.tfConnect(var, True)
+                conn.send(tuple(key) in sim.systems)
+            elif cmd == "disconnect":
+                var = slots.pop(args[0], None)
+                if var is not None:
+                    sim.tfConnect(var, False)
+                conn.send(None)
+            elif cmd == "call":
+                name, a = args
+                conn.send(getattr(sim, name)(*a))
+            elif cmd == "stop":
+                conn.send(None)
+                break
+    finally:
+        io.close()
+
+
+# ------------------------- lado do processo principal -------------------------
+
+class ShardPool:
+    """
+    ``workers`` processos (``spawn``), cada um com um ``SimulTf`` e uma fatia
+    das plantas SISO (a planta vai para o worker com menos plantas).
+
+    ``tick`` escreve as entradas brutas de todos os slots, dispara o passo em
+    todos os workers ao mesmo tempo e devolve as saídas no formato de
+    publicação do ``SimulTf`` (chaves, vars, y, emit).
+    """
+    def __init__(self, workers: int, step_ms: int, capacity: int = 4096, **kw):
+        self.io = SharedIO(capacity)
+        ctx = mp.get_context("spawn")
+        self._conns = []; self._procs = []
+        for w in range(max(1, int(workers))):
+            parent, child = ctx.Pipe()
+            wkw = dict(kw)
+            if wkw.get("seed") is not None:
+                wkw["seed"] = int(wkw["seed"]) + w   # fluxos distintos e reprodutíveis por worker
+            p = ctx.Process(target=_worker_main, args=(child, self.io.names, capacity, int(step_ms), wkw),
+                            name=f"SimulTfShard{w}", daemon=True)
+            p.start()
+            self._conns.append(parent); self._procs.append(p)
+        self.slot: Dict[Hashable, int] = {}
+        self.owner: Dict[Hashable, int] = {}           # chave -> índice do worker
+        self.vars: Dict[Hashable, object] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._load = [0] * len(self._conns)
+        self._order: Tuple[list, np.ndarray, list] = ([], np.empty(0, dtype=int), [])
+        self._dirty: List[set] = [set() for _ in self._conns]
+
+    @property
+    def workers(self) -> int:
+        return len(self._conns)
+
+    def _request(self, w: int, *msg):
+        self._conns[w].send(msg)
+        return self._conns[w].recv()
+
+    def _broadcast(self, *msg) -> list:
+        for c in self._conns:
+            c.send(msg)
+        return [c.recv() for c in self._conns]
+
+    def call(self, name: str, *args) -> list:
+        """Chama ``SimulTf.<name>(*args)`` em todos os workers; resultados por worker."""
+        return self._broadcast("call", name, args)
+
+    def _reindex(self):
+        keys = list(self.slot)
+        self._order = (keys, np.array([self.slot[k] for k in keys], dtype=int), [self.vars[k] for k in keys])
+
+    def connect(self, key, var, tfunc: str, input_source=None) -> bool:
+        """Conecta a planta ``key`` (saída ``var``) no worker menos carregado."""
+        if key in self.slot:
+            self.disconnect(key)
+        if not self._free:
+            print(f"[SimulTf] Memória compartilhada cheia ({self.io.capacity} slots): {key} não conectada.")
+            return False
+        slot = self._free.pop()
+        w = min(range(self.workers), key=self._load.__getitem__)
+        self.io.inp[slot] = float(var.inputValue) if var.inputValue is not None else 0.0
+        self.io.flag[slot] = FLAG_NONE
+        try:
+            out_type = (var.type(), var.byteSize())
+        except Exception:
+            out_type = None
+        if not self._request(w, "connect", slot, tuple(key), tfunc, input_source, out_type):
+            self._free.append(slot)
+            return False
+        self.slot[key] = slot; self.owner[key] = w; self.vars[key] = var
+        self._load[w] += 1
+        self._reindex()
+        return True
+
+    def disconnect(self, key):
+        slot = self.slot.pop(key, None)
+        if slot is None:
+            return
+        w = self.owner.pop(key); self.vars.pop(key, None)
+        self._request(w, "disconnect", slot)
+        self._load[w] -= 1
+        self.io.flag[slot] = FLAG_NONE
+        self._free.append(slot)
+        self._reindex()
+
+    def mark_dirty(self, key):
+        """Entrada alterada (``inputChangedSignal``): acorda a planta no worker no próximo tick."""
+        w = self.owner.get(key)
+        if w is not None:
+            self._dirty[w].add(self.slot[key])
+
+    def tick(self, substeps: int = 1):
+        keys, slots, out_vars = self._order
+        if not keys:
+            return None
+        io = self.io
+        io.inp[slots] = np.fromiter(((v.inputValue or 0.0) for v in out_vars), dtype=float, count=len(keys))
+        for w, c in enumerate(self._conns):
+            dirty, self._dirty[w] = list(self._dirty[w]), set()
+            c.send(("tick", int(substeps), dirty))
+        for c in self._conns:
+            c.recv()
+        flags = io.flag[slots]
+        rows = np.flatnonzero(flags)
+        if not rows.size:
+            return None
+        y = io.out[slots[rows]].copy()
+        emit = flags[rows] == FLAG_EMIT
+        io.flag[slots[rows]] = FLAG_NONE
+        return [keys[i] for i in rows], [out_vars[i] for i in rows], y, emit
+
+    def set_seed(self, seed: Optional[int]):
+        for w in range(self.workers):
+            self._request(w, "call", "set_seed", (None if seed is None else int(seed) + w,))
+
+    def snapshot_states(self) -> Dict[str, bytes]:
+        blobs = {}
+        for part in self.call("snapshot_states"):
+            blobs.update(part)
+        return blobs
+
+    def stats(self) -> Dict[str, int]:
+        """Soma de ``plant_stats`` dos workers."""
+        total: Dict[str, int] = {}
+        for part in self.call("plant_stats"):
+            for k, v in part.items():
+                total[k] = total.get(k, 0) + v
+        return total
+
+    def close(self):
+        try:
+            self._broadcast("stop")
+        except Exception:
+            pass
+        for p in self._procs:
+            p.join(timeout=2.0)
+        self.io.close()
@@ -0,0 +1,215 @@
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import freeze_support, shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import itertools
+import os
+import numpy as np
+
+from ctrl.simul_batch import simulate_models
+from ctrl.simul_tf import _parse_tfunc
+
+
+# ------------------------- varredura de parâmetros / Monte Carlo -------------------------
+
+Model = Tuple[List[float], List[float], float]   # (num, den, delay_L)
+METRICS = ("iae", "overshoot", "settling_time")
+
+
+def hart_tfuncs(storage, table: str = "HART", row: str = "percent_of_range") -> Dict[str, str]:
+    """tFuncs ('$...') gravadas na tabela HART, por coluna (tag do transmissor)."""
+    out = {}
+    for col in storage.colKeys(table):
+        raw = storage.getRawData(table, row, col)
+        if isinstance(raw, str) and raw.startswith('$'):
+            out[col] = raw[1:]
+    return out
+
+
+def perturb_model(model: Model, k_gain: float = 1.0, k_tau: float = 1.0, k_delay: float = 1.0) -> Model:
+    """
+    Escala ganho, constantes de tempo e atraso de ``(num, den, L)``:
+    • ganho: ``num · k_gain``
+    • constantes de tempo: ``s -> k_tau·s`` (coef. de s^i multiplicado por k_tau^i;
+      o ganho DC não muda)
+    • atraso: ``L · k_delay``
+    """
+    num, den, L = model
+    def _scale(poly):
+        n = len(poly) - 1
+        return [float(c) * k_tau ** (n - i) for i, c in enumerate(poly)]
+    return ([c * k_gain for c in _scale(num)], _scale(den), float(L) * k_delay)
+
+
+@dataclass
+class SweepResult:
+    """Cenários (base, k_gain, k_tau, k_delay) e métricas por cenário."""
+    tags: List[str]
+    base: np.ndarray                 # (S,) índice da planta base em ``tags``
+    factors: np.ndarray              # (S, 3) k_gain, k_tau, k_delay
+    metrics: Dict[str, np.ndarray]   # nome -> (S,)
+    summary: Dict[str, Dict[str, Dict[str, float]]] = field(default_factory=dict)
+
+
+# ------------------------- métricas vetorizadas -------------------------
+
+def step_metrics(y: np.ndarray, ref: np.ndarray, Ts: float, band: float = 0.02) -> Dict[str, np.ndarray]:
+    """
+    Métricas por linha de ``y`` (S, N):
+    • ``iae``: ∫|y - ref| dt
+    • ``overshoot``: (máx(y) - y_final)/|y_final - y_0| (fração; 0 sem sobressinal)
+    • ``settling_time``: último instante fora da faixa ±band·|Δy| em torno de y_final
+    """
+    iae = np.abs(y - ref).sum(axis=1) * Ts
+    y0 = y[:, 0]; yf = y[:, -1]
+    span = np.abs(yf - y0)
+    safe = np.where(span > 1e-12, span, 1.0)
+    direction = np.sign(yf - y0)
+    peak = np.where(direction >= 0, y.max(axis=1) - yf, yf - y.min(axis=1))
+    overshoot = np.where(span > 1e-12, np.maximum(peak, 0.0) / safe, 0.0)
+    outside = np.abs(y - yf[:, None]) > band * safe[:, None]
+    N = y.shape[1]
+    last_out = N - 1 - np.argmax(outside[:, ::-1], axis=1)
+    settling = np.where(outside.any(axis=1), (last_out + 1) * Ts, 0.0)
+    return {"iae": iae, "overshoot": overshoot, "settling_time": settling}
+
+
+# ------------------------- worker (processo filho) -------------------------
+
+def _attach(name: str, shape, dtype=float):
+    """Anexa (sem copiar) um segmento criado pelo processo pai; só o pai faz unlink."""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _run_chunk(args) -> Tuple[int, Dict[str, np.ndarray]]:
+    (start, models, base_idx, shm_u, shm_r, shape, Ts, clip) = args
+    shm1, U = _attach(shm_u, shape)
+    shm2, R = _attach(shm_r, shape)
+    try:
+        res = simulate_models(models, U[base_idx], horizon=shape[1] * Ts, Ts=Ts,
+                              clip=clip)
+        return start, step_metrics(res.y, R[base_idx], Ts)
+    finally:
+        del U, R
+        shm1.close(); shm2.close()
+
+
+# ------------------------- API -------------------------
+
+class SweepRunner:
+    """
+    Varre ganho / constante de tempo / atraso das tFuncs em milhares de
+    cenários, em paralelo (``ProcessPoolExecutor``).
+
+    As trajetórias de entrada (uma por planta base) e as respostas de
+    referência (por padrão, a do modelo nominal) vão para
+    ``multiprocessing.shared_memory``; os workers só recebem índices/modelos
+    e devolvem as métricas agregadas de cada lote.
+
+    Num executável congelado (PyInstaller), o ponto de entrada precisa chamar
+    ``multiprocessing.freeze_support()`` antes de ``run`` (``main.py`` já chama).
+    """
+    def __init__(self, tfuncs: Dict[str, str], Ts: float = 0.05,
+                 clip: Optional[Tuple[float, float]] = (0.0, 1.0)):
+        self.tags = list(tfuncs)
+        self.models: List[Model] = [_parse_tfunc(tfuncs[t]) for t in self.tags]
+        self.Ts = float(Ts)
+        self.clip = clip
+
+    @classmethod
+    def from_storage(cls, storage, table: str = "HART", **kw) -> "SweepRunner":
+        return cls(hart_tfuncs(storage, table), **kw)
+
+    # --------- geração de cenários ---------
+
+    @staticmethod
+    def grid(gains: Iterable[float] = (1.0,), taus: Iterable[float] = (1.0,),
+             delays: Iterable[float] = (1.0,)) -> np.ndarray:
+        """Produto cartesiano de fatores -> (S, 3)."""
+        return np.array(list(itertools.product(gains, taus, delays)), dtype=float)
+
+    @staticmethod
+    def monte_carlo(n: int, sigma: Tuple[float, float, float] = (0.2, 0.2, 0.3),
+                    seed: Optional[int] = None) -> np.ndarray:
+        """Fatores log-normais (mediana 1) -> (n, 3); ``seed`` para reprodutibilidade."""
+        rng = np.random.default_rng(seed)
+        return np.exp(rng.standard_normal((int(n), 3)) * np.asarray(sigma, dtype=float))
+
+    # --------- execução ---------
+
+    def run(self, factors: np.ndarray, u, horizon: float, tags: Optional[Sequence[str]] = None,
+            reference=None, workers: Optional[int] = None, chunk: int = 256) -> SweepResult:
+        """
+        Aplica cada linha de ``factors`` (k_gain, k_tau, k_delay) a cada planta
+        de ``tags`` (todas por padrão) com a entrada ``u`` (escalar, (N,) ou
+        (B, N) por planta base) durante ``horizon`` segundos.
+
+        ``reference`` (B, N) substitui a resposta nominal no cálculo do IAE.
+        ``workers=0`` roda no processo atual (depuração).
+        """
+        tags = list(tags) if tags is not None else self.tags
+        base_models = [self.models[self.tags.index(t)] for t in tags]
+        B = len(tags); N = max(1, int(round(float(horizon) / self.Ts)))
+        factors = np.atleast_2d(np.asarray(factors, dtype=float))
+
+        nominal = simulate_models(base_models, u, horizon, Ts=self.Ts, clip=self.clip)
+        U = nominal.u
+        R = nominal.y if reference is None else np.broadcast_to(np.asarray(reference, dtype=float), (B, N))
+
+        base = np.repeat(np.arange(B), len(factors))
+        fac = np.tile(factors, (B, 1))
+        models = [perturb_model(base_models[b], *f) for b, f in zip(base, fac)]
+        S = len(models)
+
+        shm_u = shared_memory.SharedMemory(create=True, size=max(1, U.nbytes))
+        shm_r = shared_memory.SharedMemory(create=True, size=max(1, U.nbytes))
+        try:
+            np.ndarray(U.shape, dtype=float, buffer=shm_u.buf)[...] = U
+            np.ndarray(U.shape, dtype=float, buffer=shm_r.buf)[...] = R
+            jobs = [(i, models[i:i + chunk], base[i:i + chunk], shm_u.name, shm_r.name,
+                     U.shape, self.Ts, self.clip) for i in range(0, S, chunk)]
+            metrics = {m: np.empty(S) for m in METRICS}
+            if workers == 0:
+                results = map(_run_chunk, jobs)
+                self._collect(results, metrics)
+            else:
+                with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+                    self._collect(ex.map(_run_chunk, jobs), metrics)
+        finally:
+            shm_u.close(); shm_u.unlink()
+            shm_r.close(); shm_r.unlink()
+
+        result = SweepResult(tags=tags, base=base, factors=fac, metrics=metrics)
+        result.summary = self.summarize(result)
+        return result
+
+    @staticmethod
+    def _collect(results, metrics: Dict[str, np.ndarray]):
+        for start, chunk_metrics in results:
+            for name, values in chunk_metrics.items():
+                metrics[name][start:start + len(values)] = values
+
+    @staticmethod
+    def summarize(result: SweepResult) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Média, p5, p95 e máximo de cada métrica por planta base."""
+        out = {}
+        for b, tag in enumerate(result.tags):
+            sel = result.base == b
+            out[tag] = {
+                name: {"mean": float(v[sel].mean()), "p5": float(np.percentile(v[sel], 5)),
+                       "p95": float(np.percentile(v[sel], 95)), "max": float(v[sel].max())}
+                for name, v in result.metrics.items() if sel.any()
+            }
+        return out
+
+
+# Exemplo de uso: robustez das plantas do banco a ±20% de ganho/τ e ±30% de atraso
+if __name__ == '__main__':
+    freeze_support()   # workers do ProcessPoolExecutor num executável congelado
+    from db.db_storage import DBStorage
+    runner = SweepRunner.from_storage(DBStorage('db/banco.db'))
+    res = runner.run(SweepRunner.monte_carlo(2000, seed=1), u=0.5, horizon=60.0)
+    for tag, summ in res.summary.items():
+        print(tag, {k: round(v["p95"], 3) for k, v in summ.items()})
@@ -1,20 +1,32 @@
 
-from dataclasses import dataclass, field
-from collections import deque
+from dataclasses import dataclass
 from typing import Dict, Tuple, Optional, Iterable, List
 import numpy as np
-import time
+import threading
 import json
+import time
 import ast
 import os
 
+from db.db_types import DBModel
 from react.qt_compat import QObject, Slot
 from react.react_var import ReactVar
 from react.repeatFunction import RepeatFunction
-import control as ctrl
+from ctrl.batch_ss import BatchSS, scale_inputs
+from ctrl.checkpoint import pack_state, unpack_state
+from ctrl.disturbance import DisturbanceSpec, parse_disturbance
+from ctrl.delay_line import DelayLine
+from ctrl.mimo import MimoPlant, load_mimo_specs, spec_denominators
+from ctrl.nonlinear import NonlinearSpec, parse_nonlinear
+from ctrl.predict import delayed_future, markov_matrices, predict as predict_outputs, stack_systems, toeplitz_lower
+from ctrl.fopdt_ident import FopdtModel, StepRecorder, identify as identify_fopdt, zn_gains
+from ctrl.sim_clock import SimClock
+from ctrl.simul_shard import ShardPool
+from ctrl.tick_stats import TickStats
+from ctrl.tf_cache import DISCRETIZATION_CACHE, discretize, substeps_for
 
 
-__VERSION__ = "SimulTf 2025-08-22 r4 (input-normalization + safer clip)"
+__VERSION__ = "SimulTf 2025-08-22 r9 (batched multi-rate engine + ring-buffer delay lines + virtual clock + c2d cache)"
 
 
 # ------------------------- utilidades de forma -------------------------
@@ -47,82 +59,188 @@ def _scalar(x) -> float:
 class DiscreteSS:
     """
     Sistema discreto (c2d Tustin) com **atraso puro contínuo L** implementado por
-    histórico (t,u) + **interpolação** de u(t-L). Robusto a jitter e a L fracionário.
+    ``DelayLine``: registrador de deslocamento O(1) quando L é múltiplo de Ts,
+    senão buffer circular (t,u) + bisseção + **interpolação** de u(t-L).
+    Robusto a jitter e a L fracionário; memória limitada a ~L/Ts amostras.
     """
     A: np.ndarray; B: np.ndarray; C: np.ndarray; D: float
     x: np.ndarray  # (n,1)
 
     Ts: float
     delay_L: float = 0.0
-    hist: deque = field(default_factory=lambda: deque(maxlen=4096))  # deque[(t,u)]
+    line: Optional[DelayLine] = None
     last_u: float = 0.0
+    db_abs: float = 0.0          # banda morta de publicação (absoluta / relativa)
+    db_rel: float = 0.0
+    y_pub: float = float('nan')  # último valor emitido
+    u_gain: float = 1.0          # escala de entrada: u = clip(u_gain·u_raw + u_off, 0, 1)
+    u_off: float = 0.0
+    u_heur: bool = False         # True -> heurística antiga por magnitude (scale=heuristic)
+    source: object = None        # ReactVar cujo inputValue alimenta a planta
+    substeps: int = 1            # sub-passos internos por período (plantas rígidas)
+    nl: Optional[NonlinearSpec] = None   # válvula / atuador / saturação (opções do tFunc)
+    u_state: Optional[np.ndarray] = None # [posição da haste, último comando] (view no BatchSS)
+    dist: Optional[DisturbanceSpec] = None   # ruído / deriva / perturbações na medição
+    y_drift: float = 0.0                 # deriva acumulada (fora do BatchSS)
 
     @classmethod
-    def from_tf(cls, num: Iterable[float], den: Iterable[float], Ts: float, x0: Optional[np.ndarray] = None):
-        sys_ss = ctrl.tf2ss(ctrl.TransferFunction(num, den))
-        sysd = ctrl.c2d(sys_ss, Ts, method='tustin')
-        A = np.array(sysd.A, dtype=float); n = A.shape[0]
-        B = _as_col(sysd.B, n); C = _as_row(sysd.C, n); D = _scalar(sysd.D)
+    def from_tf(cls, num: Iterable[float], den: Iterable[float], Ts: float, x0: Optional[np.ndarray] = None,
+                substeps: int = 1):
+        # tf2ss + c2d memoizados (LRU); A compartilhada e somente-leitura.
+        # substeps > 1: c2d em Ts/m e os m sub-passos compostos em (A^m, ΣA^i·B)
+        A, B, C, D = discretize(num, den, Ts, method='tustin', substeps=substeps)
+        n = A.shape[0]
+        B = _as_col(B, n); C = _as_row(C, n); D = _scalar(D)
         x = _as_col(np.zeros((n, 1)) if x0 is None else np.array(x0, dtype=float), n)
-        return cls(A=A, B=B, C=C, D=D, x=x, Ts=float(Ts))
+        return cls(A=A, B=B, C=C, D=D, x=x, Ts=float(Ts), substeps=max(1, int(substeps)))
 
-    def set_delay(self, seconds: float, seed_u: float = 0.0):
+    def set_delay(self, seconds: float, seed_u: float = 0.0, t0: float = 0.0):
         self.delay_L = max(0.0, float(seconds))
         self.last_u = float(seed_u)
-        self.hist.clear()
-        self.hist.append((0.0, self.last_u))
-
-    def _u_at(self, t_query: float) -> float:
-        """Interpolação linear de u(t_query) no histórico com timestamps."""
-        if not self.hist:
-            return self.last_u
-        keep_after = t_query - 2.0 * max(self.Ts, 1e-6)
-        while len(self.hist) >= 3 and self.hist[1][0] < keep_after:
-            self.hist.popleft()
-        if t_query <= self.hist[0][0]:
-            return float(self.hist[0][1])
-        if t_query >= self.hist[-1][0]:
-            return float(self.hist[-1][1])
-        for i in range(len(self.hist) - 1):
-            t0, u0 = self.hist[i]; t1, u1 = self.hist[i + 1]
-            if t0 <= t_query <= t1:
-                if t1 == t0: return float(u1)
-                a = (t_query - t0) / (t1 - t0)
-                return float((1 - a) * u0 + a * u1)
-        return float(self.hist[-1][1])
+        self.line = DelayLine(self.delay_L, self.Ts, seed_u=self.last_u, t0=t0) if self.delay_L > 0 else None
 
-    def step(self, u: float, t_now: float) -> float:
+    @property
+    def hist(self) -> List[Tuple[float, float]]:
+        """Janela (t,u) da linha de atraso (vazia quando L = 0)."""
+        return self.line.samples() if self.line is not None else []
+
+    def scale_input(self, u_raw) -> float:
+        """Escala uma entrada bruta com a escala resolvida na conexão."""
+        if self.u_heur:
+            return _normalize_input(u_raw)
+        return float(scale_inputs(np.array([u_raw], dtype=float), self.u_gain, self.u_off)[0])
+
+    def delayed_input(self, u: float, t_now: float) -> float:
+        """Registra u(t_now) na linha de atraso e devolve u(t_now - L) (entrada efetiva)."""
         u = float(u)
         self.last_u = u
-        if not self.hist or t_now >= self.hist[-1][0]:
-            self.hist.append((t_now, u))
-        else:
-            self.hist.append((self.hist[-1][0] + 1e-12, u))
+        return self.line.push(u, t_now) if self.line is not None else u
 
-        u_eff = self._u_at(t_now - self.delay_L) if self.delay_L > 0 else u
-        y = float(self.C @ self.x + self.D * u_eff)
+    def step(self, u: float, t_now: float) -> float:
+        u_eff = self.delayed_input(u, t_now)
+        y = _scalar(self.C @ self.x + self.D * u_eff)
         self.x = self.A @ self.x + self.B * u_eff
         return y
 
 
 # ------------------------- parsing do tFunc -------------------------
 
-def _parse_tfunc(tfunc: str):
+def _parse_options(field: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Campo de atraso com opções separadas por ``;``:
+    ``"1.2; ts=0.5"`` -> ``("1.2", {"ts": "0.5"})``. Chaves em minúsculas.
+    """
+    head, *rest = field.split(';')
+    opts: Dict[str, str] = {}
+    for item in rest:
+        item = item.strip()
+        if not item:
+            continue
+        k, sep, v = item.partition('=')
+        if not sep:
+            raise ValueError(f"opção inválida no tFunc: '{item}' (use chave=valor)")
+        opts[k.strip().lower()] = v.strip()
+    return head.strip(), opts
+
+
+def _parse_tfunc_ex(tfunc: str):
+    """Como ``_parse_tfunc``, mas devolve também as opções do campo de atraso."""
     if not tfunc:
         raise ValueError("tFunc vazio.")
     parts = [p.strip() for p in tfunc.strip().strip(',').split(',', maxsplit=3)]
     if len(parts) < 2:
         raise ValueError(f"tFunc inválido: '{tfunc}'")
-    delay_str = parts[2] if len(parts) >= 3 else "0.0"
+    delay_str, opts = _parse_options(parts[2] if len(parts) >= 3 else "0.0")
 
     def _to_list(s: str) -> List[float]:
         content = s.strip().strip('[]').replace(' ', ',')
         return ast.literal_eval(f"[{content}]")
 
-    num = _to_list(parts[0]); den = _to_list(parts[1]); delay = float(delay_str)
+    num = _to_list(parts[0]); den = _to_list(parts[1]); delay = float(delay_str or 0.0)
+    return num, den, delay, opts
+
+
+def _parse_tfunc(tfunc: str):
+    num, den, delay, _ = _parse_tfunc_ex(tfunc)
     return num, den, delay
 
 
+# ------------------------- banda morta de publicação -------------------------
+
+def _type_deadband(type_: Optional[str], byte_size: Optional[int]) -> Tuple[float, float]:
+    """
+    ``(abs, rel)`` da menor variação representável pelo TYPE/BYTE_SIZE da célula:
+    • FLOAT: meio ulp relativo (2^-24 em 4 bytes, 2^-53 em 8)
+    • UNSIGNED/INTEGER: meio degrau de 1/(2^bits - 1) (valor 0..1 em escala cheia)
+    • demais tipos: sem banda morta
+    """
+    t = (type_ or '').upper()
+    try:
+        nbytes = int(byte_size) if byte_size is not None else 0
+    except (TypeError, ValueError):
+        nbytes = 0
+    if 'FLOAT' in t:
+        return 0.0, 2.0 ** -(53 if nbytes >= 8 else 24)
+    if 'UNSIGNED' in t or 'INTEGER' in t:
+        bits = 8 * (nbytes or 2)
+        return 0.5 / (2.0 ** bits - 1.0), 0.0
+    return 0.0, 0.0
+
+
+def _deadband(opts: Dict[str, str], var, default: Optional[str]) -> Tuple[float, float]:
+    """
+    Banda morta de uma planta a partir das opções do tFunc:
+    ``db=<abs>`` / ``rdb=<rel>`` explícitos, ``db=auto`` (pelo TYPE/BYTE_SIZE)
+    ou, sem opção, o padrão do ``SimulTf`` (``"auto"`` ou ``None``).
+    """
+    db = opts.get('db', default if 'rdb' not in opts else None)
+    rdb = float(opts.get('rdb', 0.0) or 0.0)
+    if db is None:
+        return 0.0, rdb
+    if str(db).lower() == 'auto':
+        try:
+            a, r = _type_deadband(var.type(), var.byteSize())
+        except Exception:
+            a, r = 0.0, 0.0
+        return a, max(r, rdb)
+    return float(db), rdb
+
+
+# ------------------------- multi-taxa (classes de período) -------------------------
+
+AUTO_TS_FRACTION = 0.05   # ts=auto: Ts_planta ≈ (menor constante de tempo) / 20
+AUTO_TS_MAX = 0.5         # teto (s) do ts=auto (integradores/polos muito lentos)
+
+
+def _rate_divisor(ts_opt: Optional[str], den: Iterable[float], Ts: float) -> int:
+    """
+    Divisor ``k`` da classe de taxa (a planta avança a cada ``k`` ticks, com
+    ``Ts_k = k·Ts``) a partir da opção ``ts`` do tFunc:
+    • ausente → 1 (taxa base)
+    • ``ts=<segundos>`` → arredondado para múltiplo de ``Ts``
+    • ``ts=auto`` → ``AUTO_TS_FRACTION / |polo mais rápido|``, até ``AUTO_TS_MAX``
+    """
+    if not ts_opt:
+        return 1
+    if ts_opt.lower() == 'auto':
+        poles = np.abs(np.roots(np.asarray(list(den), dtype=float)))
+        poles = poles[poles > 1e-9]
+        ts = AUTO_TS_FRACTION / poles.max() if poles.size else AUTO_TS_MAX
+        ts = min(ts, AUTO_TS_MAX)
+        return max(1, int(ts / Ts))          # auto nunca arredonda para cima
+    return max(1, int(round(float(ts_opt) / Ts)))
+
+
+# ------------------------- util: sequências de entrada hipotéticas -------------------------
+
+def _hold_seq(seq, N: int) -> np.ndarray:
+    """Escalar ou sequência -> (N,), segurando o último valor (ZOH) se for curta."""
+    arr = np.atleast_1d(np.asarray(seq, dtype=float))
+    if arr.size >= N:
+        return arr[:N]
+    return np.concatenate([arr, np.full(N - arr.size, arr[-1] if arr.size else 0.0)])
+
+
 # ------------------------- util: normalização de entrada -------------------------
 
 def _normalize_input(u_raw: float) -> float:
@@ -147,15 +265,86 @@ def _normalize_input(u_raw: float) -> float:
     return float(np.clip(u, 0.0, 1.0))
 
 
+# ------------------------- escala de entrada (resolvida na conexão) -------------------------
+
+def _source_range(type_: Optional[str], byte_size: Optional[int]) -> Optional[Tuple[float, float]]:
+    """
+    Faixa bruta de uma célula de origem pelo TYPE/BYTE_SIZE:
+    UNSIGNED/INTEGER -> 0..255 (1 byte) ou 0..65535 (registrador Modbus).
+    FLOAT não declara faixa (percent_of_range, vazões em unidade de engenharia...)
+    -> ``None``.
+    """
+    t = (type_ or '').upper()
+    if 'UNSIGNED' in t or 'INTEGER' in t:
+        try:
+            return (0.0, 255.0) if int(byte_size) == 1 else (0.0, 65535.0)
+        except (TypeError, ValueError):
+            return 0.0, 65535.0
+    return None
+
+
+def _input_scale(opt: Optional[str], source: Optional[Tuple[str, int]] = None) -> Tuple[float, float, bool]:
+    """
+    ``(ganho, offset, heurística)`` tal que ``u = clip(ganho·u_raw + offset, 0, 1)``.
+
+    Opção ``scale`` do tFunc: ``scale=65535`` (0..hi), ``scale=-50:150``
+    (lo:hi), ``scale=heuristic`` (adivinha pela magnitude a cada tick) ou
+    ``scale=auto``/ausente: faixa da célula de origem quando ela é inteira
+    (ver ``_source_range``); origens FLOAT e expressões Func continuam na
+    heurística, como antes da escala por conexão — tabelas com entradas acima
+    de 1 (p.ex. vazões em %) não passam a saturar.
+    """
+    if opt and opt.strip().lower() != 'auto':
+        o = opt.strip().lower()
+        if o in ('heuristic', 'legacy'):
+            return 1.0, 0.0, True
+        lo, sep, hi = o.partition(':')
+        lo, hi = (float(lo), float(hi)) if sep else (0.0, float(lo))
+    else:
+        rng = _source_range(*source) if source else None
+        if rng is None:
+            return 1.0, 0.0, True
+        lo, hi = rng
+    if hi == lo:
+        raise ValueError(f"escala de entrada degenerada: {lo}..{hi}")
+    return 1.0 / (hi - lo), -lo / (hi - lo), False
+
+
 # ------------------------- motor de simulação -------------------------
 
 class SimulTf(QObject):
     """
     Simulador de TF(s) com **atraso puro contínuo** (sem Padé):
     • discretização por Tustin (c2d)
-    • atraso via histórico (t,u) + interpolação linear (independente de jitter)
+    • atraso via ``DelayLine`` (shift-register ou ring buffer + bisseção/interpolação)
+    • plantas agrupadas em **classes de taxa** (opção ``ts`` do tFunc, p.ex.
+      ``"[1],[5 1],1.2; ts=0.5,@..."``): cada classe é um ``BatchSS``
+      (arrays empacotados) que só avança nos ticks em que vence o seu período
+    • plantas rígidas (|polo|·Ts > ``STIFF_LIMIT``) avançam em sub-passos
+      internos já compostos nas matrizes (opção ``sub``: ``auto``/``off``/n),
+      então o Ts global pode seguir a dinâmica mais lenta aceitável
+    • blocos não lineares por planta (``valve``, ``rate``, ``hys``, ``stic``,
+      ``sat`` — ver ``ctrl.nonlinear``) aplicados em lote antes do atraso
+    • ``workers > 0``: plantas SISO repartidas entre processos (``ShardPool``),
+      E/S por memória compartilhada; este processo só publica nos ReactVars
+    • ruído, deriva e perturbações degrau/rampa na medição (``noise``,
+      ``drift``, ``dstep``, ``dramp`` — ver ``ctrl.disturbance``), gerados em
+      blocos por um ``np.random.Generator`` (``seed`` para reprodutibilidade)
+    • relógio ``SimClock``: tempo real, virtual acelerado (``speed``) ou
+      "o mais rápido possível" (``speed=None``)
+
+    ``table_lock`` (normalmente ``ReactFactory.lock``) é mantido durante a
+    publicação das saídas de um tick: Modbus/HART que leiam sob o mesmo lock
+    nunca veem uma tabela com metade das plantas no tick novo.
+
+    ``graph`` (``ReactFactory.graph``; se omitido, o das variáveis conectadas):
+    as saídas emitidas no tick são marcadas juntas e as Func que dependem delas
+    são avaliadas numa única passada topológica, ainda sob ``table_lock``.
     """
-    def __init__(self, stepTime_ms: int):
+    def __init__(self, stepTime_ms: int, speed: Optional[float] = 1.0, table_lock=None,
+                 storage=None, checkpoint_s: float = 0.0, sleep_tol: Optional[float] = 1e-7,
+                 deadband: Optional[str] = "auto", seed: Optional[int] = None,
+                 workers: int = 0, shard_capacity: int = 4096, timing: bool = True, graph=None):
         super().__init__()
         self.stepTime = int(stepTime_ms)
         self.Ts = max(1e-6, self.stepTime / 1000.0)
@@ -163,9 +352,55 @@ class SimulTf(QObject):
         self.dictDB: Dict[Tuple[str, str, str], ReactVar] = {}
         self.systems: Dict[Tuple[str, str, str], DiscreteSS] = {}
         self._system_models: Dict[Tuple[str, str, str], Tuple[list, list, float]] = {}
+        self._system_rates: Dict[Tuple[str, str, str], Optional[str]] = {}   # opção ts do tFunc
+        self._system_subs: Dict[Tuple[str, str, str], Optional[str]] = {}    # opção sub do tFunc
+        self._rate_class: Dict[Tuple[str, str, str], int] = {}              # chave -> divisor k
+        self._engines: Dict[int, BatchSS] = {}                              # k -> plantas com Ts·k
+        self._hold: Dict[int, Tuple[list, np.ndarray, np.ndarray]] = {}    # k -> (keys, u, y) do último passo
+        self._tick_count = 0
+
+        # repouso em regime: plantas convergidas saem do BatchSS até a entrada mudar
+        self.sleep_tol = sleep_tol
+        self._asleep: Dict[Tuple[str, str, str], int] = {}     # chave -> classe k
+        self._asleep_uy: Dict[Tuple[str, str, str], Tuple[float, float]] = {}  # chave -> (comando u, última saída)
+        self._wake_pending: set = set()                         # preenchido pelo sinal de entrada
+
+        # banda morta de publicação: variações menores atualizam _value sem emitir
+        self.deadband = deadband
+        self.emitted = 0
+        self.suppressed = 0
+
+        # ruído/perturbações de medição: blocos de um único Generator (seed -> reprodutível)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
 
-        self._repeated_function = RepeatFunction(self._simulation_step, self.stepTime)
-        self._t0_wall: Optional[float] = None  # base do relógio monotônico
+        # workers > 0: plantas SISO fragmentadas em processos (E/S por memória compartilhada)
+        self.workers = max(0, int(workers))
+        self.shard_capacity = int(shard_capacity)
+        self.shards: Optional[ShardPool] = None
+
+        # plantas MIMO (tabela TFMIMO): um único A x + B u por planta e tick
+        self.mimo: Dict[str, MimoPlant] = {}
+        self._mimo_specs: Dict[str, dict] = {}
+        self._mimo_io: Dict[str, Tuple[list, list]] = {}   # nome -> (vars de entrada, vars de saída)
+        self._mimo_class: Dict[str, int] = {}
+        self._lock = threading.RLock()  # protege systems/_engines entre Tk e thread do tick
+
+        self.clock = SimClock(speed)
+        self.tableLock = table_lock if table_lock is not None else threading.RLock()
+        self.graph = graph          # DependencyGraph das ReactVars (propagação por tick)
+        self._repeated_function = RepeatFunction(self._simulation_step, self._tick_interval_ms, policy="substep")
+        self.recorder: Optional[StepRecorder] = None
+
+        # checkpoints binários (TFCHECKPOINT); checkpoint_s > 0 -> periódicos em segundo plano
+        self.storage = storage
+        self.checkpoint_s = float(checkpoint_s)
+        self._checkpointer = RepeatFunction(self.checkpoint, lambda: self.checkpoint_s * 1000.0)
+        self._ckpt_lock = threading.Lock()
+        self._states_loaded = False
+
+        # instrumentação por tick (histogramas sem lock; barata o bastante para ficar ligada)
+        self.timing: Optional[TickStats] = TickStats() if timing else None
 
         # DEBUG opcional (setar env SIMUL_TF_DEBUG=1)
         self._debug = os.environ.get("SIMUL_TF_DEBUG", "0") == "1"
@@ -174,79 +409,631 @@ class SimulTf(QObject):
     @Slot(object, bool)
     def tfConnect(self, data: ReactVar, isConnect: bool):
         key = (data.tableName, data.rowName, data.colName)
+        if isConnect and self.graph is None:
+            self.graph = getattr(getattr(data, "reactFactory", None), "graph", None)
+        if self.workers:
+            self._shard_connect(key, data, isConnect)
+            return
         if isConnect:
             self.dictDB[key] = data
             tfunc = data.getTFunc() or ""
             try:
-                num, den, delay = _parse_tfunc(tfunc)
+                num, den, delay, opts = _parse_tfunc_ex(tfunc)
+                k = _rate_divisor(opts.get('ts'), den, self.Ts)
+                m = substeps_for(den, self.Ts * k, opts.get('sub'))
+                nl = parse_nonlinear(opts)
+                dist = parse_disturbance(opts)
             except Exception as e:
                 print(f"[SimulTf] Erro ao parsear tFunc '{tfunc}': {e}")
                 return
             try:
-                dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts)
-                # Usa heurística também para o seed
+                dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts * k, substeps=m)
+                dsys.u_gain, dsys.u_off, dsys.u_heur = _input_scale(opts.get('scale'), self._input_source(data))
+                dsys.source = data
+                dsys.nl = nl
+                dsys.dist = dist
                 seed_u_raw = float(data.inputValue) if data.inputValue is not None else 0.0
-                seed_u = _normalize_input(seed_u_raw)
-                dsys.set_delay(seconds=delay, seed_u=seed_u)
+                seed_u = dsys.scale_input(seed_u_raw)
+                dsys.u_state = np.array([seed_u, seed_u])
+                dsys.set_delay(seconds=delay, seed_u=nl.static(seed_u) if nl is not None else seed_u)
+                dsys.db_abs, dsys.db_rel = _deadband(opts, data, self.deadband)
             except Exception as e:
                 print(f"[SimulTf] Erro ao montar sistema: {e}")
                 return
-            self.systems[key] = dsys
-            self._system_models[key] = (list(num), list(den), float(delay))
+            with self._lock:
+                self.systems[key] = dsys
+                self._system_models[key] = (list(num), list(den), float(delay))
+                self._system_rates[key] = opts.get('ts')
+                self._system_subs[key] = opts.get('sub')
+                self._attach(key, dsys, k)
+            sig = getattr(data, "inputChangedSignal", None)
+            if sig is not None:
+                sig.connect(self._on_input_changed)
         else:
-            self.dictDB.pop(key, None)
-            self.systems.pop(key, None)
-            self._system_models.pop(key, None)
+            with self._lock:
+                self.dictDB.pop(key, None)
+                self.systems.pop(key, None)
+                self._system_models.pop(key, None)
+                self._system_rates.pop(key, None)
+                self._system_subs.pop(key, None)
+                self._detach(key)
+
+    @staticmethod
+    def _input_source(data) -> Optional[Tuple[str, int]]:
+        """(TYPE, BYTE_SIZE) da célula de origem quando a entrada é uma referência direta."""
+        hint = getattr(data, "input_source", None)   # já resolvido (SlotVar dos workers)
+        if hint is not None:
+            return tuple(hint)
+        tokens = getattr(data, "_tokens", None) or []
+        func = (data.getFunc() or "").strip() if hasattr(data, "getFunc") else ""
+        if len(tokens) != 1 or func != tokens[0]:
+            return None
+        try:
+            table, col, row = tokens[0].split('.')
+            other = data.reactFactory.df[table].at[row, col]
+            return other.type(), other.byteSize()
+        except Exception:
+            return None
+
+    # ------------------------- fragmentação em processos -------------------------
+
+    def _shard_pool(self) -> ShardPool:
+        if self.shards is None:
+            self.shards = ShardPool(self.workers, self.stepTime, capacity=self.shard_capacity,
+                                    sleep_tol=self.sleep_tol, deadband=self.deadband, seed=self.seed)
+        return self.shards
+
+    def _shard_connect(self, key, data, isConnect: bool):
+        with self._lock:
+            pool = self._shard_pool()
+            if not isConnect:
+                self.dictDB.pop(key, None)
+                pool.disconnect(key)
+                return
+            if not pool.connect(key, data, data.getTFunc() or "", self._input_source(data)):
+                return
+            self.dictDB[key] = data
+        sig = getattr(data, "inputChangedSignal", None)
+        if sig is not None:
+            sig.connect(self._on_input_changed)
+
+    def close(self):
+        """
+        Para o agendador, grava o checkpoint final e encerra os workers (modo
+        fragmentado; os segmentos de memória compartilhada são liberados aqui).
+        """
+        self._repeated_function.stop()
+        self._checkpointer.stop()
+        # só grava se o estado já veio do banco: senão o checkpoint salvo viraria zeros
+        if self._states_loaded:
+            try: self.save_states()
+            except Exception as e: print("[SimulTf] save_states falhou:", e)
+        with self._lock:
+            if self.shards is not None:
+                self.shards.close()
+                self.shards = None
+
+    # ------------------------- classes de taxa -------------------------
+
+    def _attach(self, key, dsys: DiscreteSS, k: int):
+        """Coloca ``dsys`` no ``BatchSS`` da classe ``k`` (saindo da anterior, se mudou)."""
+        if self._rate_class.get(key, k) != k:
+            self._detach(key)
+        self._asleep.pop(key, None); self._asleep_uy.pop(key, None)
+        engine = self._engines.get(k)
+        if engine is None:
+            engine = self._engines[k] = BatchSS(rng=self.rng)
+        engine.add(key, dsys)
+        self._rate_class[key] = k
+        self._hold.pop(k, None)
+
+    def _detach(self, key):
+        k = self._rate_class.pop(key, None)
+        self._asleep_uy.pop(key, None)
+        if self._asleep.pop(key, None) is not None:
+            return
+        engine = self._engines.get(k)
+        if engine is None:
+            return
+        engine.remove(key)
+        self._hold.pop(k, None)
+        if engine.size == 0:
+            del self._engines[k]
+
+    # ------------------------- repouso de plantas em regime -------------------------
+
+    @Slot(object)
+    def _on_input_changed(self, data):
+        """``ReactVar.inputChangedSignal``: só marca; o despertar acontece no próximo tick."""
+        key = (data.tableName, data.rowName, data.colName)
+        if key in self._asleep:
+            self._wake_pending.add(key)
+        elif self.shards is not None:
+            self.shards.mark_dirty(key)
+
+    def _wake(self, key, t_now: float):
+        """Devolve a planta ao ``BatchSS``; a linha de atraso recomeça cheia de ``last_u``."""
+        k = self._asleep.pop(key, None)
+        self._asleep_uy.pop(key, None)
+        dsys = self.systems.get(key)
+        if k is None or dsys is None:
+            return
+        dsys.set_delay(seconds=dsys.delay_L, seed_u=dsys.last_u, t0=t_now)
+        engine = self._engines.get(k)
+        if engine is None:
+            engine = self._engines[k] = BatchSS(rng=self.rng)
+        engine.add(key, dsys)
+
+    def _sleep(self, k: int, engine: BatchSS, rows: np.ndarray, u: np.ndarray, y: np.ndarray):
+        sleepers = [(engine.keys[i], float(u[i]), float(y[i])) for i in rows]
+        for key, u_i, y_i in sleepers:
+            engine.remove(key)
+            self._asleep[key] = k
+            self._asleep_uy[key] = (u_i, y_i)
+        # quem dorme passa a ser gravado só via _asleep_uy
+        held = self._hold.get(k)
+        if held is not None:
+            gone = {key for key, _, _ in sleepers}
+            keep = [i for i, key in enumerate(held[0]) if key not in gone]
+            self._hold[k] = ([held[0][i] for i in keep], held[1][keep], held[2][keep])
+
+    def _audit_sleepers(self):
+        """Rede de segurança (~1x/s) para entradas alteradas sem ``inputChangedSignal``."""
+        for key in list(self._asleep):
+            var = self.dictDB.get(key)
+            dsys = self.systems.get(key)
+            if var is None or dsys is None:
+                continue
+            u_raw = float(var.inputValue) if var.inputValue is not None else 0.0
+            u_cmd = dsys.u_state[1] if dsys.u_state is not None else dsys.last_u
+            if dsys.scale_input(u_raw) != u_cmd:
+                self._wake_pending.add(key)
+
+    def wake_all(self):
+        with self._lock:
+            t = self.clock.now()
+            for key in list(self._asleep):
+                self._wake(key, t)
+
+    def plant_stats(self) -> Dict[str, int]:
+        """Plantas SISO ativas (no ``BatchSS``) vs. em repouso."""
+        with self._lock:
+            active = sum(e.size for e in self._engines.values())
+            substepped = sum(1 for d in self.systems.values() if d.substeps > 1)
+            stats = {"active": active, "sleeping": len(self._asleep), "mimo": len(self.mimo),
+                     "substepped": substepped, "emitted": self.emitted, "suppressed": self.suppressed}
+            if self.shards is not None:
+                # emitted/suppressed já são contados aqui, na publicação
+                for k, v in self.shards.stats().items():
+                    if k in ("active", "sleeping", "substepped"):
+                        stats[k] += v
+            return stats
+
+    def _mimo_divisor(self, spec: dict, Ts: float) -> int:
+        ts_opt = spec.get("ts")
+        if not ts_opt:
+            return 1
+        return min(_rate_divisor(str(ts_opt), den, Ts) for den in spec_denominators(spec))
+
+    def set_seed(self, seed: Optional[int]):
+        """Re-semeia o gerador de ruído/deriva (sequência reprodutível a partir daqui)."""
+        with self._lock:
+            self.seed = seed
+            self.rng = np.random.default_rng(seed)
+            for engine in self._engines.values():
+                engine.dist.rng = self.rng
+                engine.dist._invalidate()
+            if self.shards is not None:
+                self.shards.set_seed(seed)
+
+    def rate_classes(self) -> Dict[float, int]:
+        """Período (s) -> nº de plantas em cada classe de taxa."""
+        with self._lock:
+            return {round(self.Ts * k, 9): e.size for k, e in sorted(self._engines.items())}
+
+    # ------------------------- plantas MIMO -------------------------
+
+    def mimo_connect(self, name: str, spec: dict, resolve) -> bool:
+        """
+        Monta a planta MIMO ``name`` (ver ``ctrl.mimo``). ``resolve(token)``
+        devolve o ``ReactVar`` de ``TABELA.COLUNA.LINHA``. As células de saída
+        devem ser valores simples: o simulador escreve nelas a cada passo.
+        """
+        try:
+            k = self._mimo_divisor(spec, self.Ts)
+            plant = MimoPlant.from_spec(name, spec, self.Ts * k)
+            in_vars = [resolve(tok) for tok in plant.inputs]
+            out_vars = [resolve(tok) for tok in plant.outputs]
+            scales = [_input_scale(None, (v.type(), v.byteSize())) if hasattr(v, "type") else (1.0, 0.0, True)
+                      for v in in_vars]
+        except Exception as e:
+            print(f"[SimulTf] Erro ao montar planta MIMO '{name}': {e}")
+            return False
+        for tok, var in zip(plant.outputs, out_vars):
+            if getattr(var, "model", None) in (DBModel.Func, DBModel.tFunc):
+                print(f"[SimulTf] Aviso: saída MIMO '{tok}' é Func/tFunc e será sobrescrita a cada passo.")
+        plant.u_gain = np.array([g for g, _, _ in scales]); plant.u_off = np.array([o for _, o, _ in scales])
+        plant.u_heur = np.array([h for _, _, h in scales], dtype=bool)
+        plant.set_delays(self._mimo_inputs(plant, in_vars))
+        with self._lock:
+            self.mimo[name] = plant
+            self._mimo_specs[name] = spec
+            self._mimo_io[name] = (in_vars, out_vars)
+            self._mimo_class[name] = k
+        return True
+
+    @staticmethod
+    def _mimo_inputs(plant: MimoPlant, in_vars) -> np.ndarray:
+        raw = np.fromiter(((v._value if isinstance(v._value, (int, float)) else 0.0) for v in in_vars),
+                          dtype=float, count=len(in_vars))
+        return scale_inputs(raw, plant.u_gain, plant.u_off, plant.u_heur)
+
+    def mimo_disconnect(self, name: str):
+        with self._lock:
+            for d in (self.mimo, self._mimo_specs, self._mimo_io, self._mimo_class):
+                d.pop(name, None)
+
+    def load_mimo(self, reactFactory) -> int:
+        """Conecta todas as plantas da tabela ``TFMIMO``. Retorna quantas subiram."""
+        def resolve(token: str):
+            table, col, row = token.split('.')
+            return reactFactory.df[table].at[row, col]
+        specs = load_mimo_specs(reactFactory.storage)
+        return sum(self.mimo_connect(name, spec, resolve) for name, spec in specs.items())
 
     def start(self, state: bool):
         if state:
-            # defensivo: se a versão antiga estiver carregada, não quebrar
-            if hasattr(self, "load_states"):
+            # estado vindo do banco só na primeira partida: depois ele já está em memória
+            if not self._states_loaded:
                 try: self.load_states()
                 except Exception as e: print("[SimulTf] load_states falhou:", e)
-            self._t0_wall = time.monotonic()
+            self.clock.reset()
+            self._rebase_delays()
             self._repeated_function.start()
+            if self.checkpoint_s > 0:
+                self._checkpointer.start()
         else:
             self._repeated_function.stop()
-            if hasattr(self, "save_states"):
-                try: self.save_states()
-                except Exception as e: print("[SimulTf] save_states falhou:", e)
-            self._t0_wall = None
+            self._checkpointer.stop()
+            # snapshot síncrono (µs), gravação fora da thread da UI
+            try: self.save_states(background=True)
+            except Exception as e: print("[SimulTf] save_states falhou:", e)
 
     def reset(self):
         self._repeated_function.stop()
-        base = time.monotonic()
-        self._t0_wall = base
-        for dsys in self.systems.values():
-            dsys.x[:] = 0.0
-            dsys.set_delay(seconds=dsys.delay_L, seed_u=dsys.last_u)
+        self._states_loaded = True   # não recarregar o checkpoint antigo sobre o reset
+        self.clock.reset()
+        self.wake_all()
+        with self._lock:
+            for dsys in self.systems.values():
+                dsys.x[:] = 0.0
+                dsys.y_drift = 0.0
+                dsys.set_delay(seconds=dsys.delay_L, seed_u=dsys.last_u)
+            for engine in self._engines.values():
+                engine.dist.level[:] = 0.0
+            for plant in self.mimo.values():
+                plant.x[:] = 0.0
+                plant.set_delays(plant.last_u)
+            if self.shards is not None:
+                self.shards.call("reset")
+
+    # ------------------------- relógio -------------------------
+
+    def _rebase_delays(self):
+        """Janelas de atraso com tempos de antes do ``clock.reset()``: alinha a última amostra em ``now()``."""
+        t = self.clock.now()
+        with self._lock:
+            for dsys in self.systems.values():
+                if dsys.line is not None:
+                    dsys.line.rebase(t)
+            for plant in self.mimo.values():
+                for line in plant.lines:
+                    if line is not None:
+                        line.rebase(t)
 
     def _now(self) -> float:
-        if self._t0_wall is None:
-            self._t0_wall = time.monotonic()
-        return time.monotonic() - self._t0_wall
+        return self.clock.now()
+
+    def _tick_interval_ms(self) -> float:
+        return self.clock.interval_ms(self.stepTime)
+
+    def set_speed(self, speed: Optional[float]):
+        """1.0 = tempo real; 10/100 = acelerado; None/0 = o mais rápido possível."""
+        self.clock.set_speed(speed)
+
+    @property
+    def sim_time(self) -> float:
+        return self.clock.now()
+
+    def scheduler_stats(self) -> dict:
+        """Contadores do agendador (ticks, deadlines perdidas, overruns, atraso máx.)."""
+        return self._repeated_function.stats()
+
+    def timing_stats(self) -> dict:
+        """
+        Histogramas (oitavas de µs) e p50/p90/p99/máx. de duração do tick,
+        jitter, passo, publicação e handlers, mais overruns e as estatísticas
+        do agendador.
+        """
+        out = self.timing.summary() if self.timing is not None else {}
+        out["scheduler"] = self.scheduler_stats()
+        return out
 
-    def _simulation_step(self):
-        t_now = self._now()
+    def dump_timing(self, path: str) -> dict:
+        """Grava ``timing_stats()`` em JSON."""
+        if self.timing is None:
+            raise RuntimeError("instrumentação desligada (SimulTf(timing=False)).")
+        return self.timing.dump(path, extra={"scheduler": self.scheduler_stats(),
+                                             "plants": self.plant_stats()})
+
+    def reset_timing(self):
+        if self.timing is not None:
+            self.timing.reset()
+        self._repeated_function.reset_stats()
+
+    def run_for(self, seconds: float) -> int:
+        """
+        Avança ``seconds`` de tempo simulado de forma síncrona (sem agendador),
+        p.ex. para cenários de regressão/sintonia. Só faz sentido no modo virtual.
+        Retorna o número de ticks executados.
+        """
+        n = int(round(max(0.0, float(seconds)) / self.Ts))
+        for _ in range(n):
+            self._simulation_step()
+        return n
+
+    def _simulation_step(self, substeps: int = 1):
+        """
+        Um tick do simulador. ``substeps > 1`` (política "substep" do
+        ``RepeatFunction`` após deadlines perdidas) avança vários passos Ts
+        vetorizados e publica só o resultado final.
+
+        Cada classe de taxa ``k`` só avança nos ticks múltiplos de ``k``; só as
+        saídas das classes que avançaram são publicadas (as demais seguram o
+        último valor na tabela, como um ZOH).
+
+        Plantas em regime (estado parado, entrada constante, janela de atraso
+        já preenchida com ela) saem do ``BatchSS`` e não custam nada até a
+        entrada mudar.
+        """
+        substeps = max(1, int(substeps))
+        timing = self.timing
+        if timing is not None:
+            t_start = time.perf_counter()
+            rf = self._repeated_function
+            # sem período de parede (o mais rápido possível) o atraso de início não tem sentido
+            jitter = rf.last_late_s if rf.running and not self.clock.as_fast_as_possible else None
         self._dbg_tick += 1
-        for key, dsys in self.systems.items():
-            var = self.dictDB.get(key)
-            if var is None:
-                continue
-            u_raw = float(var.inputValue) if var.inputValue is not None else 0.0
-            u = _normalize_input(u_raw)   # <<< normalização robusta
-            y = dsys.step(u, t_now)
+        published = []
+        u_dbg = {}
+        tol = self.sleep_tol if self.sleep_tol else 0.0
+        with self._lock:
+            c0 = self._tick_count
+            self._tick_count += substeps
+
+            audit = max(1, int(round(1.0 / self.Ts)))
+            if self._asleep and c0 // audit != (c0 + substeps) // audit:
+                self._audit_sleepers()
+            if self._wake_pending:
+                pending = list(self._wake_pending)
+                self._wake_pending.difference_update(pending)
+                t_prev = self.clock.now()
+                for key in pending:
+                    self._wake(key, t_prev)
+            times = []
+            for s in range(substeps):
+                t = self.clock.tick(self.Ts)
+                if substeps > 1 and not self.clock.virtual:
+                    t -= (substeps - 1 - s) * self.Ts  # espalha os sub-passos na janela perdida
+                times.append(t)
+            t_now = times[-1]
+
+            for k, engine in self._engines.items():
+                # sub-passos (0..substeps-1) em que o período da classe vence
+                due = range((k - 1 - c0 % k), substeps, k)
+                if not len(due) or engine.size == 0:
+                    continue
+                keys = list(engine.keys)
+                P = len(keys)
+                # escala pré-resolvida: uma operação de array para a classe inteira
+                raw = np.fromiter(((d.source.inputValue or 0.0) if d.source is not None else 0.0
+                                   for d in engine.systems), dtype=float, count=P)
+                u = engine.scale_inputs(raw)
+                if self._debug:
+                    u_dbg.update(zip(keys, zip(raw.tolist(), u.tolist())))
+
+                if tol:
+                    u_prev = engine.nl.state[:P, 1].copy()
+                    v_prev = np.fromiter((d.last_u for d in engine.systems), dtype=float, count=P)
+                    dx = np.empty(P)
+                u_eff = np.empty(P)
+                for s in due:
+                    # válvula/atuador (histerese, agarramento, velocidade, característica) em lote
+                    v = engine.nl.apply(u, self.Ts * k, P)
+                    for i, dsys in enumerate(engine.systems):
+                        u_eff[i] = dsys.delayed_input(v[i], times[s])
+                    # Um único passo vetorizado para todas as plantas da classe
+                    y = engine.step(u_eff, dx=dx if tol else None)
+
+                # Ruído/deriva/perturbações (aditivos na medição) e saturação por planta
+                # (padrão [0,1], sem piso 0.0001 para não "travar" visualmente)
+                engine.dist.apply(y, times[due[-1]], len(due) * self.Ts * k, P)
+                engine.nl.saturate(y, P)
+                self._hold[k] = (keys, u, y)
+                published.append((keys, [self.dictDB.get(key) for key in keys], y, engine.publish_mask(y)))
+
+                if tol:
+                    quiet = engine.quiet[:P]
+                    still = (dx <= tol) & (u == u_prev) & (v == v_prev) & ~engine.dist.rows(P)
+                    quiet[:] = np.where(still, quiet + len(due), 0)
+                    rows = np.flatnonzero(quiet >= engine.need[:P])
+                    if rows.size:
+                        self._sleep(k, engine, rows, u, y)   # último valor já vai publicado acima
+
+            for name, plant in self.mimo.items():
+                k = self._mimo_class[name]
+                due = range((k - 1 - c0 % k), substeps, k)
+                if not len(due):
+                    continue
+                in_vars, out_vars = self._mimo_io[name]
+                u = self._mimo_inputs(plant, in_vars)
+                for s in due:
+                    y = plant.step(u, times[s])
+                published.append((plant.outputs, out_vars, np.clip(y, 0.0, 1.0), None))
+
+            if self.shards is not None:
+                # todos os workers avançam em paralelo; aqui só a publicação
+                shard_out = self.shards.tick(substeps)
+                if shard_out is not None:
+                    published.append(shard_out)
+
+            if self.recorder is not None and (self._hold or self._asleep_uy):
+                held = list(self._hold.values())
+                if self._asleep_uy:
+                    sleepers = list(self._asleep_uy)
+                    uy = np.array([self._asleep_uy[key] for key in sleepers])
+                    held.append((sleepers, uy[:, 0], uy[:, 1]))
+                self.recorder.record(t_now, [key for h in held for key in h[0]],
+                                     np.concatenate([h[1] for h in held]),
+                                     np.concatenate([h[2] for h in held]))
+
+        if timing is not None:
+            t_step = time.perf_counter()
+            handlers = 0.0
+        graph = self.graph
+        changed = [] if graph is not None else None
+        with self.tableLock:
+            for keys, out_vars, y, emit in published:
+                emit = emit.tolist() if emit is not None else [True] * len(keys)
+                for key, var, new_val, do_emit in zip(keys, out_vars, y.tolist(), emit):
+                    if var is None:
+                        continue
+
+                    # DEBUG opcional a cada ~20 ticks
+                    if self._debug and (self._dbg_tick % 20 == 0) and key in u_dbg:
+                        u_raw, u_n = u_dbg[key]
+                        print(f"[SimulTf][{key}] t={t_now:.3f}  u_raw={u_raw:.2f} -> u={u_n:.3f}  y={new_val:.3f}")
 
-            # Clipa a saída em [0,1] (sem piso 0.0001 para não "travar" visualmente)
-            new_val = float(np.clip(y, 0.0, 1.0))
+                    # Emite alteração (abaixo da banda morta só atualiza o valor interno)
+                    var._value = new_val
+                    if do_emit:
+                        if timing is not None:
+                            h0 = time.perf_counter()
+                            var.valueChangedSignal.emit(var)
+                            handlers += time.perf_counter() - h0
+                        else:
+                            var.valueChangedSignal.emit(var)
+                        if changed is not None:
+                            changed.append(var)
+                        self.emitted += 1
+                    else:
+                        self.suppressed += 1
+            if changed:
+                # Func dependentes: uma avaliação por célula, já com todas as saídas do tick
+                h0 = time.perf_counter()
+                graph.mark_many(changed)
+                graph.propagate()
+                if timing is not None:
+                    handlers += time.perf_counter() - h0
+        if timing is not None:
+            t_end = time.perf_counter()
+            timing.record(t_end - t_start, t_step - t_start, t_end - t_step, handlers,
+                          jitter=jitter, period=self._tick_interval_ms() / 1000.0, substeps=substeps)
+
+    # ------------------------- predição (what-if / MPC) -------------------------
+
+    @staticmethod
+    def _future_inputs(keys, systems, u, N: int) -> np.ndarray:
+        """(P, N) de entradas hipotéticas; plantas sem sequência seguram a entrada atual."""
+        U = np.empty((len(keys), N))
+        U[:] = np.array([d.last_u for d in systems], dtype=float).reshape(-1, 1)
+        if u is None:
+            return U
+        if isinstance(u, dict):
+            for i, key in enumerate(keys):
+                if key in u:
+                    U[i] = _hold_seq(u[key], N)
+            return U
+        U[:] = _hold_seq(u, N)
+        return U
+
+    def _predict_group(self, keys, systems, u, N: int, clip, cached=None) -> Dict[Tuple[str, str, str], np.ndarray]:
+        if cached is not None:
+            (Phi, Gam), X = cached
+        else:
+            A, B, C, D, X = stack_systems(systems)
+            Phi, h = markov_matrices(A, B, C, D, N)
+            Gam = toeplitz_lower(h)
+        U = self._future_inputs(keys, systems, u, N)
+        for i, dsys in enumerate(systems):
+            if dsys.line is not None:
+                U[i] = delayed_future(dsys.line, U[i], dsys.Ts)
+        return dict(zip(keys, predict_outputs(Phi, Gam, X, U, clip)))
+
+    def predict(self, u=None, N: int = 20, keys: Optional[Iterable[Tuple[str, str, str]]] = None,
+                clip: Optional[Tuple[float, float]] = (0.0, 1.0)) -> Dict[Tuple[str, str, str], np.ndarray]:
+        """
+        Saída prevista de cada planta SISO nos próximos ``N`` passos (do seu
+        período) a partir do estado atual, para a entrada hipotética ``u`` —
+        em unidades da planta (0..1, após escala/válvula):
+        • ``None``: segura a entrada atual de cada planta
+        • escalar ou sequência (N,): a mesma para todas
+        • ``{chave: escalar | sequência}``: por planta (as demais seguram)
 
-            # DEBUG opcional a cada ~20 ticks
-            if self._debug and (self._dbg_tick % 20 == 0):
-                print(f"[SimulTf][{key}] t={t_now:.3f}  u_raw={u_raw:.2f} -> u={u:.3f}  y={new_val:.3f}")
+        Sequências curtas seguram o último valor. O atraso puro usa a janela
+        da ``DelayLine``. ``Φ``/``Γ`` ficam em cache no ``BatchSS`` (por ``N``):
+        com as plantas inalteradas, cada chamada é só uma ``einsum`` por
+        classe de taxa. Não modela blocos não lineares nem ruído.
+        """
+        N = max(1, int(N))
+        out: Dict[Tuple[str, str, str], np.ndarray] = {}
+        with self._lock:
+            for engine in self._engines.values():
+                P = engine.size
+                if P:
+                    out.update(self._predict_group(list(engine.keys), list(engine.systems), u, N, clip,
+                                                   cached=(engine.prediction(N), engine.X[:P])))
+            if self._asleep:
+                sleepers = list(self._asleep)
+                out.update(self._predict_group(sleepers, [self.systems[key] for key in sleepers], u, N, clip))
+            if self.shards is not None:
+                for part in self.shards.call("predict", u, N, None, clip):
+                    out.update(part)
+        if keys is not None:
+            out = {key: out[key] for key in keys if key in out}
+        return out
 
-            # Emite alteração
-            var._value = new_val
-            var.valueChangedSignal.emit(var)
+    # ------------------------- identificação (Ziegler–Nichols) -------------------------
+
+    def enable_recording(self, seconds: float = 600.0) -> StepRecorder:
+        """Passa a gravar (t, u, y) de todas as plantas nos últimos ``seconds`` simulados."""
+        self.recorder = StepRecorder(capacity=int(round(float(seconds) / self.Ts)) + 1)
+        return self.recorder
+
+    def disable_recording(self):
+        self.recorder = None
+
+    def identify(self, method: str = "tangent", seconds: Optional[float] = None,
+                 **kw) -> Dict[Tuple[str, str, str], Optional[FopdtModel]]:
+        """
+        K, L, T (FOPDT) de cada planta a partir do maior degrau de ``inputValue``
+        gravado (todas de uma vez, sobre views do gravador).
+        """
+        if self.recorder is None:
+            raise RuntimeError("gravação desligada: chame enable_recording() antes do degrau.")
+        n = None if seconds is None else int(round(float(seconds) / self.Ts))
+        return identify_fopdt(self.recorder, n, method=method, **kw)
+
+    def tune(self, kind: str = "PID", **kw) -> Dict[Tuple[str, str, str], Optional[dict]]:
+        """Ganhos ZN (tabela do README) para cada planta identificada."""
+        out = {}
+        for key, model in self.identify(**kw).items():
+            try:
+                out[key] = zn_gains(model, kind) if model is not None else None
+            except ValueError as e:
+                print(f"[SimulTf] Sintonia ZN impossível para {key}: {e}")
+                out[key] = None
+        return out
 
     # ------------------------- sincronismo de StepTimer -------------------------
     def set_step_time_ms(self, step_ms: int):
@@ -268,51 +1055,203 @@ class SimulTf(QObject):
         self.stepTime = step_ms
         self.Ts = max(1e-6, self.stepTime / 1000.0)
         try:
-            self._repeated_function = RepeatFunction(self._simulation_step, self.stepTime)
+            self._repeated_function = RepeatFunction(self._simulation_step, self._tick_interval_ms, policy="substep")
         except Exception as e:
             print(f"[SimulTf] Falha ao recriar RepeatFunction: {e}")
 
-        for key, old_dsys in list(self.systems.items()):
-            model = getattr(self, "_system_models", {}).get(key)
-            if not model:
-                old_dsys.Ts = self.Ts
-                continue
-            num, den, delay = model
-            try:
-                new_dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts, x0=old_dsys.x)
-                new_dsys.set_delay(seconds=old_dsys.delay_L, seed_u=old_dsys.last_u)
-                self.systems[key] = new_dsys
-            except Exception as e:
-                print(f"[SimulTf] Falha ao re-discretizar {key}: {e}")
-        self._t0_wall = time.monotonic()
+        with self._lock:
+            for key, old_dsys in list(self.systems.items()):
+                model = getattr(self, "_system_models", {}).get(key)
+                if not model:
+                    old_dsys.Ts = self.Ts * self._rate_class.get(key, 1)
+                    continue
+                num, den, delay = model
+                try:
+                    # o divisor da classe é recalculado para o novo passo base
+                    k = _rate_divisor(self._system_rates.get(key), den, self.Ts)
+                    m = substeps_for(den, self.Ts * k, self._system_subs.get(key))
+                    new_dsys = DiscreteSS.from_tf(num, den, Ts=self.Ts * k, x0=old_dsys.x, substeps=m)
+                    new_dsys.set_delay(seconds=old_dsys.delay_L, seed_u=old_dsys.last_u)
+                    new_dsys.db_abs, new_dsys.db_rel = old_dsys.db_abs, old_dsys.db_rel
+                    new_dsys.u_gain, new_dsys.u_off, new_dsys.u_heur = old_dsys.u_gain, old_dsys.u_off, old_dsys.u_heur
+                    new_dsys.source = old_dsys.source
+                    new_dsys.nl = old_dsys.nl
+                    new_dsys.dist = old_dsys.dist
+                    new_dsys.u_state = None if old_dsys.u_state is None else np.array(old_dsys.u_state)
+                    self.systems[key] = new_dsys
+                    self._attach(key, new_dsys, k)
+                except Exception as e:
+                    print(f"[SimulTf] Falha ao re-discretizar {key}: {e}")
+            for name, old in list(self.mimo.items()):
+                spec = self._mimo_specs[name]
+                try:
+                    k = self._mimo_divisor(spec, self.Ts)
+                    plant = MimoPlant.from_spec(name, spec, self.Ts * k)
+                    plant.x[:] = old.x          # mesma composição de blocos -> mesma ordem
+                    plant.u_gain, plant.u_off, plant.u_heur = old.u_gain, old.u_off, old.u_heur
+                    plant.set_delays(old.last_u)
+                    self.mimo[name] = plant
+                    self._mimo_class[name] = k
+                except Exception as e:
+                    print(f"[SimulTf] Falha ao re-discretizar MIMO {name}: {e}")
+            if self.shards is not None:
+                self.shards.call("set_step_time_ms", step_ms)
+        self.clock.reset()
         if was_running:
             try: self._repeated_function.start()
             except Exception as e: print(f"[SimulTf] Falha ao reiniciar RepeatFunction: {e}")
 
+    def warm_cache(self, step_times_ms: Iterable[int] = (10, 20, 50, 100, 200, 500, 1000),
+                   background: bool = True):
+        """
+        Pré-discretiza todos os modelos conectados para o passo atual e para
+        ``step_times_ms``: reconexões de tFunc e ``set_step_time_ms`` passam a
+        ser hits no ``DISCRETIZATION_CACHE``. Por padrão roda numa thread daemon
+        para não atrasar a abertura da janela.
+        """
+        with self._lock:
+            models = [(num, den, self._system_rates.get(key), self._system_subs.get(key))
+                      for key, (num, den, _) in self._system_models.items()]
+        base = [self.Ts] + [max(1e-6, int(ms) / 1000.0) for ms in step_times_ms]
+
+        def _warm():
+            n = 0
+            for num, den, ts_opt, sub_opt in models:
+                # cada planta no período da sua classe de taxa para cada passo base
+                Ts_list = [Ts * _rate_divisor(ts_opt, den, Ts) for Ts in base]
+                n += DISCRETIZATION_CACHE.warm([(num, den)], Ts_list, sub_opt=sub_opt)
+            if self._debug:
+                print(f"[SimulTf] cache de discretização aquecido: {n} novos, {DISCRETIZATION_CACHE.stats()}")
+
+        if background:
+            threading.Thread(target=_warm, name="SimulTfWarmCache", daemon=True).start()
+        else:
+            _warm()
+
     # ------------------------- persistência -------------------------
 
-    def save_states(self):
-        for key, dsys in self.systems.items():
-            var = self.dictDB.get(key)
-            if not var:
-                continue
-            row = "|".join(key[:-1]); col = key[-1]
-            try:
-                payload = {
-                    "A": dsys.A.tolist(), "B": dsys.B.tolist(), "C": dsys.C.tolist(),
-                    "D": dsys.D, "x": dsys.x.tolist(),
-                    "delay_L": dsys.delay_L, "last_u": dsys.last_u,
-                    "hist": list(dsys.hist)[-64:],
-                }
-                s = json.dumps(payload)
-                var.reactFactory.storage.setRawData("TFSTATES", row, col, s)
-            except Exception as e:
-                print(f"[SimulTf] Erro ao salvar estado {key}: {e}")
+    CHECKPOINT_TABLE = "TFCHECKPOINT"
+    CHECKPOINT_COLUMN = "STATE"
+
+    def _storage(self):
+        if self.storage is not None:
+            return self.storage
+        vars_ = list(self.dictDB.values()) + [v for _, outs in self._mimo_io.values() for v in outs]
+        for var in vars_:
+            rf = getattr(var, "reactFactory", None)
+            if rf is not None:
+                return rf.storage
+        return None
+
+    def set_checkpoint_interval(self, seconds: float):
+        """Intervalo dos checkpoints periódicos (0 desliga)."""
+        self.checkpoint_s = max(0.0, float(seconds))
+        if self.checkpoint_s <= 0:
+            self._checkpointer.stop()
+        elif self._repeated_function.running:
+            self._checkpointer.start()
+
+    def snapshot_states(self) -> Dict[str, bytes]:
+        """Blobs de estado (x, última entrada, janelas de atraso) de todas as plantas, num só lock."""
+        with self._lock:
+            # última entrada seguida do estado da válvula [haste, comando], quando houver
+            blobs = {"|".join(key): pack_state(dsys.Ts, dsys.x,
+                                               [dsys.last_u] + ([] if dsys.u_state is None else list(dsys.u_state)),
+                                               [dsys.line.snapshot() if dsys.line is not None else None])
+                     for key, dsys in self.systems.items()}
+            for name, plant in self.mimo.items():
+                blobs["MIMO|" + name] = pack_state(plant.Ts, plant.x, plant.last_u,
+                                                   [l.snapshot() if l is not None else None for l in plant.lines])
+            if self.shards is not None:
+                blobs.update(self.shards.snapshot_states())
+        return blobs
+
+    def save_states(self, background: bool = False) -> int:
+        """
+        Grava o estado de todas as plantas numa única transação
+        (``TFCHECKPOINT``). ``background=True`` só tira o snapshot aqui e grava
+        numa thread. Retorna o nº de plantas.
+        """
+        storage = self._storage()
+        blobs = self.snapshot_states()
+        if storage is None or not blobs:
+            return 0
+
+        def _write():
+            with self._ckpt_lock:
+                storage.setRawDataMany(self.CHECKPOINT_TABLE, self.CHECKPOINT_COLUMN, blobs, colType="BLOB")
+
+        if background:
+            # não-daemon: o processo espera a gravação final antes de sair
+            threading.Thread(target=_write, name="SimulTfCheckpoint").start()
+        else:
+            _write()
+        return len(blobs)
+
+    def checkpoint(self):
+        """Alvo do checkpoint periódico: uma perda máxima de ``checkpoint_s`` em caso de falha."""
+        try:
+            self.save_states()
+        except Exception as e:
+            print(f"[SimulTf] checkpoint falhou: {e}")
 
     def load_states(self):
-        for key, var in list(self.dictDB.items()):
+        storage = self._storage()
+        if storage is None:
+            return
+        blobs = storage.getRawColumn(self.CHECKPOINT_TABLE, self.CHECKPOINT_COLUMN)
+        legacy = self.apply_states(blobs)
+        if legacy:
+            self._load_legacy_states(legacy)
+        self._states_loaded = True
+
+    def apply_states(self, blobs: Dict[str, bytes]) -> list:
+        """Aplica blobs de ``snapshot_states``; devolve as chaves SISO sem blob (formato antigo)."""
+        legacy = []
+        with self._lock:
+            for key, dsys in self.systems.items():
+                blob = blobs.get("|".join(key))
+                if blob is None:
+                    legacy.append(key)
+                    continue
+                try:
+                    Ts, x, last_u, lines = unpack_state(blob)
+                    # estado discreto só vale para o mesmo Ts (Tustin depende do passo)
+                    if abs(Ts - dsys.Ts) <= 1e-12 and x.size == dsys.x.size:
+                        dsys.x[:] = x.reshape(-1, 1)   # escrita no lugar: view do BatchSS
+                    dsys.set_delay(seconds=dsys.delay_L, seed_u=float(last_u[0]) if last_u.size else dsys.last_u)
+                    if dsys.line is not None and lines and len(lines[0]):
+                        dsys.line.load(lines[0], t_last=self.clock.now())
+                    if last_u.size >= 3 and dsys.u_state is not None:
+                        dsys.u_state[:] = last_u[1:3]
+                except Exception as e:
+                    print(f"[SimulTf] Erro ao carregar estado {key}: {e}")
+            for name, plant in self.mimo.items():
+                blob = blobs.get("MIMO|" + name)
+                if blob is None:
+                    continue
+                try:
+                    Ts, x, last_u, lines = unpack_state(blob)
+                    if abs(Ts - plant.Ts) <= 1e-12 and x.size == plant.x.size:
+                        plant.x[:] = x
+                    if last_u.size == plant.last_u.size:
+                        plant.set_delays(last_u)
+                    for line, win in zip(plant.lines, lines):
+                        if line is not None and len(win):
+                            line.load(win, t_last=self.clock.now())
+                except Exception as e:
+                    print(f"[SimulTf] Erro ao carregar estado MIMO {name}: {e}")
+            if self.shards is not None:
+                # plantas dos workers sem blob ficam zeradas (o formato antigo lê ReactVars)
+                self.shards.call("apply_states", blobs)
+        return legacy
+
+    def _load_legacy_states(self, keys):
+        """Formato antigo: um JSON por planta na tabela TFSTATES."""
+        for key in keys:
+            var = self.dictDB.get(key)
             dsys = self.systems.get(key)
-            if not dsys:
+            if not var or not dsys:
                 continue
             row = "|".join(key[:-1]); col = key[-1]
             try:
@@ -321,27 +1260,21 @@ class SimulTf(QObject):
                     continue
                 data = json.loads(raw)
 
+                # escrita no lugar: dsys.x é uma view do estado empacotado no BatchSS
                 if isinstance(data, list):
-                    dsys.x = _as_col(np.array(data, dtype=float), dsys.A.shape[0])
+                    dsys.x[:] = _as_col(np.array(data, dtype=float), dsys.A.shape[0])
                     continue
 
                 if isinstance(data, dict):
                     if "x" in data:
-                        dsys.x = _as_col(np.array(data["x"], dtype=float), dsys.A.shape[0])
+                        dsys.x[:] = _as_col(np.array(data["x"], dtype=float), dsys.A.shape[0])
                     if "delay_L" in data:
                         dsys.delay_L = float(data["delay_L"])
                     if "last_u" in data:
                         dsys.last_u = float(data["last_u"])
-                    dsys.hist.clear()
+                    dsys.set_delay(seconds=dsys.delay_L, seed_u=dsys.last_u)
                     hist = data.get("hist", [])
-                    if isinstance(hist, list) and hist:
-                        for item in hist:
-                            try:
-                                t_i, u_i = float(item[0]), float(item[1])
-                                dsys.hist.append((t_i, u_i))
-                            except Exception:
-                                pass
-                    else:
-                        dsys.hist.append((0.0, dsys.last_u))
+                    if dsys.line is not None and isinstance(hist, list) and hist:
+                        dsys.line.load(hist, t_last=self.clock.now())
             except Exception as e:
                 print(f"[SimulTf] Erro ao carregar estado {key}: {e}")
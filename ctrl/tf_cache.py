@@ -0,0 +1,155 @@
+
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+import threading
+import numpy as np
+import control as ctrl
+
+
+# ------------------------- cache de discretização (LRU) -------------------------
+
+Matrices = Tuple[np.ndarray, np.ndarray, np.ndarray, float]
+
+# Tustin distorce polos com |p|·h grande (warping / modo quase oscilatório em -1):
+# plantas com |p|·Ts > STIFF_LIMIT são discretizadas em m sub-passos de Ts/m
+STIFF_LIMIT = 0.5
+SUBSTEP_MAX = 64
+
+
+def substeps_for(den: Iterable[float], Ts: float, opt: Optional[str] = None) -> int:
+    """
+    Nº de sub-passos internos por período ``Ts`` (opção ``sub`` do tFunc):
+    • ausente / ``auto`` → ``ceil(|polo mais rápido|·Ts / STIFF_LIMIT)``, até ``SUBSTEP_MAX``
+    • ``off`` → 1
+    • ``sub=<n>`` → n fixo
+    """
+    if opt is not None and str(opt).lower() not in ('', 'auto'):
+        if str(opt).lower() == 'off':
+            return 1
+        return max(1, min(SUBSTEP_MAX, int(opt)))
+    den = np.asarray(list(den), dtype=float)
+    if den.size < 2:
+        return 1
+    fastest = float(np.abs(np.roots(den)).max(initial=0.0))
+    return max(1, min(SUBSTEP_MAX, int(np.ceil(fastest * float(Ts) / STIFF_LIMIT - 1e-9))))
+
+
+def lift(A: np.ndarray, B: np.ndarray, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ``m`` sub-passos com entrada segurada num único passo:
+    ``x[k+1] = A^m x[k] + (Σ_{i<m} A^i) B u[k]``. ``C`` e ``D`` não mudam.
+    """
+    Am = np.eye(A.shape[0]); S = np.zeros_like(A)
+    for _ in range(int(m)):
+        S = S + Am
+        Am = Am @ A
+    return Am, S @ B
+
+
+def _norm_poly(coefs: Iterable[float]) -> Tuple[float, ...]:
+    """Remove zeros à esquerda (mantém ao menos um coeficiente)."""
+    c = [float(v) for v in coefs]
+    while len(c) > 1 and c[0] == 0.0:
+        c.pop(0)
+    return tuple(c)
+
+
+class DiscretizationCache:
+    """
+    Cache LRU de ``(A, B, C, D)`` discretos para ``tf2ss`` + ``c2d``.
+
+    A chave é ``(num, den, Ts, method, substeps)`` **normalizada**: zeros à esquerda
+    removidos, num/den divididos por ``den[0]`` (TF mônica) e valores
+    arredondados a 12 algarismos — ``[2],[6 2]`` e ``[1],[3 1]`` compartilham
+    a mesma entrada.
+
+    As matrizes devolvidas são somente-leitura (compartilhadas entre plantas);
+    quem precisar alterar deve copiar. Com ``substeps = m > 1`` as matrizes
+    já vêm "levantadas" (``lift``): c2d em ``Ts/m`` e m passos compostos.
+    """
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = max(1, int(maxsize))
+        self._data: "OrderedDict[tuple, Matrices]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(num: Iterable[float], den: Iterable[float], Ts: float, method: str = 'tustin',
+            substeps: int = 1) -> tuple:
+        n = _norm_poly(num); d = _norm_poly(den)
+        if d[0] == 0.0:
+            raise ValueError("Denominador nulo.")
+        lead = d[0]
+        n = tuple(float(f"{v / lead:.12g}") for v in n)
+        d = tuple(float(f"{v / lead:.12g}") for v in d)
+        return (n, d, float(f"{float(Ts):.12g}"), str(method), max(1, int(substeps)))
+
+    @staticmethod
+    def _discretize(num, den, Ts: float, method: str, substeps: int = 1) -> Matrices:
+        sys_ss = ctrl.tf2ss(ctrl.TransferFunction(list(num), list(den)))
+        sysd = ctrl.c2d(sys_ss, Ts / substeps, method=method)
+        A = np.array(sysd.A, dtype=float); n = A.shape[0]
+        B = np.array(sysd.B, dtype=float).reshape(n, 1)
+        if substeps > 1:
+            A, B = lift(A, B, substeps)
+        C = np.array(sysd.C, dtype=float).reshape(1, n)
+        D = float(np.array(sysd.D, dtype=float).squeeze())
+        for arr in (A, B, C):
+            arr.setflags(write=False)
+        return A, B, C, D
+
+    def get(self, num, den, Ts: float, method: str = 'tustin', substeps: int = 1) -> Matrices:
+        k = self.key(num, den, Ts, method, substeps)
+        with self._lock:
+            hit = self._data.get(k)
+            if hit is not None:
+                self._data.move_to_end(k)
+                self.hits += 1
+                return hit
+            self.misses += 1
+        # discretiza fora do lock (python-control leva alguns ms)
+        value = self._discretize(*k)
+        with self._lock:
+            self._data[k] = value
+            self._data.move_to_end(k)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def warm(self, models: Iterable[Tuple[Iterable[float], Iterable[float]]],
+             Ts_list: Iterable[float], method: str = 'tustin', sub_opt: Optional[str] = None) -> int:
+        """Pré-discretiza cada (num, den) para cada Ts. Retorna quantos foram calculados."""
+        Ts_list = list(Ts_list); computed = 0
+        for num, den in models:
+            for Ts in Ts_list:
+                try:
+                    before = self.misses
+                    self.get(num, den, Ts, method, substeps_for(den, Ts, sub_opt))
+                    computed += self.misses - before
+                except Exception as e:
+                    print(f"[DiscretizationCache] Falha ao aquecer {num}/{den} @ {Ts}: {e}")
+        return computed
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize,
+                    "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# cache padrão do processo (usado por DiscreteSS.from_tf)
+DISCRETIZATION_CACHE = DiscretizationCache()
+
+
+def discretize(num, den, Ts: float, method: str = 'tustin',
+               cache: Optional[DiscretizationCache] = None, substeps: int = 1) -> Matrices:
+    """``(A, B, C, D)`` discretos (somente-leitura) via cache LRU."""
+    return (cache or DISCRETIZATION_CACHE).get(num, den, Ts, method, substeps)
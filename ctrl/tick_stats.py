@@ -0,0 +1,104 @@
+
+from typing import Dict, List, Optional
+import json
+import time
+
+
+# ------------------------- instrumentação do laço do simulador -------------------------
+#
+# Histogramas em oitavas de microssegundo (bucket b = [2^(b-1), 2^b) µs; b = 0: < 1 µs):
+# registrar uma amostra é um ``bit_length`` e um incremento de lista, sem lock.
+# Um único escritor (a thread do tick); leitores copiam as listas.
+
+BUCKETS = 32   # até ~2^31 µs ≈ 36 min
+
+
+class Histogram:
+    __slots__ = ("counts", "n", "total", "max")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKETS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        b = int(seconds * 1e6).bit_length() if seconds > 0 else 0
+        self.counts[b if b < BUCKETS else BUCKETS - 1] += 1
+        self.n += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float, counts: Optional[List[int]] = None) -> float:
+        """Limite superior (ms) do bucket que contém o quantil ``q`` (0..1)."""
+        counts = self.counts if counts is None else counts
+        n = sum(counts)
+        if not n:
+            return 0.0
+        target = q * n; acc = 0
+        for b, c in enumerate(counts):
+            acc += c
+            if acc >= target:
+                return (2 ** b) / 1000.0
+        return (2 ** (BUCKETS - 1)) / 1000.0
+
+    def summary(self) -> dict:
+        counts = list(self.counts)
+        n = self.n; mx = self.max * 1000.0
+        # o limite do bucket pode passar do máximo observado
+        p = {f"p{int(q * 100)}_ms": min(self.percentile(q, counts), mx) for q in (0.50, 0.90, 0.99)}
+        return {"count": n, "mean_ms": (self.total / n * 1000.0) if n else 0.0, "max_ms": mx,
+                **p, "buckets_us": counts}
+
+
+class TickStats:
+    """
+    Tempos por tick do ``SimulTf``:
+    • ``tick``     — duração total do callback
+    • ``jitter``   — início real - início pretendido (só com o agendador rodando)
+    • ``step``     — passo das plantas (entradas, BatchSS, MIMO, workers)
+    • ``publish``  — publicação nos ReactVars, **sem** os handlers
+    • ``handlers`` — tempo dentro de ``valueChangedSignal.emit`` (consumidores)
+      e na passada do grafo de dependências
+
+    ``overruns``: ticks mais longos que o período de parede; ``substeps``:
+    passos extras executados para alcançar deadlines perdidas.
+    """
+    METRICS = ("tick", "jitter", "step", "publish", "handlers")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # troca atômica: o escritor passa a usar os objetos novos no próximo tick
+        self.hist: Dict[str, Histogram] = {m: Histogram() for m in self.METRICS}
+        self.overruns = 0
+        self.substeps = 0
+        self.since = time.time()
+
+    def record(self, tick: float, step: float, publish: float, handlers: float,
+               jitter: Optional[float] = None, period: float = 0.0, substeps: int = 1):
+        h = self.hist
+        h["tick"].add(tick); h["step"].add(step)
+        h["publish"].add(max(0.0, publish - handlers)); h["handlers"].add(handlers)
+        if jitter is not None:
+            h["jitter"].add(max(0.0, jitter))
+        if period > 0 and tick > period:
+            self.overruns += 1
+        if substeps > 1:
+            self.substeps += substeps - 1
+
+    def summary(self) -> dict:
+        out = {m: h.summary() for m, h in self.hist.items()}
+        out.update(overruns=self.overruns, substeps=self.substeps, since=self.since)
+        return out
+
+    def dump(self, path: str, extra: Optional[dict] = None) -> dict:
+        """Grava ``summary()`` (+ ``extra``) como JSON em ``path``; devolve o conteúdo."""
+        data = self.summary()
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        return data
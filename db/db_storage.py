@@ -111,6 +111,42 @@ class DBStorage():
         except Exception as e:
             print(f"❌ Erro ao atualizar ou inserir no SQLite: {e}")        
     
+    def setRawDataMany(self, tableName: str, colName: str, values: dict, colType: str = "TEXT"):
+        """
+        Grava várias linhas de uma mesma coluna numa **única** conexão/transação
+        (uma verificação de esquema e dois ``executemany``), p.ex. checkpoints.
+        """
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {tableName}_tabela (
+                        NAME TEXT PRIMARY KEY
+                    )
+                ''')
+                cursor.execute(f"PRAGMA table_info({tableName}_tabela)")
+                if colName not in [col[1] for col in cursor.fetchall()]:
+                    cursor.execute(f"ALTER TABLE {tableName}_tabela ADD COLUMN {colName} {colType}")
+
+                cursor.execute(f"SELECT NAME FROM {tableName}_tabela")
+                existing = {linha[0] for linha in cursor.fetchall()}
+                cursor.executemany(f"UPDATE {tableName}_tabela SET {colName} = ? WHERE NAME = ?",
+                                   [(v, k) for k, v in values.items() if k in existing])
+                cursor.executemany(f"INSERT INTO {tableName}_tabela (NAME, {colName}) VALUES (?, ?)",
+                                   [(k, v) for k, v in values.items() if k not in existing])
+        except Exception as e:
+            print(f"❌ Erro ao gravar lote no SQLite: {e}")
+
+    def getRawColumn(self, tableName: str, colName: str) -> dict:
+        """``{NAME: valor}`` de uma coluna inteira num só SELECT (vazio se não existir)."""
+        try:
+            with sqlite3.connect(self.db_name) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT NAME, {colName} FROM {tableName}_tabela")
+                return {linha[0]: linha[1] for linha in cursor.fetchall() if linha[1] is not None}
+        except sqlite3.OperationalError:
+            return {}
+
     def dataFrame(self, tableName: str):
         with sqlite3.connect(self.db_name) as conn:
             df = pd.read_sql_query(f"SELECT * FROM {tableName}_tabela", conn, index_col='NAME')
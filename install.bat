@@ -4,6 +4,7 @@ CALL pip install pandas
 CALL pip install pyserial
 CALL pip install asteval
 CALL pip install control
+CALL pip install scipy
 CALL pip install pyside6
 CALL pip install openpyxl
 CALL pip install xlrd
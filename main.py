@@ -18,6 +18,8 @@ It:
 
 from __future__ import annotations
 import asyncio
+import multiprocessing
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 # --- project imports (expected to exist in your environment) ---
@@ -71,7 +73,10 @@ class MainWindowTk(tk.Tk):
 
         # --- simulator wiring ---
         print("🔄 Configurando Simulador...")
-        self.simulTf = SimulTf(50)
+        # SIMUL_TF_WORKERS=N reparte as plantas entre N processos
+        self.simulTf = SimulTf(50, table_lock=self.reactFactory.lock, graph=self.reactFactory.graph,
+                               storage=self.reactFactory.storage, checkpoint_s=30.0,
+                               workers=int(os.environ.get("SIMUL_TF_WORKERS", "0") or 0))
         print("✅ Simulador configurado.")
 
         print("🔄 Conectando sinais de tFunc...")
@@ -86,8 +91,13 @@ class MainWindowTk(tk.Tk):
                     var = self.reactFactory.df[tbl].at[row, col]
                     if getattr(var, "model", None) == DBModel.tFunc:
                         self.simulTf.tfConnect(var, True)
+        self.simulTf.warm_cache()
         print("✅ Variáveis registradas com tFunc.")
 
+        n_mimo = self.simulTf.load_mimo(self.reactFactory)
+        if n_mimo:
+            print(f"✅ {n_mimo} planta(s) MIMO registradas (tabela TFMIMO).")
+
         # --- Modbus server (thread controller) ---
         print("🔄 Iniciando servidor Modbus...")
         self.servidor_thread = ModbusServer(self.reactFactory)  # não inicia ainda
@@ -104,6 +114,9 @@ class MainWindowTk(tk.Tk):
         self.mbTable.setBaseData(self.reactFactory, "MODBUS")
         print("✅ Tabelas carregadas.")
 
+        # fechar a janela encerra o simulador (checkpoint final + workers/memória compartilhada)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
     # --------------------- UI construction ---------------------
     def _build_ui(self):
         # Top bar
@@ -232,7 +245,8 @@ class MainWindowTk(tk.Tk):
     def _on_hart_frame(self, hex_str: str):
         def process_on_ui(hrt_comm):
             print(hex_str)
-            frame_to_write: str = (self.HrtTransmitter.response(HrtFrame(hex_str))).frame
+            with self.reactFactory.lock:
+                frame_to_write: str = (self.HrtTransmitter.response(HrtFrame(hex_str))).frame
             if frame_to_write != "" and hrt_comm.write_frame(frame_to_write):
                 print(f"Wrote frame: {frame_to_write}")
             else:
@@ -314,6 +328,21 @@ class MainWindowTk(tk.Tk):
             except Exception:
                 pass
 
+    def _on_close(self):
+        try:
+            self.servidor_thread.stop()
+        except Exception:
+            pass
+        try:
+            self.hart_comm.disconnect()
+        except Exception:
+            pass
+        try:
+            self.simulTf.close()
+        except Exception as e:
+            print(f"[Main] Falha ao encerrar o simulador: {e}")
+        self.destroy()
+
     def _set_main_running_visual(self, running: bool):
         self._running = running
         if running:
@@ -326,5 +355,7 @@ class MainWindowTk(tk.Tk):
             self.btn_stop.state(["disabled"])
             
 if __name__ == "__main__":
+    # exe (PyInstaller): workers "spawn" (SIMUL_TF_WORKERS, varreduras) não reexecutam a UI
+    multiprocessing.freeze_support()
     app = MainWindowTk()
     app.mainloop()
\ No newline at end of file
@@ -183,6 +183,8 @@ class MappingService:
     """
     def __init__(self, react_factory: ReactFactory):
         self.rf = react_factory
+        # mesmo lock com que o SimulTf publica cada tick (leitura consistente)
+        self.lock = getattr(react_factory, "lock", None) or threading.RLock()
         self.hr: Dict[int, MappingEntry] = {}
         self.ir: Dict[int, MappingEntry] = {}
         self.co: Dict[int, MappingEntry] = {}
@@ -306,6 +308,10 @@ class _BaseRegisterBlock(SequentialBlockBase):
         return [0], 1
 
     def getValues(self, address, count=1):
+        with self.mapping.lock:
+            return self._get_values(address, count)
+
+    def _get_values(self, address, count):
         regs: list[int] = []
         addr = address
         end_addr = address + count
@@ -355,6 +361,10 @@ class _BaseBitBlock(SequentialBlockBase):
                 else self.mapping.lookup_di(addr))
 
     def getValues(self, address, count=1):
+        with self.mapping.lock:
+            return self._get_values(address, count)
+
+    def _get_values(self, address, count):
         out = []
         for i in range(count):
             addr = address + i
@@ -0,0 +1,202 @@
+# dep_graph.py — propagação ordenada (topológica) e sem glitches entre ReactVars
+#
+# Cada Func/tFunc é um nó cujas fontes são as células citadas na expressão
+# (``_tokens``). Em vez de reagir a cada ``valueChangedSignal`` (um nó que lê duas
+# células alteradas no mesmo tick era avaliado duas vezes, com um valor
+# intermediário inconsistente, e emits aninhados eram descartados pela guarda
+# de reentrância do ``Signal``):
+#   1. quem altera um valor só marca a célula (``mark``);
+#   2. ``propagate`` avalia os dependentes em ordem de posto (rank = 1 + maior
+#      posto das fontes; células sem fontes têm posto 0) — cada nó uma única vez
+#      por passada, já com todas as fontes no valor final;
+#   3. só nós cujo valor mudou propagam para os seus dependentes.
+# Editar uma Func troca só as arestas daquele nó e repõe os postos a partir
+# dele (``set_sources``); ciclos são recusados na inserção.
+
+from heapq import heappop, heappush
+from typing import Dict, Hashable, Iterable, Set, Tuple
+import itertools
+import threading
+
+
+class DependencyGraph:
+    """
+    Grafo fonte -> dependentes das ReactVars. Os nós precisam oferecer
+    ``_recompute(origin) -> bool`` (reavalia a expressão; ``True`` se o valor
+    publicado mudou). ``lock`` normalmente é o ``ReactFactory.lock``: a passada
+    inteira roda sob o mesmo lock da publicação do simulador.
+    """
+    def __init__(self, lock=None):
+        self._lock = lock if lock is not None else threading.RLock()
+        self.sources: Dict[Hashable, Tuple[Hashable, ...]] = {}
+        self.dependents: Dict[Hashable, Set[Hashable]] = {}
+        self.rank: Dict[Hashable, int] = {}
+        self._changed: Set[Hashable] = set()
+        self._running = False
+        self._seq = itertools.count()
+
+        # contadores
+        self.passes = 0
+        self.evaluations = 0
+        self.reranked = 0
+        self.cycles = 0
+
+    # ------------------------- estrutura -------------------------
+
+    def _reaches(self, start, targets: Set[Hashable]) -> bool:
+        """``True`` se algum de ``targets`` é ``start`` ou descendente dele."""
+        stack = [start]; seen = set()
+        while stack:
+            n = stack.pop()
+            if n in targets:
+                return True
+            if n in seen:
+                continue
+            seen.add(n)
+            stack.extend(self.dependents.get(n, ()))
+        return False
+
+    def set_sources(self, node, sources: Iterable) -> bool:
+        """
+        Troca as fontes de ``node`` e repõe os postos só do subgrafo afetado.
+        Devolve ``False`` (sem alterar nada) se as arestas novas fechariam um ciclo.
+        """
+        srcs = tuple(dict.fromkeys(sources))
+        with self._lock:
+            if srcs and self._reaches(node, set(srcs)):
+                self.cycles += 1
+                return False
+            for s in self.sources.get(node, ()):
+                deps = self.dependents.get(s)
+                if deps is not None:
+                    deps.discard(node)
+                    if not deps:
+                        del self.dependents[s]
+            if srcs:
+                self.sources[node] = srcs
+                for s in srcs:
+                    self.dependents.setdefault(s, set()).add(node)
+            else:
+                self.sources.pop(node, None)
+            self._rerank(node)
+            return True
+
+    def remove(self, node):
+        """Tira as fontes de ``node`` (deixou de ser Func); quem lê ``node`` continua ligado."""
+        self.set_sources(node, ())
+
+    def _rerank(self, node):
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            srcs = self.sources.get(n)
+            r = 1 + max(self.rank.get(s, 0) for s in srcs) if srcs else 0
+            if self.rank.get(n, 0) == r:
+                continue
+            if r:
+                self.rank[n] = r
+            else:
+                self.rank.pop(n, None)
+            self.reranked += 1
+            stack.extend(self.dependents.get(n, ()))
+
+    # ------------------------- propagação -------------------------
+
+    def mark(self, node):
+        """O valor de ``node`` mudou: os dependentes entram na próxima passada."""
+        with self._lock:
+            if node in self.dependents:
+                self._changed.add(node)
+
+    def mark_many(self, nodes: Iterable):
+        with self._lock:
+            deps = self.dependents
+            self._changed.update(n for n in nodes if n in deps)
+
+    def notify(self, node) -> int:
+        """``mark`` + ``propagate`` (escritas isoladas: UI, Modbus, HART)."""
+        self.mark(node)
+        return self.propagate()
+
+    def _enqueue(self, heap: list, queued: set, node):
+        rank = self.rank
+        for d in tuple(self.dependents.get(node, ())):
+            if d not in queued:
+                queued.add(d)
+                heappush(heap, (rank.get(d, 0), next(self._seq), d, node))
+
+    def propagate(self) -> int:
+        """
+        Avalia, em ordem de posto, os dependentes de tudo o que foi marcado;
+        devolve o número de avaliações. Chamadas aninhadas (um consumidor que
+        escreve numa célula durante a passada) só marcam: a passada em curso
+        as processa em seguida.
+        """
+        with self._lock:
+            if self._running or not self._changed:
+                return 0
+            self._running = True
+            n = 0
+            try:
+                while self._changed:
+                    changed, self._changed = self._changed, set()
+                    heap: list = []; queued: set = set()
+                    for src in changed:
+                        self._enqueue(heap, queued, src)
+                    while heap:
+                        _, _, node, origin = heappop(heap)
+                        n += 1
+                        try:
+                            if node._recompute(origin):
+                                self._enqueue(heap, queued, node)
+                        except Exception as e:
+                            print(f"[ReactGraph] Erro ao avaliar {node}: {e}")
+            finally:
+                self._running = False
+            self.passes += 1
+            self.evaluations += n
+            return n
+
+    # ------------------------- consulta -------------------------
+
+    def order(self) -> list:
+        """Nós com fontes em ordem topológica (posto crescente)."""
+        with self._lock:
+            return sorted(self.sources, key=lambda n: self.rank.get(n, 0))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "nodes": len(self.sources),
+                "edges": sum(len(s) for s in self.sources.values()),
+                "depth": max(self.rank.values(), default=0),
+                "passes": self.passes,
+                "evaluations": self.evaluations,
+                "reranked": self.reranked,
+                "cycles": self.cycles,
+            }
+
+
+# Exemplo de uso: losango a -> (b, c) -> d; d é avaliado uma vez por mudança de a
+if __name__ == '__main__':
+    class _Node:
+        def __init__(self, name, fn=None, *srcs):
+            self.name, self.fn, self.srcs, self.value = name, fn, srcs, 0.0
+
+        def _recompute(self, origin) -> bool:
+            new = self.fn(*(s.value for s in self.srcs))
+            print(f"  {self.name} = {new}")
+            changed, self.value = new != self.value, new
+            return changed
+
+    a = _Node("a")
+    b = _Node("b", lambda x: x + 1, a)
+    c = _Node("c", lambda x: 2 * x, a)
+    d = _Node("d", lambda x, y: x + y, b, c)
+    g = DependencyGraph()
+    for node in (d, b, c):
+        g.set_sources(node, node.srcs)
+    print("ordem:", [n.name for n in g.order()], "| ciclo a<-d aceito?", g.set_sources(a, [d]))
+    a.value = 1.0
+    g.notify(a)
+    print(g.stats())
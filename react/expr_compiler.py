@@ -0,0 +1,184 @@
+# expr_compiler.py — expressões Func/tFunc compiladas uma vez e reutilizadas
+#
+# Expressões como '@int(65535*HART.FIT100CA.percent_of_range)' disparam a cada
+# tick do simulador. Em vez de sanitizar com re.sub e deixar o asteval re-parsear
+# e percorrer a AST a cada atualização, a expressão é:
+#   1. sanitizada (TABELA.COLUNA.LINHA -> TABELA_COLUNA_LINHA) uma única vez;
+#   2. validada contra um subconjunto seguro da AST (aritmética, comparações,
+#      if/else, chamadas a funções da lista branca e a math./random.);
+#   3. compilada para um code object, em cache LRU pela string da expressão.
+# ``a ** b`` vira ``_pow(a, b)``, com o mesmo limite de expoente do asteval
+# (``MAX_EXPONENT``): sem isso '(int(x)) ** 1000000000' travaria a thread do tick
+# com o lock da tabela.
+# A avaliação é um eval() do code object sobre a tabela de símbolos da ReactVar
+# (só o símbolo que mudou é regravado). Fora do subconjunto seguro -> None e a
+# ReactVar cai no asteval, com um interpretador emprestado de um pool
+# compartilhado (``INTERPRETERS``) em vez de um ``Interpreter()`` por célula.
+
+from asteval import Interpreter
+from asteval.astutils import MAX_EXPONENT
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from numpy import exp, log
+import ast
+import math
+import random
+import re
+import threading
+
+TOKEN_RE = re.compile(r'([A-Z]\w+)\.([A-Z0-9]\w+)\.([A-Za-z_0-9]\w+)')
+
+# nomes disponíveis nas expressões (os mesmos que o InterpreterPool põe no asteval)
+SAFE_NAMES = {
+    'math':   math,
+    'exp':    exp,
+    'random': random,
+    'log':    log,
+    'abs':    abs,
+    'int':    int,
+}
+_SAFE_MODULES = {'math', 'random'}
+
+
+def _pow(base, exponent):
+    """``base ** exponent`` recusando expoentes acima de ``MAX_EXPONENT`` (como o asteval)."""
+    if exponent > MAX_EXPONENT:
+        raise ValueError(f"expoente inválido, máximo {MAX_EXPONENT}")
+    return base ** exponent
+
+
+_GLOBALS = {'__builtins__': {}, '_pow': _pow, **SAFE_NAMES}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant, ast.Attribute,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+def sanitize(expr: str) -> str:
+    """``HART.FV100CA.percent_of_range`` -> ``HART_FV100CA_percent_of_range``."""
+    return TOKEN_RE.sub(r"\1_\2_\3", expr)
+
+
+def _check(tree: ast.AST, symbols: frozenset):
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"construção não permitida: {type(node).__name__}")
+        if isinstance(node, ast.Attribute):
+            # só math.<f> / random.<f>, sem atributos "mágicos"
+            if not (isinstance(node.value, ast.Name) and node.value.id in _SAFE_MODULES) \
+                    or node.attr.startswith('_'):
+                raise ValueError("atributo não permitido")
+        elif isinstance(node, ast.Name):
+            if node.id not in SAFE_NAMES and node.id not in symbols:
+                raise ValueError(f"nome desconhecido: {node.id}")
+        elif isinstance(node, ast.Call):
+            if node.keywords and any(k.arg is None for k in node.keywords):
+                raise ValueError("**kwargs não permitido")
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float, bool)):
+                raise ValueError("constante não numérica")
+
+
+class _GuardPow(ast.NodeTransformer):
+    """``a ** b`` -> ``_pow(a, b)``."""
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Pow):
+            return node
+        return ast.copy_location(
+            ast.Call(func=ast.Name(id='_pow', ctx=ast.Load()), args=[node.left, node.right], keywords=[]),
+            node)
+
+
+class CompiledExpr:
+    """Code object validado + nomes dos símbolos de célula que ele lê."""
+    __slots__ = ("source", "code", "symbols")
+
+    def __init__(self, source: str, code, symbols: frozenset):
+        self.source = source
+        self.code = code
+        self.symbols = symbols
+
+    def __call__(self, symtable: dict) -> float:
+        try:
+            result = eval(self.code, _GLOBALS, symtable)
+        except Exception:
+            return 0.0            # mesmo efeito do asteval (erro -> None -> 0.0)
+        return float(result) if result is not None else 0.0
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expr: str) -> Optional[CompiledExpr]:
+    """``CompiledExpr`` em cache para ``expr`` (``None`` se sair do subconjunto seguro)."""
+    symbols = frozenset(f"{t}_{c}_{r}" for t, c, r in TOKEN_RE.findall(expr))
+    try:
+        tree = ast.parse(sanitize(expr).strip(), mode='eval')
+        _check(tree, symbols)
+        tree = ast.fix_missing_locations(_GuardPow().visit(tree))
+        return CompiledExpr(expr, compile(tree, '<Func>', 'eval'), symbols)
+    except (SyntaxError, ValueError):
+        return None
+
+
+# ------------------------- asteval compartilhado (fallback) -------------------------
+
+class InterpreterPool:
+    """
+    Interpretadores asteval reaproveitados entre todas as ReactVars. Cada
+    avaliação empresta um interpretador livre (cria outro só se todos estiverem
+    em uso por outras threads) e monta nele o escopo da expressão: ``SAFE_NAMES``
+    + os símbolos da célula. O escopo é da ReactVar; o interpretador não guarda
+    nada entre avaliações.
+    """
+    def __init__(self):
+        self._free: list = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evaluations = 0
+
+    def evaluate(self, expr: str, scope: Dict[str, object]):
+        """Resultado do asteval para ``expr`` (já sanitizada) sobre ``scope``."""
+        with self._lock:
+            interp = self._free.pop() if self._free else None
+            if interp is None:
+                self.created += 1
+            self.evaluations += 1
+        if interp is None:
+            interp = Interpreter()
+        sym = interp.symtable
+        try:
+            sym.clear()
+            sym.update(SAFE_NAMES)
+            sym.update(scope)
+            return interp(expr)
+        finally:
+            sym.clear()
+            with self._lock:
+                self._free.append(interp)
+
+
+INTERPRETERS = InterpreterPool()
+
+
+def cache_stats() -> Tuple[int, int, int]:
+    """(hits, misses, tamanho) do cache de compilação."""
+    info = compile_expression.cache_info()
+    return info.hits, info.misses, info.currsize
+
+
+# Verificação: potência com expoente enorme não pode travar a avaliação
+if __name__ == '__main__':
+    import time
+    sym = {'HART_FIT100_percent_of_range': 7.0}
+    for expr in ('int(HART.FIT100.percent_of_range) ** 2', 'int(HART.FIT100.percent_of_range) ** 1000000000',
+                 '2 ** int(HART.FIT100.percent_of_range) ** 12'):
+        fn = compile_expression(expr)
+        t0 = time.perf_counter()
+        y = fn(sym)
+        print(f"{expr:50s} -> {y:g}  ({(time.perf_counter() - t0) * 1e3:.3f} ms)")
+    assert compile_expression('_pow(2, 3)') is None
+    assert compile_expression('int(HART.FIT100.percent_of_range) ** 1000000000')(sym) == 0.0
@@ -0,0 +1,142 @@
+# mem_bench.py — memória por ReactVar (tracemalloc)
+#
+#   python -m react.mem_bench [N] [REV]
+#
+# Mede os bytes alocados por célula ao construir N ReactVars "Value" (com a
+# tabela colunar) e, com o banco disponível, o ``ReactFactory`` completo
+# (HART + MODBUS). A referência é medida na classe real da revisão ``REV``
+# (padrão: a anterior à tabela colunar), extraída com ``git archive`` e rodada
+# num subprocesso — não numa reimplementação da ReactVar antiga.
+
+from types import SimpleNamespace
+from typing import Callable, Optional, Tuple
+import ast
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(build: Callable[[], object]) -> Tuple[int, float]:
+    """(bytes retidos, segundos) para construir ``build()`` — o objeto fica vivo durante a medida."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    keep = build()
+    dt = time.perf_counter() - t0
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return used, dt
+
+
+def bytes_per_var(n: int = 2000) -> Tuple[float, float]:
+    """Bytes e µs por ReactVar da árvore atual (com ``ValueStore``)."""
+    from react.react_var import ReactVar
+    from react.value_store import ValueStore
+
+    def build():
+        factory = SimpleNamespace(storage=None, graph=None, store=ValueStore())
+        factory.store.add_table("BENCH", [f"R{i}" for i in range(n)], ["VALUE"])
+        out = [ReactVar("BENCH", f"R{i}", "VALUE", factory) for i in range(n)]
+        return factory, out
+
+    used, dt = measure(build)
+    return used / n, dt / n * 1e6
+
+
+def _plain_bytes_per_var(n: int = 2000) -> Tuple[float, float]:
+    """Como ``bytes_per_var``, com a fábrica mínima das revisões sem ``ValueStore``."""
+    from react.react_var import ReactVar
+    factory = SimpleNamespace(storage=None, graph=None)
+
+    def build():
+        return [ReactVar("BENCH", f"R{i}", "VALUE", factory) for i in range(n)]
+
+    used, dt = measure(build)
+    return used / n, dt / n * 1e6
+
+
+def factory_bytes_per_var(tables=("HART", "MODBUS")) -> Tuple[float, int]:
+    """Bytes por célula do ``ReactFactory`` real (inclui DataFrames, grafo e valores)."""
+    from react.react_factory import ReactFactory
+    box = {}
+
+    def build():
+        box["rf"] = asyncio.run(ReactFactory.create(list(tables)))
+        return box["rf"]
+
+    used, _ = measure(build)
+    n = sum(df.size for df in box["rf"].df.values())
+    return used / max(1, n), n
+
+
+def default_baseline() -> Optional[str]:
+    """Revisão anterior à introdução de ``react/value_store.py`` (``None`` sem git)."""
+    try:
+        out = subprocess.run(["git", "log", "-1", "--diff-filter=A", "--format=%h", "--",
+                              "react/value_store.py"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{out.stdout.strip()}^" if out.stdout.strip() else None
+
+
+def baseline_bytes_per_var(rev: str, n: int = 2000, with_factory: bool = True) -> dict:
+    """
+    Mede a ReactVar (e o ``ReactFactory``) da revisão ``rev``: a árvore é
+    extraída num diretório temporário e este arquivo roda lá num subprocesso,
+    importando as classes daquela revisão.
+    """
+    with tempfile.TemporaryDirectory(prefix="mem_bench_") as tree:
+        archive = subprocess.run(["git", "archive", rev], cwd=ROOT, capture_output=True, check=True)
+        subprocess.run(["tar", "-x", "-C", tree], input=archive.stdout, check=True)
+        code = ("import importlib.util, sys\n"
+                "spec = importlib.util.spec_from_file_location('_mem_bench', sys.argv[1])\n"
+                "m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m)\n"
+                "b, us = m._plain_bytes_per_var(int(sys.argv[2]))\n"
+                "out = {'bytes': b, 'us': us}\n"
+                "if sys.argv[3] == '1':\n"
+                "    try: out['factory_bytes'], out['cells'] = m.factory_bytes_per_var()\n"
+                "    except Exception as e: out['factory_error'] = str(e)\n"
+                "print(repr(out))\n")
+        res = subprocess.run([sys.executable, "-c", code, os.path.abspath(__file__), str(int(n)),
+                              "1" if with_factory else "0"],
+                             cwd=tree, env=dict(os.environ, PYTHONPATH=tree),
+                             capture_output=True, text=True, check=True)
+    return ast.literal_eval(res.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rev = sys.argv[2] if len(sys.argv) > 2 else default_baseline()
+    new_b, new_us = bytes_per_var(N)
+    try:
+        factory = factory_bytes_per_var()
+    except Exception as e:
+        factory = None
+        print(f"ReactFactory indisponível: {e}")
+    old = None
+    if rev:
+        try:
+            old = baseline_bytes_per_var(rev, N, with_factory=factory is not None)
+        except Exception as e:
+            print(f"Baseline {rev} indisponível: {e}")
+    if old is not None:
+        print(f"ReactVar (N={N}):  {rev} {old['bytes']:7.0f} B  {old['us']:5.1f} µs"
+              f"   |  agora {new_b:7.0f} B  {new_us:5.1f} µs")
+    else:
+        print(f"ReactVar (N={N}):  agora {new_b:7.0f} B  {new_us:5.1f} µs")
+    if factory is not None:
+        b, n = factory
+        line = f"ReactFactory HART+MODBUS: {n} células, {b:.0f} B/célula"
+        if old is not None and 'factory_bytes' in old:
+            line += f"  ({rev}: {old['factory_bytes']:.0f} B/célula)"
+        print(line)
@@ -0,0 +1,122 @@
+# meta_cache.py — TYPE/BYTE_SIZE das linhas em memória
+#
+# ``ReactVar.type()``/``byteSize()`` são chamados em todo ``setValue``, em cada
+# ``translate``, em cada leitura HART/Modbus e a cada redesenho de célula na UI.
+# Em vez de abrir uma conexão SQLite por chamada, as colunas meta de cada tabela
+# são lidas uma vez (um SELECT por coluna) na criação do ``ReactFactory``; linhas
+# fora da carga (p.ex. ``"A | B"``) são consultadas uma vez e ficam no cache.
+# Editar uma célula TYPE/BYTE_SIZE regrava a entrada (``put``) e esquece as
+# linhas compostas que a contêm (índice reverso componente -> chaves compostas,
+# montado quando a linha composta entra no cache: a carga inicial, que chama
+# ``put`` por célula, não varre o dicionário); ``invalidate`` esquece entradas e
+# força nova leitura.
+#
+# ``queries`` conta as idas ao SQLite feitas pelo cache; ``hits`` as respostas
+# servidas da memória; ``writes`` as edições gravadas-através (contadores sem
+# lock: aproximados sob concorrência).
+
+from typing import Dict, Optional, Set, Tuple
+import threading
+
+META_COLUMNS = ("TYPE", "BYTE_SIZE")
+
+
+def _components(rowName: str) -> Tuple[str, ...]:
+    """Linhas que compõem ``rowName`` (``"A | B"``/``"A & B"``, como em ``DBStorage.getData``)."""
+    if '|' in rowName:
+        return tuple(rowName.split(' | '))
+    if '&' in rowName:
+        return tuple(rowName.split(' & '))
+    return (rowName,)
+
+
+def _as_data(value) -> Optional[str]:
+    """Mesma conversão de ``DBStorage.getData`` para um valor cru do banco."""
+    return None if value in (None, "ERROR") else str(value)
+
+
+class MetaCache:
+    def __init__(self, storage):
+        self.storage = storage
+        self._data: Dict[Tuple[str, str, str], Optional[str]] = {}
+        self._composites: Dict[Tuple[str, str], Set[Tuple[str, str, str]]] = {}   # (tabela, linha) -> chaves "A | B"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.queries = 0
+        self.writes = 0
+        self.invalidations = 0
+
+    def preload(self, tableName: str):
+        """Carrega TYPE e BYTE_SIZE de todas as linhas de ``tableName`` (um SELECT por coluna)."""
+        for col in META_COLUMNS:
+            column = self.storage.getRawColumn(tableName, col)
+            self.queries += 1
+            with self._lock:
+                for row, value in column.items():
+                    self._store((tableName, row, col), _as_data(value))
+
+    def get(self, tableName: str, rowName: str, colName: str) -> Optional[str]:
+        key = (tableName, rowName, colName)
+        try:
+            value = self._data[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+        value = self.storage.getData(tableName, rowName, colName)
+        self.queries += 1
+        with self._lock:
+            self._store(key, value)
+        return value
+
+    def put(self, tableName: str, rowName: str, colName: str, value):
+        """Grava-através: a célula meta foi editada e persistida com ``value``."""
+        with self._lock:
+            self._drop_composites(tableName, rowName, colName)
+            self._store((tableName, rowName, colName), _as_data(value))
+            self.writes += 1
+
+    def _store(self, key: Tuple[str, str, str], value: Optional[str]):
+        """Grava a entrada (sob ``_lock``); linhas compostas entram no índice reverso."""
+        self._data[key] = value
+        parts = _components(key[1])
+        if len(parts) > 1:
+            for part in parts:
+                self._composites.setdefault((key[0], part), set()).add(key)
+
+    def _forget(self, key: Tuple[str, str, str]):
+        """Remove a entrada (sob ``_lock``) e a tira do índice reverso."""
+        self._data.pop(key, None)
+        parts = _components(key[1])
+        if len(parts) > 1:
+            for part in parts:
+                keys = self._composites.get((key[0], part))
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._composites[(key[0], part)]
+
+    def _drop_composites(self, tableName: str, rowName: str, colName: Optional[str]):
+        """Esquece as linhas compostas (``"A | B"``) de que ``rowName`` faz parte."""
+        keys = self._composites.get((tableName, rowName))
+        if keys:
+            for key in [k for k in keys if colName in (None, k[2])]:
+                self._forget(key)
+
+    def invalidate(self, tableName: str, rowName: Optional[str] = None, colName: Optional[str] = None):
+        """Esquece a célula (ou a linha/tabela inteira com ``None``); a próxima leitura consulta o banco."""
+        with self._lock:
+            if rowName is not None:
+                self._drop_composites(tableName, rowName, colName)
+            if rowName is not None and colName is not None:
+                self._forget((tableName, rowName, colName))
+            else:
+                for key in [k for k in self._data
+                            if k[0] == tableName and rowName in (None, k[1]) and colName in (None, k[2])]:
+                    self._forget(key)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._data), "hits": self.hits, "queries": self.queries,
+                "writes": self.writes, "invalidations": self.invalidations}
@@ -8,6 +8,8 @@ import threading
 __all__ = ["QObject", "Signal", "Slot"]
 
 class QObject:
+    __slots__ = ()   # subclasses podem usar __slots__ (sem __dict__ herdado)
+
     def __init__(self, *args, **kwargs):
         super().__init__()
 
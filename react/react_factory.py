@@ -1,8 +1,12 @@
 import asyncio
+import threading
 from .qt_compat import QObject, Signal, Slot
 import pandas as pd
 from db.db_storage import DBStorage
 from react.react_var import ReactVar  # ajuste conforme seu pacote
+from react.dep_graph import DependencyGraph
+from react.value_store import ValueStore
+from react.meta_cache import MetaCache
 
 class ReactFactory(QObject):
     """
@@ -29,12 +33,24 @@ class ReactFactory(QObject):
         self.storage = DBStorage('db/banco.db')
         self.df = {}
         self.autoCompleteList = {}
+        # lock da "tabela de valores": o simulador publica cada tick sob ele e
+        # leitores (Modbus/HART) leem sob ele -> visão consistente entre plantas
+        self.lock = threading.RLock()
+        # grafo de dependências das Func/tFunc: propagação em ordem topológica,
+        # cada célula avaliada uma vez por passada (sob o mesmo lock)
+        self.graph = DependencyGraph(self.lock)
+        # valores/modelos de todas as células em arrays por tabela (ReactVar é uma visão)
+        self.store = ValueStore()
+        # TYPE/BYTE_SIZE por linha em memória (type()/byteSize() sem SQLite)
+        self.meta = MetaCache(self.storage)
 
         # 1) Cria DataFrames e instancia ReactVar (sem carregar DB)
         for table in tableNames:
             rows = self.storage.rowKeys(table)
             cols = self.storage.colKeys(table)
             self.df[table] = pd.DataFrame(index=rows, columns=cols, dtype=object)
+            self.store.add_table(table, rows, cols)
+            self.meta.preload(table)
             for row in rows:
                 for col in cols:
                     var = ReactVar(table, row, col, self)
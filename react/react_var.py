@@ -2,15 +2,24 @@ import asyncio
 from .qt_compat import QObject, Signal, Slot
 from hrt.hrt_type import hrt_type_hex_to, hrt_type_hex_from
 from db.db_types import DBState, DBModel
-from asteval import Interpreter
-from numpy import exp, log
-import random
-import math
+from .expr_compiler import INTERPRETERS, TOKEN_RE, compile_expression, sanitize
+from .value_store import KIND_FLOAT, TableColumns
+from .meta_cache import META_COLUMNS
 import re
 
 class ReactVar(QObject):
+    """
+    Célula (tabela, linha, coluna) reativa. O valor e o modelo moram no
+    ``ValueStore`` colunar do ``ReactFactory`` (``_value``/``model`` são visões
+    sobre ele); a instância só guarda o que é da expressão Func/tFunc.
+    """
+    __slots__ = ("tableName", "rowName", "colName", "reactFactory", "_graph", "_cols", "_at",
+                 "isWidgetValueChanged", "_initialized", "_init_event", "inputValue",
+                 "_func", "_tFunc", "_tokens", "_symtable", "_symbols", "_inputs")
+
     valueChangedSignal = Signal(object)
     isTFuncSignal = Signal(object, bool)
+    inputChangedSignal = Signal(object)   # tFunc: inputValue mudou (acorda planta em repouso)
 
     def __init__(self, tableName: str, rowName: str, colName: str, reactFactory):
         super().__init__()
@@ -18,20 +27,54 @@ class ReactVar(QObject):
         self.rowName = rowName
         self.colName = colName
         self.reactFactory = reactFactory
+        self._graph = getattr(reactFactory, 'graph', None)   # None -> propagação por sinal
         self.isWidgetValueChanged = False
-        self._evaluator = Interpreter()
 
-        # Async init tracking
+        # posição no armazenamento colunar (célula avulsa: tabela própria de 1x1)
+        store = getattr(reactFactory, 'store', None)
+        if store is not None and tableName in store:
+            self._cols = store[tableName]
+        else:
+            self._cols = TableColumns(tableName, [rowName], [colName])
+        self._at = self._cols.at(rowName, colName)
+
+        # Async init tracking (o Event só é criado se alguém esperar antes da carga)
         self._initialized = False
-        self._init_event = asyncio.Event()
+        self._init_event = None
 
         # Internal state
-        self._value = None
+        self._cols.set(self._at, None)
+        self._cols.set_model(self._at, None)
         self.inputValue = None
-        self.model = None
         self._func = None
         self._tFunc = None
-        self._tokens: list[str] = []
+        self._tokens = ()
+        self._symtable: dict | None = None       # escopo da expressão (só Func/tFunc)
+        self._symbols: frozenset = frozenset()   # nomes sanitizados lidos pela expressão
+        self._inputs: tuple = ()                 # (símbolo, ReactVar) de cada token
+
+    @property
+    def _value(self):
+        cols = self._cols
+        if cols._kind[self._at] == KIND_FLOAT:      # caminho comum (saídas do simulador, Funcs)
+            return cols._values[self._at]
+        return cols.get(self._at)
+
+    @_value.setter
+    def _value(self, value):
+        cols = self._cols
+        if type(value) is float and cols._kind[self._at] == KIND_FLOAT:
+            cols._values[self._at] = value
+        else:
+            cols.set(self._at, value)
+
+    @property
+    def model(self) -> DBModel | None:
+        return self._cols.get_model(self._at)
+
+    @model.setter
+    def model(self, model: DBModel | None):
+        self._cols.set_model(self._at, model)
 
     async def _startDatabase(self):
         loop = asyncio.get_event_loop()
@@ -52,10 +95,13 @@ class ReactVar(QObject):
             self.setTFunc(data[1:])
 
         self._initialized = True
-        self._init_event.set()
+        if self._init_event is not None:
+            self._init_event.set()
 
     async def getValue(self, stateDesejado: DBState = DBState.humanValue) -> float | str:
         if not self._initialized:
+            if self._init_event is None:
+                self._init_event = asyncio.Event()
             await self._init_event.wait()
 
         if self.colName in ['NAME', 'TYPE', 'BYTE_SIZE', 'MB_POINT', 'ADDRESS']:
@@ -88,17 +134,23 @@ class ReactVar(QObject):
             return hrt_type_hex_to(value, type)
         return hrt_type_hex_from(value, type, byteSize)
 
+    def _meta(self, tableName: str, rowName: str, colName: str):
+        meta = getattr(self.reactFactory, 'meta', None)
+        if meta is not None:
+            return meta.get(tableName, rowName, colName)
+        return self.reactFactory.storage.getData(tableName, rowName, colName)
+
     def type(self, tableName=None, rowName=None):
         if tableName is None or rowName is None:
             tableName = self.tableName
             rowName = self.rowName
-        return self.reactFactory.storage.getData(tableName, rowName, 'TYPE')
+        return self._meta(tableName, rowName, 'TYPE')
 
     def byteSize(self, tableName=None, rowName=None):
         if tableName is None or rowName is None:
             tableName = self.tableName
             rowName = self.rowName
-        return int(self.reactFactory.storage.getData(tableName, rowName, 'BYTE_SIZE'))
+        return int(self._meta(tableName, rowName, 'BYTE_SIZE'))
 
     def getModel(self, value=None) -> DBModel:
         if value is None:
@@ -136,9 +188,15 @@ class ReactVar(QObject):
             self.reactFactory.storage.setRawData(self.tableName, self.rowName, self.colName, storage_value)
         except Exception as e:
             print(f"[WARN] Persistência Value falhou em {self.tableName}.{self.colName}.{self.rowName}: {e}")
+        if self.colName in META_COLUMNS and isChanged:
+            meta = getattr(self.reactFactory, 'meta', None)
+            if meta is not None:
+                meta.put(self.tableName, self.rowName, self.colName, storage_value)
 
         if isChanged:
             self.valueChangedSignal.emit(self)
+            if self._graph is not None:
+                self._graph.notify(self)
 
 
     def setFunc(self, func: str):
@@ -160,6 +218,7 @@ class ReactVar(QObject):
         if self._tFunc != tFunc:
             self._checkModel(DBModel.tFunc)
             self.model = DBModel.tFunc
+            reset = self._value != 0
             self._value = 0
             self._tFunc = tFunc
 
@@ -173,62 +232,108 @@ class ReactVar(QObject):
             _, __, ___, inp = tFunc.split(',')
             self._startFunc(inp[1:])
             self.isTFuncSignal.emit(self, True)
+            if reset and self._graph is not None:
+                self._graph.notify(self)      # quem lê a saída vê o 0 inicial
 
 
     def _checkModel(self, newModel: DBModel):
         oldModel = self.model
         if oldModel is not None and oldModel != newModel:
             self._connectTokens(self._tokens, False)
+            self._tokens = ()
             if oldModel == DBModel.tFunc:
                 self.isTFuncSignal.emit(self, False)
 
     def _startFunc(self, func: str):
         self._func = func
         tokens = re.findall(r'[A-Z]\w+\.[A-Z0-9]\w+\.[A-Za-z_0-9]\w+', func)
+        if self._symtable is None:
+            self._symtable = {}
         if self._tokens != tokens:
-            self._evaluator.symtable.clear()
-            self._evaluator.symtable.update({
-                'math':   math,
-                'exp':    exp,
-                'random': random,
-                'log':    log,
-                'abs':    abs,
-                'int':    int                
-            })
+            self._symtable.clear()
+            self._symbols = frozenset(f"{t}_{c}_{r}" for t, c, r in TOKEN_RE.findall(func))
             self._connectTokens(tokens, True)
             self._tokens = tokens
+        elif self._graph is not None and self._inputs is not None:
+            # mesmas células, expressão nova: reavalia e leva aos dependentes
+            if self._recompute():
+                self._graph.notify(self)
 
     def _evaluate_expression(self, expr: str) -> float:
-        sanitized = re.sub(r'([A-Z]\w+)\.([A-Z0-9]\w+)\.([A-Za-z_0-9]\w+)', r"\1_\2_\3", expr)
-        result = self._evaluator(sanitized)
+        # caminho rápido: code object validado/compilado uma vez (cache por texto)
+        compiled = compile_expression(expr)
+        if compiled is not None:
+            return compiled(self._symtable)
+        result = INTERPRETERS.evaluate(sanitize(expr), self._symtable)
         return float(result) if result is not None else 0.0
 
     def _connectTokens(self, tokens: list[str], isconnect: bool = True):
+        inputs = []
         for token in tokens:
             table, col, row = token.split('.')
             other: ReactVar = self.reactFactory.df[table].at[row, col]
             if isconnect:
                 val = other._value
-                self._evaluator.symtable[f'{table}_{col}_{row}'] = val
-                other.valueChangedSignal.connect(self._update_from_other_slot)
-            else:
+                self._symtable[f'{table}_{col}_{row}'] = val
+                inputs.append((f'{table}_{col}_{row}', other))
+                if self._graph is None:
+                    other.valueChangedSignal.connect(self._update_from_other_slot)
+            elif self._graph is None:
                 other.valueChangedSignal.disconnect(self._update_from_other_slot)
+        if self._graph is not None:
+            if not isconnect:
+                self._graph.remove(self)
+                self._inputs = ()
+            elif self._graph.set_sources(self, [other for _, other in inputs]):
+                self._inputs = tuple(inputs)
+            else:
+                print(f"[ReactGraph] Ciclo em {self.tableName}.{self.colName}.{self.rowName}: '{self._func}' ignorada.")
+                self._graph.remove(self)
+                self._inputs = None
+                return
         if isconnect and self._func:
             result = self._evaluate_expression(self._func)
             if self.model == DBModel.tFunc:
-                self.inputValue = result
+                self._setInputValue(result)
             else:
                 self._value = result               
                 self.valueChangedSignal.emit(self)
+                if self._graph is not None:
+                    self._graph.notify(self)
+
+    def _recompute(self, origin: "ReactVar" = None) -> bool:
+        """Passo do ``DependencyGraph``: reavalia com os valores atuais das fontes; ``True`` se ``_value`` mudou."""
+        symtable = self._symtable
+        for name, other in self._inputs or ():
+            symtable[name] = other._value
+        result = self._evaluate_expression(self._func)
+        if self.model == DBModel.tFunc:
+            self._setInputValue(result)
+            return False
+        if result == self._value:
+            return False
+        self._value = result
+        if origin is not None:
+            self.isWidgetValueChanged = origin.isWidgetValueChanged
+        self.valueChangedSignal.emit(self)
+        return True
 
     @Slot(object)
     def _update_from_other_slot(self, data: "ReactVar"):
-        val = data._value
-        self._evaluator.symtable[f'{data.tableName}_{data.colName}_{data.rowName}'] = val
+        name = f'{data.tableName}_{data.colName}_{data.rowName}'
+        if name not in self._symbols:
+            return      # o sinal é compartilhado: mudança de uma célula que a expressão não lê
+        # só o símbolo que mudou é regravado; a expressão compilada é reaproveitada
+        self._symtable[name] = data._value
         result = self._evaluate_expression(self._func)
         if self.model == DBModel.tFunc:
-            self.inputValue = result
+            self._setInputValue(result)
         else:
             self._value = result
             self.isWidgetValueChanged = data.isWidgetValueChanged
-            self.valueChangedSignal.emit(self)           
\ No newline at end of file
+            self.valueChangedSignal.emit(self)           
+
+    def _setInputValue(self, value):
+        if value != self.inputValue:
+            self.inputValue = value
+            self.inputChangedSignal.emit(self)
@@ -1,46 +1,123 @@
-
-# repeatFunction.py — Tk/threading version (compatible with SimulTf usage)
+# repeatFunction.py — agendador de taxa fixa (uma thread longa por tarefa)
 # Expected usage (from SimulTf):
-#    RepeatFunction(self._simulation_step, self.stepTime)
+#    RepeatFunction(self._simulation_step, self.stepTime, policy="substep")
 # where:
 #   - first arg is the function to call repeatedly
 #   - second arg is either an integer/float interval in ms OR a callable returning that interval
+#   - policy decides what happens when a deadline is missed (overrun):
+#       "skip"    -> descarta os ticks perdidos e realinha na grade de deadlines
+#       "catchup" -> executa os ticks perdidos em sequência (até max_catchup)
+#       "substep" -> chama func(n) UMA vez com n = nº de períodos vencidos
+#                    (o chamado avança n sub-passos vetorizados)
 #
-# Thread-safe start/stop. Re-arms itself after each tick.
+# Deadlines são absolutas (t0 + k·período): o tempo de execução do callback não
+# se soma ao período, então 50 ms continuam sendo 50 ms em média sob carga.
+# Thread-safe start/stop. Period 0 => roda encadeado, sem espera.
 
 import threading
+import time
 from .qt_compat import QObject, Slot
 
+POLICIES = ("skip", "catchup", "substep")
+
 class RepeatFunction(QObject):
-    def __init__(self, func, interval_ms_or_callable):
+    def __init__(self, func, interval_ms_or_callable, policy: str = "skip", max_catchup: int = 10):
         super().__init__()
+        if policy not in POLICIES:
+            raise ValueError(f"policy inválida: {policy!r} (use {POLICIES})")
         self._func = func
         self._interval_src = interval_ms_or_callable  # int/float in ms OR callable -> ms
-        self._timer = None
+        self.policy = policy
+        self.max_catchup = max(1, int(max_catchup))
+        self._thread = None
         self._running = False
         self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.reset_stats()
 
     def _get_interval_seconds(self) -> float:
         try:
             ms = self._interval_src() if callable(self._interval_src) else self._interval_src
-            return float(ms) / 1000.0
+            return max(0.0, float(ms) / 1000.0)
         except Exception:
             # fallback para 50ms se houver erro de conversão
             return 0.050
 
-    def _tick(self):
-        with self._lock:
-            if not self._running:
-                return
+    # ------------------------- estatísticas -------------------------
+
+    def reset_stats(self):
+        self.ticks = 0          # chamadas de func
+        self.missed = 0         # deadlines vencidas sem execução no horário
+        self.overruns = 0       # callbacks que ultrapassaram o período
+        self.max_late_s = 0.0   # maior atraso de início observado
+        self.last_exec_s = 0.0  # duração do último callback
+        self.last_late_s = 0.0  # atraso de início do callback em execução / último
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy, "ticks": self.ticks, "missed": self.missed,
+            "overruns": self.overruns, "max_late_ms": self.max_late_s * 1000.0,
+            "last_exec_ms": self.last_exec_s * 1000.0, "running": self._running,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    # ------------------------- laço do agendador -------------------------
+
+    def _call(self, n: int = 1):
+        t0 = time.perf_counter()
         try:
-            self._func()
-        finally:
-            with self._lock:
-                if self._running:
-                    interval_s = self._get_interval_seconds()
-                    self._timer = threading.Timer(interval_s, self._tick)
-                    self._timer.daemon = True
-                    self._timer.start()
+            if self.policy == "substep":
+                self._func(n)
+            else:
+                self._func()
+        except Exception as e:
+            print(f"[RepeatFunction] callback falhou: {e}")
+        self.ticks += 1
+        self.last_exec_s = time.perf_counter() - t0
+
+    def _run(self):
+        period = self._get_interval_seconds()
+        deadline = time.monotonic() + period
+        while self._running:
+            if period > 0:
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                if not self._running:
+                    break
+
+            # period 0 não tem grade de deadlines: não há atraso a medir
+            late = time.monotonic() - deadline if period > 0 else 0.0
+            self.last_late_s = late
+            if late > self.max_late_s:
+                self.max_late_s = late
+            # nº de deadlines vencidas até agora (>= 1)
+            due = 1 + (int(late // period) if period > 0 and late > 0 else 0)
+            if due > 1:
+                self.missed += due - 1
+
+            if due == 1 or self.policy == "skip":
+                self._call(1)
+            elif self.policy == "catchup":
+                for _ in range(min(due, self.max_catchup)):
+                    if not self._running: break
+                    self._call(1)
+            else:  # substep
+                self._call(due)
+
+            if period > 0 and self.last_exec_s > period:
+                self.overruns += 1
+
+            new_period = self._get_interval_seconds()
+            if new_period != period:
+                # intervalo mudou (ex.: fator de velocidade) -> rebase da grade
+                period = new_period
+                deadline = time.monotonic() + period
+            else:
+                deadline += due * period
 
     @Slot()
     def start(self):
@@ -48,22 +125,19 @@ class RepeatFunction(QObject):
             if self._running:
                 return
             self._running = True
-            interval_s = self._get_interval_seconds()
-            self._timer = threading.Timer(interval_s, self._tick)
-            self._timer.daemon = True
-            self._timer.start()
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._run, name="RepeatFunction", daemon=True)
+            self._thread.start()
 
     @Slot()
     def stop(self):
         with self._lock:
             self._running = False
-            t = self._timer
-            self._timer = None
-        if t:
-            try:
-                t.cancel()
-            except Exception:
-                pass
+            t = self._thread
+            self._thread = None
+        self._wake.set()
+        if t and t is not threading.current_thread():
+            t.join(timeout=1.0)
 
     def setInterval(self, interval_ms_or_callable):
         # permite trocar a fonte do intervalo em tempo de execução
@@ -0,0 +1,133 @@
+# value_store.py — armazenamento colunar dos valores das ReactVars
+#
+# Uma ``TableColumns`` por tabela guarda, em arrays planos (linha-maior,
+# ``at = i * ncols + j``), o valor e o modelo de cada célula:
+#   • ``values`` float64 — valor numérico (NaN para células sem número)
+#   • ``kind``   uint8   — tipo Python do valor (float, int, bool, None, objeto)
+#   • ``model``  uint8   — 0 sem modelo, 1 Value, 2 Func, 3 tFunc
+# Strings e outros objetos ficam numa lista paralela (``objects``).
+#
+# Os buffers são ``array.array``/``bytearray`` expostos como ``np.ndarray`` sem
+# cópia: a ReactVar lê/grava um elemento pelo buffer Python (rápido para acesso
+# escalar) e leitores em lote (Modbus, checkpoints, simulador) usam os arrays.
+
+from array import array
+from typing import Dict, List, Optional
+from db.db_types import DBModel
+import numpy as np
+
+KIND_NONE, KIND_FLOAT, KIND_INT, KIND_BOOL, KIND_OBJECT = range(5)
+_EXACT_INT = 2 ** 53
+
+_MODELS = (None, DBModel.Value, DBModel.Func, DBModel.tFunc)
+_MODEL_CODE = {m: c for c, m in enumerate(_MODELS)}
+
+
+class TableColumns:
+    """Valores, tipos e modelos de todas as células de uma tabela."""
+    __slots__ = ("name", "rows", "cols", "row_index", "col_index",
+                 "_values", "_kind", "_model", "objects", "values", "kind", "model")
+
+    def __init__(self, name: str, rows: List[str], cols: List[str]):
+        self.name = name
+        self.rows = list(rows)
+        self.cols = list(cols)
+        self.row_index: Dict[str, int] = {r: i for i, r in enumerate(self.rows)}
+        self.col_index: Dict[str, int] = {c: j for j, c in enumerate(self.cols)}
+        n = len(self.rows) * len(self.cols)
+        self._values = array('d', [np.nan]) * n
+        self._kind = bytearray(n)
+        self._model = bytearray(n)
+        self.objects: List[object] = [None] * n
+        # visões numpy sobre os mesmos buffers (tamanho fixo: as linhas não mudam)
+        self.values = np.frombuffer(self._values, dtype=float) if n else np.empty(0)
+        self.kind = np.frombuffer(self._kind, dtype=np.uint8) if n else np.empty(0, dtype=np.uint8)
+        self.model = np.frombuffer(self._model, dtype=np.uint8) if n else np.empty(0, dtype=np.uint8)
+
+    @property
+    def shape(self):
+        return len(self.rows), len(self.cols)
+
+    def at(self, row: str, col: str) -> int:
+        return self.row_index[row] * len(self.cols) + self.col_index[col]
+
+    # ------------------------- acesso escalar (ReactVar) -------------------------
+
+    def get(self, at: int):
+        k = self._kind[at]
+        if k == KIND_FLOAT:
+            return self._values[at]
+        if k == KIND_OBJECT:
+            return self.objects[at]
+        if k == KIND_INT:
+            return int(self._values[at])
+        if k == KIND_BOOL:
+            return bool(self._values[at])
+        return None
+
+    def set(self, at: int, value):
+        if self._kind[at] == KIND_OBJECT:
+            self.objects[at] = None
+        t = type(value)
+        if t is float:
+            self._values[at] = value; self._kind[at] = KIND_FLOAT
+        elif value is None:
+            self._values[at] = np.nan; self._kind[at] = KIND_NONE
+        elif t is bool or isinstance(value, np.bool_):
+            self._values[at] = float(value); self._kind[at] = KIND_BOOL
+        elif (t is int or isinstance(value, np.integer)) and -_EXACT_INT <= value <= _EXACT_INT:
+            self._values[at] = float(value); self._kind[at] = KIND_INT
+        elif isinstance(value, (float, np.floating)):
+            self._values[at] = float(value); self._kind[at] = KIND_FLOAT
+        else:
+            self._values[at] = np.nan; self._kind[at] = KIND_OBJECT
+            self.objects[at] = value
+
+    def get_model(self, at: int) -> Optional[DBModel]:
+        return _MODELS[self._model[at]]
+
+    def set_model(self, at: int, model: Optional[DBModel]):
+        self._model[at] = _MODEL_CODE[model]
+
+    # ------------------------- acesso em lote -------------------------
+
+    def grid(self) -> np.ndarray:
+        """``values`` como (linhas, colunas) — visão, sem cópia."""
+        return self.values.reshape(self.shape)
+
+    def column(self, col: str) -> np.ndarray:
+        """Valores numéricos da coluna ``col`` (visão (linhas,))."""
+        return self.grid()[:, self.col_index[col]]
+
+    def models(self, model: DBModel) -> np.ndarray:
+        """Máscara (linhas, colunas) das células com o modelo ``model``."""
+        return (self.model == _MODEL_CODE[model]).reshape(self.shape)
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Cópia consistente dos arrays (chamar sob ``ReactFactory.lock``)."""
+        return {"values": self.values.copy(), "kind": self.kind.copy(), "model": self.model.copy(),
+                "objects": list(self.objects)}
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.kind.nbytes + self.model.nbytes + 8 * len(self.objects)
+
+
+class ValueStore:
+    """``TableColumns`` por nome de tabela (uma instância por ``ReactFactory``)."""
+    def __init__(self):
+        self.tables: Dict[str, TableColumns] = {}
+
+    def add_table(self, name: str, rows: List[str], cols: List[str]) -> TableColumns:
+        self.tables[name] = TableColumns(name, rows, cols)
+        return self.tables[name]
+
+    def __getitem__(self, name: str) -> TableColumns:
+        return self.tables[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tables
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in self.tables.values())